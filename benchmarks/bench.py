@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# pmwl benchmark suite - generation throughput and peak memory per level
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Peak RSS is only available where the resource module exists (not Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pmwl  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'baseline.json')
+
+# Relative slowdown (or memory growth) beyond which a case is flagged
+DEFAULT_THRESHOLD = 0.25
+
+# Each case is regenerated until this much time has passed, keeping the
+# fastest run, so sub-millisecond cases still give stable numbers
+MIN_CASE_SECONDS = 0.3
+
+PROFILES = {
+    'minimal': {
+        'first_name': 'alice',
+    },
+    'family': {
+        'first_name': 'Alice',
+        'middle_name': 'Marie',
+        'last_name': 'Smith',
+        'birth_year': '1985',
+        'spouse_name': 'Robert',
+        'pet_names': ['Rex', 'Buddy'],
+        'children_names': ['Tom', 'Emma'],
+        'important_dates': ['Wedding: 2010-06-21', 'Graduation: 2007-05-30'],
+        'hobbies_teams': ['Liverpool', 'tennis'],
+    },
+    'long_hobbies': {
+        'first_name': 'Alexander',
+        'last_name': 'Constantinescu',
+        'birth_year': '1979',
+        'hobbies_teams': ['manchesterunited', 'photographyaesthetics',
+                          'stateoftheartsystems', 'astronomiesociety'],
+        'important_dates': ['Wedding: 2003-09-13', 'Graduation: 2001-07-02',
+                            'First job: 2001-10-01', 'House: 2008-04-15',
+                            'Daughter: 2009-12-24', 'Son: 2012-02-29'],
+    },
+}
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB, if measurable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB on Linux
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def time_generation(target, config, output_file):
+    """Generate once; return (result, seconds, seconds to first flush)."""
+    first_flush = []
+
+    def progress(writer):
+        if not first_flush:
+            first_flush.append(time.perf_counter())
+
+    started = time.perf_counter()
+    result = pmwl.build_wordlist(target, config, output_file,
+                                 progress=progress)
+    finished = time.perf_counter()
+    return result, finished - started, first_flush[0] - started
+
+
+def run_case(profile, complexity, size):
+    """Generate one wordlist in this process and return its measurements."""
+    target = pmwl.target_from_record(PROFILES[profile])
+    config = pmwl.Config(size=size, complexity=complexity)
+
+    with tempfile.TemporaryDirectory(prefix='pmwl-bench-') as tmpdir:
+        output_file = os.path.join(tmpdir, 'wordlist.txt')
+        runs = []
+        deadline = time.perf_counter() + MIN_CASE_SECONDS
+        while not runs or time.perf_counter() < deadline:
+            runs.append(time_generation(target, config, output_file))
+
+    result = runs[0][0]
+    elapsed = min(seconds for _, seconds, _ in runs)
+    return {
+        'profile': profile,
+        'complexity': complexity,
+        'size': size,
+        'entries': result.entries,
+        'candidates': result.candidates_generated,
+        'runs': len(runs),
+        'seconds': elapsed,
+        'candidates_per_sec': result.candidates_generated / elapsed,
+        'time_to_first_candidate': min(first for _, _, first in runs),
+        'peak_rss_kb': peak_rss_kb(),
+        'output_bytes': result.bytes_written,
+    }
+
+
+def run_isolated(profile, complexity, size, repeat):
+    """Run a case in fresh interpreters so peak RSS is not shared.
+
+    The fastest of `repeat` runs is kept.
+    """
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--case',
+             profile, complexity, size],
+            check=True, stdout=subprocess.PIPE, universal_newlines=True,
+        ).stdout
+        measured = json.loads(output)
+        if best is None or measured['seconds'] < best['seconds']:
+            best = measured
+    return best
+
+
+def store_memory(profile, complexity):
+    """Bytes per unique candidate held in a set versus a CandidateStore."""
+    target = pmwl.target_from_record(PROFILES[profile])
+    config = pmwl.Config(complexity=complexity)
+    measured = {'profile': profile, 'complexity': complexity}
+    # Warm the rule caches so only the container's memory is traced
+    for _ in pmwl.iter_candidates(target, config):
+        pass
+    for kind, factory in (('set', set), ('store', pmwl.CandidateStore)):
+        tracemalloc.start()
+        held = factory()
+        for word, _ in pmwl.iter_candidates(target, config):
+            held.add(word)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        measured['candidates'] = len(held)
+        measured[f'{kind}_bytes'] = size / len(held)
+        del held
+    return measured
+
+
+def case_key(case):
+    return f"{case['profile']}/{case['complexity']}/{case['size']}"
+
+
+def compare(results, baseline, threshold):
+    """Return a description of every case that regressed past threshold."""
+    previous = {case_key(case): case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        old = previous.get(case_key(case))
+        if old is None:
+            continue
+        speed = case['candidates_per_sec'] / old['candidates_per_sec']
+        if speed < 1 - threshold:
+            regressions.append(f"{case_key(case)}: throughput "
+                               f"{speed:.0%} of baseline")
+        if case['peak_rss_kb'] and old.get('peak_rss_kb'):
+            memory = case['peak_rss_kb'] / old['peak_rss_kb']
+            if memory > 1 + threshold:
+                regressions.append(f"{case_key(case)}: peak RSS "
+                                   f"{memory:.0%} of baseline")
+        if case['entries'] != old['entries']:
+            regressions.append(f"{case_key(case)}: {case['entries']} "
+                               f"entries, baseline had {old['entries']}")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'case':<36} {'entries':>8} {'cand/s':>12} {'first(s)':>9} "
+          f"{'rss(KiB)':>9} {'bytes':>9}")
+    for case in results['cases']:
+        rss = case['peak_rss_kb'] if case['peak_rss_kb'] is not None else '-'
+        print(f"{case_key(case):<36} {case['entries']:>8} "
+              f"{case['candidates_per_sec']:>12,.0f} "
+              f"{case['time_to_first_candidate']:>9.4f} {rss:>9} "
+              f"{case['output_bytes']:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark pmwl generation across profiles, '
+                    'complexity levels and sizes.')
+    parser.add_argument('--case', nargs=3,
+                        metavar=('PROFILE', 'COMPLEXITY', 'SIZE'),
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--profiles', nargs='+', choices=list(PROFILES),
+                        default=list(PROFILES))
+    parser.add_argument('--complexities', nargs='+',
+                        choices=list(pmwl.COMPLEXITY_MAP),
+                        default=list(pmwl.COMPLEXITY_MAP))
+    parser.add_argument('--sizes', nargs='+',
+                        choices=list(pmwl.SIZE_DEFAULTS),
+                        default=list(pmwl.SIZE_DEFAULTS))
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='fresh processes per case; the fastest is kept')
+    parser.add_argument('-o', '--output', help='write results as JSON')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative change flagged as a regression')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the new baseline')
+    parser.add_argument('--store-memory', action='store_true',
+                        help='compare bytes per candidate of a set and a '
+                             'CandidateStore instead')
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(*args.case)))
+        return 0
+
+    if args.store_memory:
+        print(f"{'case':<28} {'unique':>8} {'set B/cand':>11} "
+              f"{'store B/cand':>13}")
+        for profile in args.profiles:
+            for complexity in args.complexities:
+                measured = store_memory(profile, complexity)
+                print(f"{profile + '/' + complexity:<28} "
+                      f"{measured['candidates']:>8} "
+                      f"{measured['set_bytes']:>11.1f} "
+                      f"{measured['store_bytes']:>13.1f}")
+        return 0
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': [run_isolated(profile, complexity, size, args.repeat)
+                  for profile in args.profiles
+                  for complexity in args.complexities
+                  for size in args.sizes],
+    }
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline to compare against; run with --save-baseline.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,36 @@
 #!/usr/bin/env python3
 # pmwl - Pimp My Wordlist - Custom wordlist generator
 
+import argparse
+import array
+import bisect
+import bz2
+import cProfile
+import csv
+import gzip
+import hashlib
+import heapq
+import json
+import lzma
+import marshal
+import mmap
 import os
+import queue
+import shutil
+import socket
+import socketserver
+import sqlite3
+import struct
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from itertools import product
+from functools import lru_cache, partial
+from itertools import chain, islice, product
 from datetime import datetime
 
 # Complexity levels as integers for efficient comparison
@@ -36,10 +62,140 @@ LEET_MAP = {
     't': ['7'],
 }
 
+# Maximum leet variants generated per word
+LEET_BUDGET = 4096
+
+# Approximate in-memory bytes per buffered candidate beyond its characters,
+# used to enforce the external selector's memory ceiling
+EXTERNAL_ENTRY_OVERHEAD = 120
+# Initial hash table slots of a CandidateStore (a power of two)
+STORE_INITIAL_SLOTS = 1024
+# Entries CandidateStore.sorted() sorts at once before merging the runs
+STORE_SORT_RUN = 65536
+
+# Bump when a stage's output changes so cached variants are not reused
+VARIANT_CACHE_VERSION = 2
+# Default size bound of the on-disk variant cache, in megabytes
+VARIANT_CACHE_SIZE = 64
+# Seconds before a cache hit refreshes the entry's LRU timestamp
+VARIANT_CACHE_TOUCH = 3600
+# Largest unit, in candidates, the variant cache stores; longer units
+# are streamed and rebuilt on every run
+VARIANT_CACHE_UNIT = 100000
+# Bytes of new entries held in memory before they are written out
+VARIANT_CACHE_PENDING = 16 * 1024 * 1024
+
 SPECIAL_CHARS = ['!', '@', '#', '$']
 SEPARATORS = ['.', '_', '-']
 COMMON_SUFFIXES = ['123', '1234', '12345', '!', '!!', '@', '#']
 
+# Hash verification: digest algorithms by hex digest length, and
+# candidates hashed per worker job
+HASH_ALGORITHMS = {32: 'md5', 40: 'sha1', 64: 'sha256'}
+HASH_BATCH_SIZE = 8192
+
+# Service mode: default localhost port, result cache bound in megabytes,
+# requests kept for latency percentiles, and the length prefix of every
+# streamed frame
+SERVE_PORT = 7353
+SERVE_CACHE_SIZE = 64
+SERVE_LATENCY_WINDOW = 1000
+SERVE_FRAME = struct.Struct('<I')
+
+# Combination engine: most tokens joined into one candidate, default
+# length budget of a combination, and the case styles it can apply
+COMBINE_MAX_ARITY = 4
+COMBINE_LENGTH = 20
+COMBINE_STYLES = ('lower', 'capitalize', 'camel', 'upper')
+COMBINE_DEFAULT_STYLES = 'lower,capitalize,camel'
+
+# Date engine: the orders month, day and year are written in, and the
+# formats added at medium, high and extreme complexity for each order.
+# A format is a string of fields: Y 2015, y 15, m 06, n 6, d 05, j 5,
+# b jun, B june and N June. The first medium format is the date's
+# digits as entered.
+DATE_ORDERS = ('mdy', 'dmy', 'ymd')
+DATE_DEFAULT_ORDER = 'mdy'
+DATE_FORMATS = {
+    'mdy': (('Ymd', 'md', 'mdY'), ('mdy', 'nj', 'Y', 'y'),
+            ('bj', 'Nj', 'jb', 'bY')),
+    'dmy': (('Ymd', 'dm', 'dmY'), ('dmy', 'jn', 'Y', 'y'),
+            ('jb', 'jN', 'bj', 'bY')),
+    'ymd': (('Ymd', 'md', 'ymd'), ('Ym', 'nj', 'Y', 'y'),
+            ('bj', 'Nj', 'Yb', 'bY')),
+}
+MONTH_NAMES = ('january', 'february', 'march', 'april', 'may', 'june',
+               'july', 'august', 'september', 'october', 'november',
+               'december')
+
+# Number of candidates buffered before each write to the output file
+DEFAULT_CHUNK_SIZE = 8192
+# Encoded chunks queued for the background writer thread (0 writes
+# synchronously), and the file buffer it writes through
+WRITE_QUEUE_DEPTH = 8
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Output path that streams candidates to standard output
+STDOUT_TARGET = '-'
+# First chunk size when streaming, doubled up to DEFAULT_CHUNK_SIZE
+STREAM_INITIAL_CHUNK = 64
+
+# Output formats and the file extensions that select them
+OUTPUT_FORMATS = {
+    'text': '.txt',
+    'gzip': '.gz',
+    'bz2': '.bz2',
+    'xz': '.xz',
+    'binary': '.pmwl',
+}
+COMPRESSED_FORMATS = ('gzip', 'bz2', 'xz')
+
+# Binary wordlist layout: header, uint16-length-prefixed entries, and an
+# index holding the offset of every BINARY_INDEX_STRIDE-th entry
+BINARY_MAGIC = b'PMWL'
+BINARY_VERSION = 1
+BINARY_INDEX_STRIDE = 64
+BINARY_HEADER = struct.Struct('<4sHHQQ8x')
+BINARY_LENGTH = struct.Struct('<H')
+# Longest entry, in UTF-8 bytes, that BINARY_LENGTH can hold
+BINARY_ENTRY_MAX = 0xFFFF
+
+# Exclusion index: header (magic, version, native byte order flag,
+# source size and mtime, entry count) followed by sorted 64-bit word
+# hashes, stored next to the source as SOURCE + EXCLUDE_SUFFIX, or in
+# the temp or user cache directory when the source's is read-only
+EXCLUDE_MAGIC = b'PMWLXIDX'
+EXCLUDE_VERSION = 1
+EXCLUDE_HEADER = struct.Struct('<8sBB6xQqQ')
+EXCLUDE_SUFFIX = '.pmwlx'
+# Hashes sorted in memory per run while building an index
+EXCLUDE_RUN_SIZE = 1 << 20
+# Extensions of cracker potfiles, whose lines are 'hash:plaintext'
+POTFILE_EXTENSIONS = ('.pot', '.potfile')
+
+# Relative likelihood of each transformation. A candidate's score is the
+# product of the weights of every transformation applied to its stem;
+# 'base' is the score of the untouched stem and 'leet' applies once per
+# substituted character.
+DEFAULT_WEIGHTS = {
+    'base': 1.0,
+    'capitalize': 0.8,
+    'upper': 0.15,
+    'leet': 0.1,
+    'digit_suffix': 0.35,
+    'digit_prefix': 0.05,
+    'birth_year': 0.5,
+    'birth_year_short': 0.4,
+    'common_suffix': 0.4,
+    'date_number': 0.3,
+    'special_suffix': 0.35,
+    'special_prefix': 0.05,
+    'name_combo': 0.3,
+    'separator': 0.3,
+    'reversal': 0.02,
+    'rule': 0.25,
+}
+
 
 @dataclass
 class Config:
@@ -48,6 +204,28 @@ class Config:
     complexity: str = 'medium'
     output_file: str = 'wordlist.txt'
     custom_size: int = 0
+    ordering: str = 'score'
+    weights_file: str = ''
+    leet_file: str = ''
+    leet_budget: int = LEET_BUDGET
+    balanced: bool = False
+    memory_limit: int = 0
+    temp_dir: str = ''
+    output_format: str = ''
+    cache_file: str = ''
+    cache_size: int = VARIANT_CACHE_SIZE
+    rules_file: str = ''
+    min_length: int = 0
+    max_length: int = 0
+    require: str = ''
+    charset: str = ''
+    exclude_files: list = field(default_factory=list)
+    combine: int = 0
+    combine_styles: str = COMBINE_DEFAULT_STYLES
+    combine_length: int = COMBINE_LENGTH
+    date_order: str = DATE_DEFAULT_ORDER
+    write_queue: int = WRITE_QUEUE_DEPTH
+    fsync: bool = False
 
     @property
     def target_size(self):
@@ -107,12 +285,14 @@ def clear_screen():
     if os.name == 'nt':
         subprocess.run('cls', shell=True, stdout=subprocess.DEVNULL,
                         stderr=subprocess.DEVNULL)
-    else:
-        subprocess.run(['clear'], stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL)
+    elif sys.stdout.isatty():
+        # The escape sequences `clear` writes, without spawning it
+        sys.stdout.write('\033[H\033[2J\033[3J')
+        sys.stdout.flush()
 
 
-def main():
+def run_interactive():
+    """Run the interactive menu."""
     target = TargetInfo()
     config = Config()
 
@@ -252,6 +432,30 @@ def configure_wordlist(config):
     complexity_map = {'1': 'low', '2': 'medium', '3': 'high', '4': 'extreme'}
     config.complexity = complexity_map.get(complexity_choice, config.complexity)
 
+    # Ordering configuration
+    clear_screen()
+    print("\n--- CANDIDATE ORDERING ---")
+    print("Decides which candidates are kept when the size cap is reached.")
+    print("1. Score (most likely passwords first)")
+    print("2. Lexical (alphabetical order)")
+    print("3. Length (shortest candidates first)")
+    print("4. Stream (generation order, no sorting)")
+
+    ordering_choice = input("\nSelect ordering option (1-4): ")
+    ordering_map = {'1': 'score', '2': 'lexical', '3': 'length',
+                    '4': STREAM_ORDERING}
+    config.ordering = ordering_map.get(ordering_choice, config.ordering)
+
+    print("\nCurrent weights file: "
+          f"{config.weights_file or 'built-in defaults'}")
+    if input("Change weights file? (y/n): ").lower() == 'y':
+        weights_file = input("Enter weights file (blank for defaults): ")
+        try:
+            load_weights(weights_file)
+            config.weights_file = weights_file
+        except (OSError, ValueError) as e:
+            print(f"Could not load weights: {e}. Keeping current weights.")
+
     # Output file
     clear_screen()
     print("\n--- OUTPUT FILE ---")
@@ -259,9 +463,12 @@ def configure_wordlist(config):
 
     if input("Change output file? (y/n): ").lower() == 'y':
         new_file = input("Enter new filename: ")
-        if new_file:
-            if not new_file.endswith('.txt'):
-                new_file += '.txt'
+        if new_file == STDOUT_TARGET:
+            # The menu itself talks on stdout; streaming is a CLI feature
+            print("Stdout output is only available from the command line "
+                  "('pmwl generate -o -'). Keeping current output file.")
+        elif new_file:
+            # Names without a known extension are written as text
             config.output_file = new_file
 
     input("\nWordlist configuration updated. Press Enter to continue...")
@@ -270,45 +477,118 @@ def configure_wordlist(config):
 # --- Wordlist generation helpers ---
 
 
-def apply_leet_variants(word, complexity_level):
-    """Generate leet-speak variants with combinatorial substitutions."""
-    variants = set()
+def load_leet_map(path=''):
+    """Return LEET_MAP extended with the substitutions in a JSON file.
+
+    The file maps single characters to lists of replacements; they are
+    appended after the built-in replacements for that character.
+    """
+    leet_map = {ch: list(options) for ch, options in LEET_MAP.items()}
+    if not path:
+        return leet_map
+    with open(path) as f:
+        extra = json.load(f)
+    for ch, options in extra.items():
+        if len(ch) != 1 or not isinstance(options, list):
+            raise ValueError(f"Invalid leet table entry for '{ch}'.")
+        key = ch.lower()
+        merged = leet_map.setdefault(key, [])
+        for option in map(str, options):
+            if option not in (ch, key) and option not in merged:
+                merged.append(option)
+    return leet_map
+
+
+def build_leet_table(leet_map, complexity_level):
+    """Precompute the replacements usable at a complexity level per char.
+
+    High and above use every replacement; lower levels only the first.
+    """
+    table = {}
+    for ch, options in leet_map.items():
+        if not options:
+            continue
+        table[ch] = (tuple(options) if complexity_level >= COMPLEXITY_HIGH
+                     else tuple(options[:1]))
+    return table
+
 
-    # Find positions in the word that have leet replacements
+def leet_positions(word, table):
+    """Per-word position table: (index, (original, *replacements))."""
     positions = []
     for i, ch in enumerate(word):
-        lower_ch = ch.lower()
-        if lower_ch in LEET_MAP:
-            options = [ch]  # original character is always an option
-            if complexity_level >= COMPLEXITY_HIGH:
-                options.extend(LEET_MAP[lower_ch])
-            else:
-                options.append(LEET_MAP[lower_ch][0])
-            positions.append((i, options))
-
-    if not positions:
-        return variants
-
-    # Extreme: combinatorial substitutions (all combinations)
-    # Other levels: individual substitutions only
-    if complexity_level >= COMPLEXITY_EXTREME and len(positions) <= 6:
-        indices = [p[0] for p in positions]
-        option_lists = [p[1] for p in positions]
-        for combo in product(*option_lists):
-            chars = list(word)
-            for idx, replacement in zip(indices, combo):
-                chars[idx] = replacement
-            result = ''.join(chars)
-            if result != word:
-                variants.add(result)
-    else:
+        replacements = table.get(ch.lower())
+        if replacements:
+            positions.append((i, (ch,) + replacements))
+    return positions
+
+
+def iter_leet(word, positions, combinatorial, budget=LEET_BUDGET):
+    """Lazily yield (variant, substitutions) leet variants of a word.
+
+    Single substitutions come first. In combinatorial mode the full
+    product of every position's options follows, walked in reflected
+    mixed-radix Gray-code order (Knuth's loopless Algorithm H) so each
+    step rewrites exactly one character of a shared buffer. `budget`
+    caps the number of variants yielded per word instead of skipping
+    long words outright.
+    """
+    if not positions or budget <= 0:
+        return
+
+    emitted = 0
+    total = 1
+    for _, options in positions:
+        total *= len(options)
+
+    if not combinatorial or total - 1 > budget:
         for i, options in positions:
             for replacement in options[1:]:  # skip the original char
-                chars = list(word)
-                chars[i] = replacement
-                variants.add(''.join(chars))
+                yield f"{word[:i]}{replacement}{word[i + 1:]}", 1
+                emitted += 1
+                if emitted >= budget:
+                    return
+        if not combinatorial:
+            return
+
+    n = len(positions)
+    indices = [i for i, _ in positions]
+    options = [opts for _, opts in positions]
+    radices = [len(opts) for opts in options]
+    digits = [0] * n
+    directions = [1] * n
+    focus = list(range(n + 1))
+    chars = list(word)
+    substitutions = 0
+
+    while True:
+        j = focus[0]
+        focus[0] = 0
+        if j == n:
+            return
+        old = digits[j]
+        digits[j] = new = old + directions[j]
+        if new == 0 or new == radices[j] - 1:
+            directions[j] = -directions[j]
+            focus[j] = focus[j + 1]
+            focus[j + 1] = j + 1
+        chars[indices[j]] = options[j][new]
+        substitutions += (new != 0) - (old != 0)
 
-    return variants
+        if substitutions > 1 or total - 1 <= budget:
+            yield ''.join(chars), substitutions
+            emitted += 1
+            if emitted >= budget:
+                return
+
+
+def apply_leet_variants(word, complexity_level, leet_map=None,
+                        budget=LEET_BUDGET):
+    """Generate leet-speak variants with combinatorial substitutions."""
+    table = build_leet_table(leet_map or LEET_MAP, complexity_level)
+    positions = leet_positions(word, table)
+    return {variant for variant, _ in iter_leet(
+        word, positions, complexity_level >= COMPLEXITY_EXTREME, budget)}
 
 
 def extract_date_numbers(important_dates):
@@ -323,24 +603,153 @@ def extract_date_numbers(important_dates):
     return date_numbers
 
 
-def generate_wordlist(target, config):
-    """Generate customized wordlist based on target information"""
-    clear_screen()
-    print("\n===== PIMPING YOUR WORDLIST =====")
+# --- Dates ---
 
-    if not target.has_info():
-        print("No target information provided.")
-        input("Please add target information before generating a wordlist. "
-              "Press Enter to continue...")
-        return
 
-    print("Processing target information...")
+def parse_date_orders(text):
+    """Split a comma-separated list of DATE_ORDERS names."""
+    orders = tuple(dict.fromkeys(name.strip() for name in text.split(',')
+                                 if name.strip()))
+    unknown = set(orders) - set(DATE_ORDERS)
+    if unknown:
+        raise ValueError(f"Unknown date orders: {', '.join(sorted(unknown))}")
+    if not orders:
+        raise ValueError("At least one date order is required.")
+    return orders
+
+
+@lru_cache(maxsize=None)
+def date_formats(orders, level):
+    """Distinct formats of the given orders used at a complexity level."""
+    tiers = max(1, level - COMPLEXITY_LOW)
+    return tuple(dict.fromkeys(fmt for order in orders
+                               for tier in DATE_FORMATS[order][:tiers]
+                               for fmt in tier))
+
+
+def parse_date(text, orders=(DATE_DEFAULT_ORDER,)):
+    """Parse 'YYYY-MM-DD' or 'MM-DD' into (year, month, day) strings.
+
+    The year is '' when not given. Dates with the year last are read in
+    the first order. Returns None for anything else, including days the
+    month does not have (02-31, 2015-02-29).
+    """
+    groups = ''.join(c if c.isdigit() else ' ' for c in text).split()
+    year = ''
+    if len(groups) == 3 and len(groups[0]) == 4:
+        year, month, day = groups
+    elif len(groups) == 3 and len(groups[2]) == 4:
+        month, day, year = groups
+        if orders[0] == 'dmy':
+            month, day = day, month
+    elif len(groups) == 2 and all(len(group) <= 2 for group in groups):
+        month, day = groups
+    else:
+        return None
+    if int(month) > 12 >= int(day):
+        month, day = day, month
+    try:
+        # Without a year, check the day against a leap year so 02-29 passes
+        datetime(int(year or 2000), int(month), int(day))
+    except ValueError:
+        return None
+    return year, month.zfill(2), day.zfill(2)
 
-    level = config.complexity_level
+
+def date_tokens(important_dates, orders, level):
+    """The distinct strings the dates are written as, in format order.
+
+    Each 'description: date' entry contributes its digits first, as
+    extract_date_numbers does, and is then parsed once and written in
+    every format of date_formats(). Tokens repeated across formats or
+    dates are kept once, so the rules appending them do no repeated work.
+    """
+    formats = date_formats(orders, level)
+    tokens = {}
+    for entry in important_dates:
+        parts = entry.split(': ', 1)
+        if len(parts) < 2:
+            continue
+        digits = ''.join(c for c in parts[1] if c.isdigit())
+        if digits:
+            tokens[digits] = None
+        parsed = parse_date(parts[1], orders)
+        if parsed is None:
+            continue
+        year, month, day = parsed
+        name = MONTH_NAMES[int(month) - 1]
+        fields = {'Y': year, 'y': year[2:], 'm': month, 'n': str(int(month)),
+                  'd': day, 'j': str(int(day)), 'b': name[:3], 'B': name,
+                  'N': name.capitalize()}
+        for fmt in formats:
+            if year or ('Y' not in fmt and 'y' not in fmt):
+                tokens[''.join(fields[code] for code in fmt)] = None
+    return list(tokens)
+
+
+@dataclass
+class GenerationContext:
+    """Values derived once from the target and shared by every stage."""
+    level: int = COMPLEXITY_MEDIUM
+    birth_year: str = ''
+    birth_year_short: str = ''
+    date_numbers: list = field(default_factory=list)
+    weights: dict = field(default_factory=lambda: dict(DEFAULT_WEIGHTS))
+    leet_table: dict = field(default_factory=dict)
+    leet_budget: int = LEET_BUDGET
+    custom_rules: list = field(default_factory=list)
+    programs: dict = field(default_factory=dict)
+    policy: object = None
+    pruned: dict = field(default_factory=dict)
+    combine: int = 0
+    combine_styles: tuple = ()
+    combine_length: int = COMBINE_LENGTH
+
+
+def load_weights(path):
+    """Load transformation weights from a JSON file over the defaults."""
+    weights = dict(DEFAULT_WEIGHTS)
+    if not path:
+        return weights
+    with open(path) as f:
+        overrides = json.load(f)
+    unknown = set(overrides) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown weight names: {', '.join(sorted(unknown))}")
+    for name, value in overrides.items():
+        value = float(value)
+        if value < 0:
+            raise ValueError(f"Weight '{name}' must not be negative.")
+        weights[name] = value
+    return weights
+
+
+def build_context(target, config):
+    """Derive the shared generation context for a target and config."""
     birth_year = target.birth_year
-    birth_year_short = birth_year[2:] if birth_year else ''
+    ctx = GenerationContext(
+        level=config.complexity_level,
+        birth_year=birth_year,
+        birth_year_short=birth_year[2:] if birth_year else '',
+        date_numbers=date_tokens(target.important_dates,
+                                 parse_date_orders(config.date_order),
+                                 config.complexity_level),
+        weights=load_weights(config.weights_file),
+        leet_table=build_leet_table(load_leet_map(config.leet_file),
+                                    config.complexity_level),
+        leet_budget=config.leet_budget,
+        custom_rules=load_rules(config.rules_file),
+        policy=build_policy(config),
+        combine=config.combine,
+        combine_styles=parse_styles(config.combine_styles),
+        combine_length=config.combine_length,
+    )
+    ctx.programs = compile_rule_sets(ctx, ctx.custom_rules)
+    return ctx
+
 
-    # Build base words from target info
+def build_base_words(target):
+    """Build the list of base words (stems) from target info."""
     base_words = []
     string_fields = [target.first_name, target.middle_name,
                      target.last_name, target.spouse_name]
@@ -348,9 +757,9 @@ def generate_wordlist(target, config):
         if val:
             base_words.append(val.lower())
 
-    if birth_year:
-        base_words.append(birth_year)
-        base_words.append(birth_year_short)
+    if target.birth_year:
+        base_words.append(target.birth_year)
+        base_words.append(target.birth_year[2:])
 
     for field_list in [target.pet_names, target.children_names,
                        target.hobbies_teams]:
@@ -358,171 +767,4685 @@ def generate_wordlist(target, config):
             if item:
                 base_words.append(item.lower())
 
-    date_numbers = extract_date_numbers(target.important_dates)
+    return [word for word in base_words if word]
 
-    print("Generating password variations...")
 
-    wordlist = set()
+# --- Password policy ---
+# A policy (length bounds, required character classes, allowed charset)
+# is checked before a candidate is built wherever its shape decides the
+# outcome: a rule's output length follows from the stem's length, and
+# the classes it can contain from the stem and the rule's arguments.
+# Whatever the shape cannot decide is checked on the built candidate.
+
+PASSWORD_CLASSES = ('lower', 'upper', 'digit', 'symbol')
+
+
+def char_classes(text):
+    """The PASSWORD_CLASSES present in text."""
+    classes = set()
+    for ch in text:
+        if ch.islower():
+            classes.add('lower')
+        elif ch.isupper():
+            classes.add('upper')
+        elif ch.isdigit():
+            classes.add('digit')
+        else:
+            classes.add('symbol')
+    return classes
+
+
+def parse_classes(text):
+    """Split a comma-separated list of PASSWORD_CLASSES names."""
+    classes = {name.strip() for name in text.split(',') if name.strip()}
+    unknown = classes - set(PASSWORD_CLASSES)
+    if unknown:
+        raise ValueError(f"Unknown character classes: "
+                         f"{', '.join(sorted(unknown))}")
+    return frozenset(classes)
+
+
+@dataclass(frozen=True)
+class PasswordPolicy:
+    """Constraints every written candidate must satisfy."""
+    min_length: int = 0
+    max_length: int = 0
+    required: frozenset = frozenset()
+    charset: frozenset = None
+
+    def length_fits(self, length):
+        return (length >= self.min_length
+                and (not self.max_length or length <= self.max_length))
+
+    def accepts(self, word):
+        if not self.length_fits(len(word)):
+            return False
+        if self.charset is not None and not self.charset.issuperset(word):
+            return False
+        return not self.required or self.required <= char_classes(word)
+
+
+def build_policy(config):
+    """The Config's PasswordPolicy, or None when it sets no constraint."""
+    if not (config.min_length or config.max_length or config.require
+            or config.charset):
+        return None
+    return PasswordPolicy(
+        min_length=config.min_length,
+        max_length=config.max_length,
+        required=parse_classes(config.require),
+        charset=frozenset(config.charset) if config.charset else None,
+    )
+
+
+def policy_filter(name, items, policy, pruned):
+    """Drop a stage's candidates that the policy rejects, counting them."""
+    rejected = 0
+    try:
+        for item in items:
+            if policy.accepts(item[0]):
+                yield item
+            else:
+                rejected += 1
+    finally:
+        pruned[name] = pruned.get(name, 0) + rejected
+
+
+# --- Rule engine ---
+# Per-word stages are declared as rules in a subset of hashcat's rule
+# language. Each function rewrites the word; a rule is a sequence of
+# functions, spaces between them are ignored:
+#
+#   :  nothing          l  lowercase        u  uppercase
+#   c  capitalize       C  invert capitalize
+#   t  toggle case      r  reverse          d  duplicate
+#   [  drop first char  ]  drop last char
+#   $X append X         ^X prepend X
+#   sXY replace X by Y  @X purge X
+#
+# pmwl extends it with L, which must end a rule and yields the leet
+# variants of the word, and with ${name} and ^{name}, which append or
+# prepend each value of a RULE_VARIABLES entry. A rule whose variable
+# has no values (e.g. no birth year) yields nothing.
+
+RULE_VARIABLES = ('digit', 'special', 'suffix', 'birth_year',
+                  'birth_year_short', 'date_number')
+
+# (stage, minimum complexity level, groups). A group is a list of
+# (rule, weight names); all its rules are applied for each assignment of
+# the variables they use before the next one, which sets the candidate
+# order within a stage. A candidate's weight is the product of the
+# named weights (times leet per substitution for L).
+RULE_SETS = [
+    ('case', COMPLEXITY_LOW, [
+        [(':', ('base',)),
+         ('c', ('capitalize',)),
+         ('u', ('upper',))],
+    ]),
+    ('leet', COMPLEXITY_LOW, [
+        [('L', ())],
+    ]),
+    ('digits', COMPLEXITY_LOW, [
+        [('${digit}', ('digit_suffix',)),
+         ('c ${digit}', ('capitalize', 'digit_suffix')),
+         ('^{digit}', ('digit_prefix',))],
+    ]),
+    ('birth_year', COMPLEXITY_LOW, [
+        [('${birth_year}', ('birth_year',)),
+         ('${birth_year_short}', ('birth_year_short',)),
+         ('c ${birth_year}', ('capitalize', 'birth_year')),
+         ('c ${birth_year_short}', ('capitalize', 'birth_year_short'))],
+    ]),
+    ('common_suffixes', COMPLEXITY_MEDIUM, [
+        [('${suffix}', ('common_suffix',)),
+         ('c ${suffix}', ('capitalize', 'common_suffix'))],
+    ]),
+    ('date_numbers', COMPLEXITY_MEDIUM, [
+        [('${date_number}', ('date_number',)),
+         ('c ${date_number}', ('capitalize', 'date_number'))],
+    ]),
+    ('special_chars', COMPLEXITY_HIGH, [
+        [('${special}', ('special_suffix',)),
+         ('c ${special}', ('capitalize', 'special_suffix')),
+         ('^{special}', ('special_prefix',)),
+         ('c ^{special}', ('capitalize', 'special_prefix'))],
+    ]),
+    ('birth_year_special', COMPLEXITY_HIGH, [
+        [('${birth_year} ${special}', ('birth_year', 'special_suffix')),
+         ('c ${birth_year} ${special}',
+          ('capitalize', 'birth_year', 'special_suffix'))],
+    ]),
+    ('reversal', COMPLEXITY_EXTREME, [
+        [('r', ('reversal',)),
+         ('r c', ('reversal', 'capitalize'))],
+        [('r ${digit}', ('reversal', 'digit_suffix'))],
+    ]),
+]
+
+RULE_GROUPS = {name: groups for name, _, groups in RULE_SETS}
+
+# Compiled programs kept per weight table before the memo is reset
+RULE_PROGRAM_MEMO = 1024
+
+# Stage of the rules loaded from Config.rules_file
+CUSTOM_RULE_STAGE = 'rules'
+
+
+def rule_invert_capitalize(word):
+    return word[:1].lower() + word[1:].upper()
+
+
+def rule_reverse(word):
+    return word[::-1]
+
+
+def rule_duplicate(word):
+    return word + word
+
+
+def rule_drop_first(word):
+    return word[1:]
+
+
+def rule_drop_last(word):
+    return word[:-1]
+
+
+def rule_append(suffix, word):
+    return word + suffix
+
+
+def rule_prepend(prefix, word):
+    return prefix + word
+
+
+def rule_replace(old, new, word):
+    return word.replace(old, new)
+
+
+def rule_purge(char, word):
+    return word.replace(char, '')
+
+
+RULE_FUNCTIONS = {
+    'l': str.lower,
+    'u': str.upper,
+    'c': str.capitalize,
+    'C': rule_invert_capitalize,
+    't': str.swapcase,
+    'r': rule_reverse,
+    'd': rule_duplicate,
+    '[': rule_drop_first,
+    ']': rule_drop_last,
+    '$': rule_append,
+    '^': rule_prepend,
+    's': rule_replace,
+    '@': rule_purge,
+}
+
+# Number of argument characters each function takes
+RULE_ARITY = {'$': 1, '^': 1, 's': 2, '@': 1}
+
+
+def rule_function(code, args):
+    """The one-argument function applying a parsed rule function."""
+    function = RULE_FUNCTIONS[code]
+    return partial(function, *args) if args else function
+
 
-    for word in base_words:
-        if not word:
+@lru_cache(maxsize=4096)
+def parse_rule(text):
+    """Parse a rule into (function, args, variable) operations.
+
+    `variable` names the RULE_VARIABLES entry a $ or ^ function takes
+    its argument from, or is None. No-op functions are dropped.
+    """
+    ops = []
+    i = 0
+    while i < len(text):
+        code = text[i]
+        i += 1
+        if code in ' :':
             continue
+        if code == 'L':
+            if text[i:].strip(' :'):
+                raise ValueError(f"L must end the rule in '{text}'.")
+            ops.append(('L', (), None))
+            break
+        if code not in RULE_FUNCTIONS:
+            raise ValueError(f"Unsupported rule function '{code}' in "
+                             f"'{text}'.")
+        arity = RULE_ARITY.get(code, 0)
+        if code in '$^' and text[i:i + 1] == '{':
+            close = text.find('}', i)
+            name = text[i + 1:close]
+            if close > 0 and name in RULE_VARIABLES:
+                ops.append((code, (), name))
+                i = close + 1
+                continue
+        args = tuple(text[i:i + arity])
+        if len(args) != arity:
+            raise ValueError(f"Missing argument of '{code}' in '{text}'.")
+        ops.append((code, args, None))
+        i += arity
+    return tuple(ops)
 
-        cap = word.capitalize()
 
-        # Base word and case variants (all levels)
-        wordlist.add(word)
-        wordlist.add(cap)
-        wordlist.add(word.upper())
-
-        # Leet-speak variants
-        wordlist.update(apply_leet_variants(word, level))
-
-        # Suffix and prefix digits 0-9
-        for i in range(10):
-            wordlist.add(f"{word}{i}")
-            wordlist.add(f"{cap}{i}")
-            wordlist.add(f"{i}{word}")
-
-        # Birth year suffixes
-        if birth_year:
-            wordlist.add(f"{word}{birth_year}")
-            wordlist.add(f"{word}{birth_year_short}")
-            wordlist.add(f"{cap}{birth_year}")
-            wordlist.add(f"{cap}{birth_year_short}")
-
-        # Medium+ complexity
-        if level >= COMPLEXITY_MEDIUM:
-            for suffix in COMMON_SUFFIXES:
-                wordlist.add(f"{word}{suffix}")
-                wordlist.add(f"{cap}{suffix}")
-
-            for num in date_numbers:
-                wordlist.add(f"{word}{num}")
-                wordlist.add(f"{cap}{num}")
-
-        # High+ complexity
-        if level >= COMPLEXITY_HIGH:
-            for char in SPECIAL_CHARS:
-                wordlist.add(f"{word}{char}")
-                wordlist.add(f"{cap}{char}")
-                wordlist.add(f"{char}{word}")
-                wordlist.add(f"{char}{cap}")
-
-            if birth_year:
-                for char in SPECIAL_CHARS:
-                    wordlist.add(f"{word}{birth_year}{char}")
-                    wordlist.add(f"{cap}{birth_year}{char}")
-
-        # Extreme complexity
-        if level >= COMPLEXITY_EXTREME:
-            reversed_word = word[::-1]
-            rev_cap = reversed_word.capitalize()
-            wordlist.add(reversed_word)
-            wordlist.add(rev_cap)
-            for i in range(10):
-                wordlist.add(f"{reversed_word}{i}")
-
-    # Name combinations (medium+)
-    if level >= COMPLEXITY_MEDIUM:
-        name_parts = [n.lower() for n in [target.first_name,
-                      target.middle_name, target.last_name] if n]
-
-        # All ordered pairs of name parts
-        for i, a in enumerate(name_parts):
-            for j, b in enumerate(name_parts):
-                if i != j:
-                    combined = f"{a}{b}"
-                    wordlist.add(combined)
-                    wordlist.add(combined.capitalize())
-                    # CamelCase
-                    wordlist.add(f"{a.capitalize()}{b.capitalize()}")
-                    # Separator combinations
-                    for sep in SEPARATORS:
-                        wordlist.add(f"{a}{sep}{b}")
-
-                    if birth_year:
-                        wordlist.add(f"{combined}{birth_year}")
-                        wordlist.add(f"{combined}{birth_year_short}")
-
-        # First name + pet/children/spouse combinations
-        if target.first_name:
-            fn = target.first_name.lower()
-            combo_names = (
-                [p.lower() for p in target.pet_names if p]
-                + [c.lower() for c in target.children_names if c]
-                + ([target.spouse_name.lower()] if target.spouse_name else [])
-            )
-            for name in combo_names:
-                wordlist.add(f"{fn}{name}")
-                wordlist.add(f"{name}{fn}")
-                wordlist.add(f"{fn.capitalize()}{name.capitalize()}")
+def apply_rule_ops(ops, word):
+    """Apply expanded (function, args) operations to one word."""
+    for code, args in ops:
+        word = rule_function(code, args)(word)
+    return word
+
+
+def hashcat_rule(ops):
+    """Spell expanded operations in plain hashcat rule syntax."""
+    parts = []
+    for code, args in ops:
+        if code == '$':
+            parts.extend(f'${char}' for char in args[0])
+        elif code == '^':
+            parts.extend(f'^{char}' for char in reversed(args[0]))
+        else:
+            parts.append(code + ''.join(args))
+    return ''.join(parts) or ':'
+
+
+def rule_variables(ctx):
+    """The values each rule variable takes for a context."""
+    birth_year = [ctx.birth_year] if ctx.birth_year else []
+    return {
+        'digit': [str(i) for i in range(10)],
+        'special': SPECIAL_CHARS,
+        'suffix': COMMON_SUFFIXES,
+        'birth_year': birth_year,
+        'birth_year_short': [ctx.birth_year_short] if birth_year else [],
+        'date_number': ctx.date_numbers,
+    }
+
+
+def rule_weight(names, weights):
+    """Product of named weights, folded from the right."""
+    weight = 1.0
+    for name in reversed(names):
+        weight = weights[name] * weight
+    return weight
+
+
+def group_variables(group):
+    """Names of the variables a group's rules use, in order of use."""
+    used = []
+    for text, _ in group:
+        for _, _, variable in parse_rule(text):
+            if variable and variable not in used:
+                used.append(variable)
+    return used
+
+
+# Variables used by each built-in stage
+RULE_GROUP_VARIABLES = {
+    name: sorted({variable for group in groups
+                  for variable in group_variables(group)})
+    for name, groups in RULE_GROUPS.items()
+}
+
+
+def expand_rule_group(group, variables, weights):
+    """Yield (ops, weight) for every variable assignment of a group."""
+    parsed = [(parse_rule(text), rule_weight(names, weights))
+              for text, names in group]
+    used = group_variables(group)
+    for values in product(*(variables[name] for name in used)):
+        assignment = dict(zip(used, values))
+        for ops, weight in parsed:
+            yield tuple((code, (assignment[variable],) if variable else args)
+                        for code, args, variable in ops), weight
+
+
+# How a compiled rule produces its candidate from its source slot
+RULE_STORED, RULE_APPEND, RULE_PREPEND, RULE_CALL, RULE_LEET = range(5)
+
+# Functions that may change the case of letters, and that may remove or
+# replace characters a rule or its stem contributed
+RULE_CASE_FUNCTIONS = 'lucCt'
+RULE_EDIT_FUNCTIONS = '[]s@'
+
+
+@dataclass(frozen=True)
+class RuleShape:
+    """What a rule's output is known to look like before it is built.
+
+    For ASCII stems the output has scale * len(stem) + extra characters
+    when `exact`. It contains the classes of the stem and of `adds`, and
+    both letter cases when `cases` and there are letters. Unless `edits`,
+    it keeps every stem character and every non-letter in `appends`.
+    """
+    scale: int = 1
+    extra: int = 0
+    exact: bool = True
+    adds: frozenset = frozenset()
+    cases: bool = False
+    edits: bool = False
+    appends: frozenset = frozenset()
+
+
+def rule_shape(ops):
+    """Derive the RuleShape of expanded operations (without L)."""
+    scale, extra, exact = 1, 0, True
+    added = ''
+    cases = edits = False
+    for code, args in ops:
+        if code in '$^':
+            extra += len(args[0])
+            added += args[0]
+        elif code == 'd':
+            scale, extra = 2 * scale, 2 * extra
+        elif code in RULE_EDIT_FUNCTIONS:
+            edits = True
+            exact = exact and code == 's'
+            if code == 's':
+                added += args[1]
+        cases = cases or code in RULE_CASE_FUNCTIONS
+    return RuleShape(scale, extra, exact, frozenset(char_classes(added)),
+                     cases, edits,
+                     frozenset(ch for ch in added if not ch.isalpha()))
+
+
+def shape_may_comply(shape, policy, length, stem_classes, stem_fits):
+    """False when no output of this shape can satisfy the policy.
+
+    `length` is the stem's length, or None when it does not predict the
+    output length; `stem_fits` tells whether the stem's non-letters are
+    all in the charset.
+    """
+    if (length is not None and shape.exact
+            and not policy.length_fits(shape.scale * length + shape.extra)):
+        return False
+    if policy.charset is not None and not shape.edits:
+        if not stem_fits or not policy.charset.issuperset(shape.appends):
+            return False
+    if policy.required:
+        classes = stem_classes | shape.adds
+        if shape.cases and classes & {'lower', 'upper'}:
+            classes = classes | {'lower', 'upper'}
+        if not policy.required <= classes:
+            return False
+    return True
+
+
+class RuleProgram:
+    """One stage's rules compiled into steps that share common prefixes.
+
+    Every prefix that starts more than one rule gets one value slot, so
+    e.g. the capitalized or reversed word is built once per word for all
+    rules starting with it. A leading c reuses the caller's `cap`. A
+    rule's last function is applied inline, as a plain concatenation for
+    appends and prepends, unless another rule extends it.
+    """
+
+    def __init__(self, rules, name=''):
+        self.name = name
+        stored = {ops[:k] for ops, _ in rules for k in range(1, len(ops))}
+        stored.update(ops[:-1] for ops, _ in rules
+                      if ops and ops[-1][0] == 'L')
+        slots = {(): 0}
+        self.cap_slot = None
+        self.rules = []
+        self.ops = [ops for ops, _ in rules]
+        self.shapes = [rule_shape(ops[:-1] if ops and ops[-1][0] == 'L'
+                                  else ops) for ops, _ in rules]
+        for ops, weight in rules:
+            mode, arg = RULE_STORED, None
+            if ops and ops[-1][0] == 'L':
+                mode, ops = RULE_LEET, ops[:-1]
+            elif ops and ops not in stored and ops != (('c', ()),):
+                code, args = ops[-1]
+                if code == '$':
+                    mode, arg = RULE_APPEND, args[0]
+                elif code == '^':
+                    mode, arg = RULE_PREPEND, args[0]
+                else:
+                    mode, arg = RULE_CALL, rule_function(code, args)
+                ops = ops[:-1]
+            steps = []
+            for k in range(1, len(ops) + 1):
+                prefix = ops[:k]
+                if prefix in slots:
+                    continue
+                slots[prefix] = len(slots)
+                code, args = ops[k - 1]
+                if k == 1 and code == 'c':
+                    self.cap_slot = slots[prefix]
+                    continue
+                steps.append((slots[prefix], slots[ops[:k - 1]],
+                              rule_function(code, args)))
+            self.rules.append((mode, steps, slots[ops], arg, weight))
+        self.slots = len(slots)
+        # Slots of the earlier rules that end in the same function, whose
+        # candidates repeat this rule's wherever their values are equal
+        self.twins = []
+        endings = {}
+        for ops, (mode, _, slot, _, _) in zip(self.ops, self.rules):
+            if mode == RULE_LEET:
+                self.twins.append(())
+                continue
+            ending = (mode, ops[-1]) if mode != RULE_STORED else (mode,)
+            earlier = endings.setdefault(ending, [])
+            self.twins.append(tuple(other for other in earlier
+                                    if other != slot))
+            earlier.append(slot)
+
+    def run(self, word, cap, ctx):
+        """Lazily yield (candidate, weight) for every rule in order."""
+        if ctx.policy is not None:
+            return self._run_policy(word, cap, ctx, ctx.policy)
+        return self._run(word, cap, ctx)
+
+    def _run(self, word, cap, ctx):
+        values = [word] * self.slots
+        if self.cap_slot is not None:
+            values[self.cap_slot] = cap
+        for mode, steps, slot, arg, weight in self.rules:
+            for target, source, function in steps:
+                values[target] = function(values[source])
+            if mode == RULE_APPEND:
+                yield values[slot] + arg, weight
+            elif mode == RULE_PREPEND:
+                yield arg + values[slot], weight
+            elif mode == RULE_STORED:
+                yield values[slot], weight
+            elif mode == RULE_CALL:
+                yield arg(values[slot]), weight
+            else:
+                value = values[slot]
+                substitution = ctx.weights['leet']
+                for variant, count in iter_leet(
+                        value, leet_positions(value, ctx.leet_table),
+                        ctx.level >= COMPLEXITY_EXTREME, ctx.leet_budget):
+                    yield variant, weight * substitution ** count
+
+    def _run_policy(self, word, cap, ctx, policy):
+        """run() that skips rules whose shape cannot satisfy the policy
+        and checks the candidates of the others, counting both in
+        ctx.pruned."""
+        length = len(word) if word.isascii() else None
+        stem_classes = char_classes(word)
+        stem_fits = (policy.charset is None or policy.charset.issuperset(
+            ch for ch in word if not ch.isalpha()))
+        accepts = policy.accepts
+        pruned = 0
+        values = [word] * self.slots
+        if self.cap_slot is not None:
+            values[self.cap_slot] = cap
+        try:
+            for (mode, steps, slot, arg, weight), shape in zip(self.rules,
+                                                               self.shapes):
+                for target, source, function in steps:
+                    values[target] = function(values[source])
+                if mode == RULE_LEET:
+                    for item in self._leet_policy(values[slot], weight, ctx,
+                                                  policy):
+                        if item is None:
+                            pruned += 1
+                        else:
+                            yield item
+                    continue
+                if not shape_may_comply(shape, policy, length, stem_classes,
+                                        stem_fits):
+                    pruned += 1
+                    continue
+                if mode == RULE_APPEND:
+                    candidate = values[slot] + arg
+                elif mode == RULE_PREPEND:
+                    candidate = arg + values[slot]
+                elif mode == RULE_STORED:
+                    candidate = values[slot]
+                else:
+                    candidate = arg(values[slot])
+                if accepts(candidate):
+                    yield candidate, weight
+                else:
+                    pruned += 1
+        finally:
+            ctx.pruned[self.name] = ctx.pruned.get(self.name, 0) + pruned
+
+    @staticmethod
+    def _leet_policy(value, weight, ctx, policy):
+        """Leet variants the policy accepts, None for each rejected one.
+
+        The whole expansion is skipped when single-character
+        replacements keep the length out of bounds, or when no
+        replacement can add a required class.
+        """
+        positions = leet_positions(value, ctx.leet_table)
+        combinatorial = ctx.level >= COMPLEXITY_EXTREME
+        options = [option for _, opts in positions for option in opts[1:]]
+        classes = char_classes(value).union(*map(char_classes, options))
+        fixed = all(len(option) == 1 for option in options)
+        if ((fixed and not policy.length_fits(len(value)))
+                or not policy.required <= classes):
+            yield from [None] * count_leet(positions, combinatorial,
+                                           ctx.leet_budget)
+            return
+        substitution = ctx.weights['leet']
+        for variant, count in iter_leet(value, positions, combinatorial,
+                                        ctx.leet_budget):
+            if policy.accepts(variant):
+                yield variant, weight * substitution ** count
+            else:
+                yield None
+
+    def count(self, word, cap, ctx):
+        """Number of candidates run() yields for a word.
+
+        Under a policy this is an upper bound: rules are only pruned by
+        shape, not by checking their candidates.
+        """
+        total = 0
+        values = [word] * self.slots
+        if self.cap_slot is not None:
+            values[self.cap_slot] = cap
+        for mode, steps, slot, _, _ in self.rules:
+            for target, source, function in steps:
+                values[target] = function(values[source])
+            if mode != RULE_LEET:
+                total += 1
+                continue
+            total += count_leet(leet_positions(values[slot], ctx.leet_table),
+                                ctx.level >= COMPLEXITY_EXTREME,
+                                ctx.leet_budget)
+        policy = ctx.policy
+        if policy is not None:
+            length = len(word) if word.isascii() else None
+            stem_classes = char_classes(word)
+            stem_fits = (policy.charset is None or policy.charset.issuperset(
+                ch for ch in word if not ch.isalpha()))
+            total -= sum(1 for (mode, *_), shape in zip(self.rules,
+                                                        self.shapes)
+                         if mode != RULE_LEET and not shape_may_comply(
+                             shape, policy, length, stem_classes, stem_fits))
+        return total
+
+    def expand_block(self, words, ctx):
+        """Apply every rule to a block of words at once, as text.
+
+        Returns (text, count), where text holds the count
+        newline-terminated candidates rule by rule rather than word by
+        word. Each slot is computed for the whole block, and the
+        candidates of an append, prepend or stored rule are produced by
+        one str.join over its slot, so none of them exists as its own
+        str. A rule skips the words whose value equals that of an earlier
+        rule ending in the same function, which drops the usual
+        repeats (e.g. the capitalized form of '2fast'); other duplicates
+        are kept. The password policy is not applied. Only mangle
+        expands blocks; iter_candidates runs each stem through _run.
+        """
+        columns = [words] * self.slots
+        if self.cap_slot is not None:
+            columns[self.cap_slot] = [word.capitalize() for word in words]
+        distinct = {}
+        parts = []
+        count = 0
+        for (mode, steps, slot, arg, weight), twins in zip(self.rules,
+                                                           self.twins):
+            for target, source, function in steps:
+                columns[target] = list(map(function, columns[source]))
+            if mode == RULE_LEET:
+                substitution = ctx.weights['leet']
+                for value in columns[slot]:
+                    for variant, _ in iter_leet(
+                            value, leet_positions(value, ctx.leet_table),
+                            ctx.level >= COMPLEXITY_EXTREME,
+                            ctx.leet_budget):
+                        parts.append(variant)
+                        parts.append('\n')
+                        count += 1
+                continue
+            column = columns[slot]
+            if twins:
+                key = (slot, twins)
+                if key not in distinct:
+                    distinct[key] = [
+                        value for value, *others in zip(
+                            column, *(columns[twin] for twin in twins))
+                        if value not in others]
+                column = distinct[key]
+            if not column:
+                continue
+            count += len(column)
+            if mode == RULE_APPEND:
+                separator = arg + '\n'
+                parts.append(separator.join(column))
+                parts.append(separator)
+            elif mode == RULE_PREPEND:
+                parts.append(arg)
+                parts.append(('\n' + arg).join(column))
+                parts.append('\n')
+            else:
+                if mode == RULE_CALL:
+                    column = map(arg, column)
+                parts.append('\n'.join(column))
+                parts.append('\n')
+        return ''.join(parts), count
+
+
+def load_rules(path):
+    """Load custom rules, one per line; '#' starts a comment line."""
+    if not path:
+        return []
+    rules = []
+    with open(path) as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line or line.startswith('#'):
+                continue
+            parse_rule(line)
+            rules.append(line)
+    return rules
+
+
+def stage_rule_groups(name, custom_rules=()):
+    """The rule groups of a stage; each custom rule is its own group."""
+    if name == CUSTOM_RULE_STAGE:
+        return [[(rule, ('rule',))] for rule in custom_rules]
+    return RULE_GROUPS[name]
+
+
+@lru_cache(maxsize=16)
+def compiled_rule_programs(weights, custom_rules):
+    """Memo of the RulePrograms compiled for one weight table and rule
+    file, keyed by (stage, values of the variables the stage uses), so a
+    stage is compiled once for all targets that agree on those values.
+    """
+    return {}
+
+
+def compile_rule_sets(ctx, custom_rules=()):
+    """Compile every stage's rules for a context into RulePrograms."""
+    custom_rules = tuple(custom_rules)
+    variables = rule_variables(ctx)
+    memo = compiled_rule_programs(tuple(sorted(ctx.weights.items())),
+                                  custom_rules)
+    if len(memo) > RULE_PROGRAM_MEMO:
+        memo.clear()
+    programs = {}
+    for name in list(RULE_GROUPS) + [CUSTOM_RULE_STAGE]:
+        groups = stage_rule_groups(name, custom_rules)
+        if name == CUSTOM_RULE_STAGE:
+            used = sorted({variable for group in groups
+                           for variable in group_variables(group)})
+        else:
+            used = RULE_GROUP_VARIABLES[name]
+        key = (name,) + tuple(tuple(variables[variable])
+                              for variable in used)
+        program = memo.get(key)
+        if program is None:
+            program = memo[key] = RuleProgram(
+                [rule for group in groups
+                 for rule in expand_rule_group(group, variables,
+                                               ctx.weights)], name)
+        programs[name] = program
+    return programs
+
+
+def run_rule_stage(name, word, cap, ctx):
+    """Stage function of a compiled rule set."""
+    return ctx.programs[name].run(word, cap, ctx)
+
+
+def count_rule_stage(name, word, ctx):
+    """Counter of a compiled rule set."""
+    return ctx.programs[name].count(word, word.capitalize(), ctx)
+
+
+# --- Cross-word stages ---
+# Target stages take (target, ctx) and yield cross-word combinations.
+# Every candidate is yielded as (candidate, weight), where the weight is
+# the product of the weights of the transformations that produced it.
+
+
+def target_name_parts(target):
+    """Lowercased first, middle and last names that are set."""
+    return [n.lower() for n in [target.first_name,
+            target.middle_name, target.last_name] if n]
+
+
+def target_combo_names(target):
+    """Lowercased pet, children and spouse names combined with the first."""
+    return ([p.lower() for p in target.pet_names if p]
+            + [c.lower() for c in target.children_names if c]
+            + ([target.spouse_name.lower()] if target.spouse_name else []))
+
+
+def pair_may_fit(ctx, name, length, extras, count):
+    """False when the policy's length bounds reject `length` plus every
+    extra; the pair's `count` candidates are then counted as pruned."""
+    if ctx.policy is None or any(ctx.policy.length_fits(length + extra)
+                                 for extra in extras):
+        return True
+    ctx.pruned[name] = ctx.pruned.get(name, 0) + count
+    return False
+
+
+def stage_name_pairs(target, ctx):
+    """All ordered pairs of first, middle and last name."""
+    w = ctx.weights
+    combo = w['name_combo']
+    capped = combo * w['capitalize']
+    separated = combo * w['separator']
+    name_parts = target_name_parts(target)
+    # Lengths added to a pair, and candidates built from each pair
+    extras = (0, 1)
+    if ctx.birth_year:
+        extras += (len(ctx.birth_year), len(ctx.birth_year_short))
+    per_pair = 3 + len(SEPARATORS) + (2 if ctx.birth_year else 0)
+
+    for i, a in enumerate(name_parts):
+        for j, b in enumerate(name_parts):
+            if i != j and pair_may_fit(ctx, 'name_pairs', len(a) + len(b),
+                                       extras, per_pair):
+                combined = f"{a}{b}"
+                yield combined, combo
+                yield combined.capitalize(), capped
+                # CamelCase
+                yield f"{a.capitalize()}{b.capitalize()}", capped
+                # Separator combinations
                 for sep in SEPARATORS:
-                    wordlist.add(f"{fn}{sep}{name}")
+                    yield f"{a}{sep}{b}", separated
+
+                if ctx.birth_year:
+                    yield (f"{combined}{ctx.birth_year}",
+                           combo * w['birth_year'])
+                    yield (f"{combined}{ctx.birth_year_short}",
+                           combo * w['birth_year_short'])
+
+
+def stage_first_name_combos(target, ctx):
+    """First name combined with pet, children and spouse names."""
+    if not target.first_name:
+        return
+    w = ctx.weights
+    combo = w['name_combo']
+    capped = combo * w['capitalize']
+    separated = combo * w['separator']
+    fn = target.first_name.lower()
+    for name in target_combo_names(target):
+        if not pair_may_fit(ctx, 'first_name_combos', len(fn) + len(name),
+                            (0, 1), 3 + len(SEPARATORS)):
+            continue
+        yield f"{fn}{name}", combo
+        yield f"{name}{fn}", combo
+        yield f"{fn.capitalize()}{name.capitalize()}", capped
+        for sep in SEPARATORS:
+            yield f"{fn}{sep}{name}", separated
+
 
-    # Extreme: reversed name combos
-    if level >= COMPLEXITY_EXTREME and target.first_name and target.last_name:
+def stage_reversed_name_combos(target, ctx):
+    """First and last name joined with the other one reversed."""
+    if target.first_name and target.last_name:
+        weight = ctx.weights['name_combo'] * ctx.weights['reversal']
         fn = target.first_name.lower()
         ln = target.last_name.lower()
-        wordlist.add(f"{fn}{ln[::-1]}")
-        wordlist.add(f"{ln}{fn[::-1]}")
+        yield f"{fn}{ln[::-1]}", weight
+        yield f"{ln}{fn[::-1]}", weight
 
-    # Sort first, then truncate (fixes non-deterministic output bug)
-    target_size = config.target_size
-    total_unique = len(wordlist)
-    wordlist_sorted = sorted(wordlist)
 
-    if len(wordlist_sorted) > target_size:
-        wordlist_sorted = wordlist_sorted[:target_size]
+# --- Combination engine ---
+# Joins up to ctx.combine target tokens into one candidate: two or more
+# words (names, pets, children, hobbies) with a separator, or one or
+# more words followed by a number (birth year or date), each optionally
+# ending in a special character, e.g. 'alice.max2019!'. Sequences are
+# enumerated depth first and a branch is abandoned as soon as no
+# completion of it fits the length budget or the policy's bounds.
 
-    # Bulk write
-    with open(config.output_file, 'w') as f:
-        f.write('\n'.join(wordlist_sorted) + '\n')
 
-    generated_count = len(wordlist_sorted)
-    print(f"\nWordlist generated with {generated_count} entries.")
-    if total_unique > target_size:
-        print(f"({total_unique} unique words generated; "
-              f"capped to {target_size} by size setting.)")
-    elif total_unique < target_size:
-        print(f"(Only {total_unique} unique words could be generated "
-              f"from the provided information.)")
-        print("Tip: Add more target details or increase complexity "
-              "for a larger wordlist.")
-    print(f"Saved to: {os.path.abspath(config.output_file)}")
-    input("Press Enter to continue...")
+def parse_styles(text):
+    """Split a comma-separated list of COMBINE_STYLES names."""
+    styles = tuple(dict.fromkeys(name.strip() for name in text.split(',')
+                                 if name.strip()))
+    unknown = set(styles) - set(COMBINE_STYLES)
+    if unknown:
+        raise ValueError(f"Unknown combination styles: "
+                         f"{', '.join(sorted(unknown))}")
+    if not styles:
+        raise ValueError("At least one combination style is required.")
+    return styles
 
 
-def view_configuration(target, config):
-    """Display current configuration and target information"""
-    clear_screen()
-    print("\n===== CURRENT CONFIGURATION =====")
+def combination_tokens(target, ctx):
+    """Distinct (words, numbers) the combination engine joins."""
+    words = []
+    for value in ([target.first_name, target.middle_name, target.last_name,
+                   target.spouse_name] + target.pet_names
+                  + target.children_names + target.hobbies_teams):
+        token = ''.join(value.lower().split()) if value else ''
+        if token and token not in words:
+            words.append(token)
+    numbers = []
+    for value in ([ctx.birth_year, ctx.birth_year_short] + ctx.date_numbers):
+        if value and value not in numbers:
+            numbers.append(value)
+    return words, numbers
 
-    print("\n--- TARGET INFORMATION ---")
-    fields = [
-        ('First Name', target.first_name),
-        ('Middle Name', target.middle_name),
-        ('Last Name', target.last_name),
-        ('Birth Year', target.birth_year),
-        ('Spouse Name', target.spouse_name),
-        ('Pet Names', target.pet_names),
-        ('Children Names', target.children_names),
-        ('Important Dates', target.important_dates),
-        ('Hobbies Teams', target.hobbies_teams),
-    ]
-    for label, value in fields:
-        if isinstance(value, list):
-            print(f"{label}: {', '.join(value) if value else 'None'}")
-        else:
-            print(f"{label}: {value if value else ''}")
 
-    print("\n--- WORDLIST CONFIGURATION ---")
-    print(f"Size: {config.size.title()} ({config.target_size} words)")
-    print(f"Complexity: {config.complexity.title()}")
-    print(f"Output file: {config.output_file}")
+def combination_tails(numbers, ctx):
+    """(suffix, weight, is_number) endings of a combination."""
+    w = ctx.weights
+    weights = {ctx.birth_year: w['birth_year'],
+               ctx.birth_year_short: w['birth_year_short']}
+    heads = [('', 1.0, False)] + [
+        (number, weights.get(number, w['date_number']), True)
+        for number in numbers]
+    return [(head + special, weight * special_weight, is_number)
+            for head, weight, is_number in heads
+            for special, special_weight in
+            [('', 1.0)] + [(c, w['special_suffix']) for c in SPECIAL_CHARS]]
 
-    input("\nPress Enter to continue...")
+
+def combination_bounds(ctx):
+    """(low, high) candidate lengths the budget and policy allow."""
+    low, high = 0, ctx.combine_length
+    policy = ctx.policy
+    if policy is not None:
+        low = policy.min_length
+        if policy.max_length:
+            high = min(high, policy.max_length)
+    return low, high
+
+
+def style_words(style, words):
+    if style == 'lower':
+        return words
+    if style == 'upper':
+        return [word.upper() for word in words]
+    if style == 'camel':
+        return [word.capitalize() for word in words]
+    return [words[0].capitalize()] + words[1:]
+
+
+def style_weight(style, weights):
+    if style == 'lower':
+        return 1.0
+    return weights['upper' if style == 'upper' else 'capitalize']
+
+
+def iter_word_sequences(words, arity, gap, low, high, longest_tail):
+    """Depth-first (sequence, length) of 1..arity distinct words.
+
+    A branch is cut when its words alone exceed `high`, or when even the
+    longest words and tail cannot bring it up to `low`.
+    """
+    longest = sorted(map(len, words), reverse=True)
+    # most[m] bounds the length m more words (and their gaps) can add
+    most = [0]
+    for length in longest[:arity]:
+        most.append(most[-1] + length + gap)
+    most += [most[-1]] * (arity + 1 - len(most))
+
+    def extend(sequence, used, length):
+        yield sequence, length
+        depth = len(sequence)
+        if depth == arity:
+            return
+        for index, word in enumerate(words):
+            if index in used:
+                continue
+            grown = length + len(word) + (gap if depth else 0)
+            if grown > high:
+                continue
+            if grown + most[arity - depth - 1] + longest_tail < low:
+                continue
+            yield from extend(sequence + [word], used | {index}, grown)
+
+    yield from extend([], frozenset(), 0)
+
+
+def stage_combinations(target, ctx):
+    """Separated and cased joins of up to ctx.combine target tokens."""
+    if ctx.combine < 2:
+        return
+    words, numbers = combination_tokens(target, ctx)
+    w = ctx.weights
+    policy = ctx.policy
+    low, high = combination_bounds(ctx)
+    tails = combination_tails(numbers, ctx)
+    longest_tail = max(len(tail) for tail, _, _ in tails)
+    emitted = 0
+    for sep in [''] + SEPARATORS:
+        gap = len(sep)
+        separated = w['separator'] if sep else 1.0
+        styles = ctx.combine_styles
+        # The styles each tail is built with; under a policy, only those
+        # that can hold every required class
+        endings = [(tail, weight, is_number, styles)
+                   for tail, weight, is_number in tails]
+        if policy is not None and policy.required:
+            bounds = {style: char_classes(sep.join(style_words(style, words)))
+                      for style in styles}
+            endings = [
+                (tail, weight, is_number,
+                 [style for style in styles if policy.required
+                  <= bounds[style] | char_classes(tail)])
+                for tail, weight, is_number, _ in endings]
+        for sequence, length in iter_word_sequences(
+                words, ctx.combine, gap, low, high, longest_tail):
+            if not sequence:
+                continue
+            joined = {style: sep.join(style_words(style, sequence))
+                      for style in styles}
+            weight = w['name_combo'] ** (len(sequence) - 1)
+            if len(sequence) > 1:
+                weight *= separated
+            for tail, tail_weight, is_number, tail_styles in endings:
+                count = len(sequence) + is_number
+                if count < 2 or count > ctx.combine:
+                    continue
+                if not low <= length + len(tail) <= high:
+                    continue
+                for style in tail_styles:
+                    candidate = joined[style] + tail
+                    if policy is not None and not policy.accepts(candidate):
+                        continue
+                    emitted += 1
+                    yield (candidate, weight * tail_weight
+                           * style_weight(style, w))
+    if policy is not None:
+        # Everything the length budget alone would have allowed
+        budget = count_combinations(target, ctx, (0, ctx.combine_length))
+        ctx.pruned['combinations'] = (ctx.pruned.get('combinations', 0)
+                                      + budget - emitted)
+
+
+# --- Candidate counting ---
+# Each stage has a counter that returns exactly how many candidates the
+# stage yields (duplicates included) without building any string.
+
+
+def count_leet(positions, combinatorial, budget=LEET_BUDGET):
+    """Number of variants iter_leet yields for a position table."""
+    if not positions or budget <= 0:
+        return 0
+    singles = sum(len(options) - 1 for _, options in positions)
+    total = 1
+    for _, options in positions:
+        total *= len(options)
+    if combinatorial and total - 1 <= budget:
+        return total - 1
+    count = min(singles, budget)
+    if combinatorial:
+        count += min(max(budget - singles, 0), total - 1 - singles)
+    return count
+
+
+def count_name_pairs(target, ctx):
+    k = len(target_name_parts(target))
+    per_pair = 3 + len(SEPARATORS) + (2 if ctx.birth_year else 0)
+    return k * (k - 1) * per_pair
+
+
+def count_first_name_combos(target, ctx):
+    if not target.first_name:
+        return 0
+    return len(target_combo_names(target)) * (3 + len(SEPARATORS))
+
+
+def count_reversed_name_combos(target, ctx):
+    return 2 if target.first_name and target.last_name else 0
+
+
+def count_combinations(target, ctx, bounds=None):
+    """Candidates stage_combinations yields within the length bounds.
+
+    Exact under a length budget; an upper bound when the policy also
+    requires character classes or a charset.
+    """
+    if ctx.combine < 2:
+        return 0
+    words, numbers = combination_tokens(target, ctx)
+    low, high = bounds or combination_bounds(ctx)
+    tails = combination_tails(numbers, ctx)
+    longest_tail = max(len(tail) for tail, _, _ in tails)
+    # Tail lengths by whether the tail holds a number, for range counts
+    tail_lengths = {flag: sorted(len(tail) for tail, _, is_number in tails
+                                 if is_number == flag)
+                    for flag in (False, True)}
+    total = 0
+    for sep in [''] + SEPARATORS:
+        for sequence, length in iter_word_sequences(
+                words, ctx.combine, len(sep), low, high, longest_tail):
+            for is_number, lengths in tail_lengths.items():
+                count = len(sequence) + is_number
+                if count < 2 or count > ctx.combine:
+                    continue
+                total += (bisect.bisect_right(lengths, high - length)
+                          - bisect.bisect_left(lengths, low - length))
+    return total * len(ctx.combine_styles)
+
+
+# (name, minimum complexity level, stage function, counter)
+WORD_STAGES = [
+    (name, min_level, partial(run_rule_stage, name),
+     partial(count_rule_stage, name))
+    for name, min_level, _ in RULE_SETS
+] + [
+    (CUSTOM_RULE_STAGE, COMPLEXITY_LOW,
+     partial(run_rule_stage, CUSTOM_RULE_STAGE),
+     partial(count_rule_stage, CUSTOM_RULE_STAGE)),
+]
+
+TARGET_STAGES = [
+    ('name_pairs', COMPLEXITY_MEDIUM, stage_name_pairs, count_name_pairs),
+    ('first_name_combos', COMPLEXITY_MEDIUM, stage_first_name_combos,
+     count_first_name_combos),
+    ('reversed_name_combos', COMPLEXITY_EXTREME, stage_reversed_name_combos,
+     count_reversed_name_combos),
+    ('combinations', COMPLEXITY_LOW, stage_combinations, count_combinations),
+]
+
+# Target stages that apply the password policy themselves
+POLICY_TARGET_STAGES = {'combinations'}
+
+
+@dataclass
+class CountEstimate:
+    """Candidate counts computed from the generation rules alone.
+
+    `units` maps (stem index, stage name) to the exact number of
+    candidates that stage yields for that stem; cross-word stages use a
+    stem index of None. Candidates built by more than one stage are
+    counted each time, so `total` is an upper bound on the number of
+    unique candidates, not an estimate of it.
+    """
+    units: dict = field(default_factory=dict)
+
+    @property
+    def total(self):
+        return sum(self.units.values())
+
+    @property
+    def stages(self):
+        totals = {}
+        for (_, name), count in self.units.items():
+            totals[name] = totals.get(name, 0) + count
+        return totals
+
+    def expected_entries(self, target_size):
+        """Upper bound on the entries a wordlist of this size will hold."""
+        return min(self.total, target_size)
+
+
+def estimate_candidates(target, config):
+    """Count the candidates a target will produce without generating them."""
+    ctx = build_context(target, config)
+    estimate = CountEstimate()
+    for index, word in enumerate(build_base_words(target)):
+        for name, min_level, _, counter in WORD_STAGES:
+            if ctx.level >= min_level:
+                estimate.units[(index, name)] = counter(word, ctx)
+    for name, min_level, _, counter in TARGET_STAGES:
+        if ctx.level >= min_level:
+            estimate.units[(None, name)] = counter(target, ctx)
+    return estimate
+
+
+def plan_budgets(estimate, target_size):
+    """Spread a size budget across (stem, stage) units by water-filling.
+
+    Small units are granted in full and whatever they leave unused is
+    shared evenly among the larger ones, so every stage of every stem
+    gets a fair share of the cap. Returns {unit: quota}.
+    """
+    if estimate.total <= target_size:
+        return dict(estimate.units)
+    quotas = {}
+    remaining = target_size
+    units = sorted(estimate.units.items(), key=lambda item: item[1])
+    for left, (unit, count) in zip(range(len(units), 0, -1), units):
+        share = -(-remaining // left)  # ceiling division
+        quotas[unit] = min(count, share)
+        remaining -= quotas[unit]
+    return quotas
+
+
+@dataclass
+class StageStats:
+    """Counters for one generation stage."""
+    candidates: int = 0
+    duplicates: int = 0
+    pruned: int = 0
+    seconds: float = 0.0
+
+
+class PipelineProfile:
+    """Per-stage counters and timers for the generation pipeline.
+
+    Stages are timed while their generators run, and a candidate counts
+    as a duplicate when any stage already produced it. Telling them apart
+    keeps every distinct candidate, in a CandidateStore to hold the cost
+    near its UTF-8 length. Selection time is what remains of the run
+    after generation and writing. Nothing is measured unless a profile
+    is passed in, so the pipeline pays only a per-stage check when
+    profiling is off.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.write_seconds = 0.0
+        self.bytes_written = 0
+        self.total_seconds = 0.0
+        self.writer = {'queue_peak': 0, 'stall_seconds': 0.0,
+                       'busy_seconds': 0.0}
+        self._seen = CandidateStore()
+
+    def wrap(self, name, items):
+        """Yield from a stage's generator while counting and timing it."""
+        stats = self.stages.setdefault(name, StageStats())
+        seen = self._seen
+        clock = time.perf_counter
+        items = iter(items)
+        while True:
+            started = clock()
+            try:
+                item = next(items)
+            except StopIteration:
+                stats.seconds += clock() - started
+                return
+            stats.seconds += clock() - started
+            stats.candidates += 1
+            if not seen.add(item[0]):
+                stats.duplicates += 1
+            yield item
+
+    def record_pruned(self, pruned):
+        """Add per-stage counts of candidates the policy removed."""
+        for name, count in pruned.items():
+            self.stages.setdefault(name, StageStats()).pruned += count
+
+    def record_write(self, seconds, bytes_written):
+        self.write_seconds += seconds
+        self.bytes_written += bytes_written
+
+    def record_pipeline(self, writer):
+        """Add a pipelined WordlistWriter's queue statistics."""
+        self.writer['queue_peak'] = max(self.writer['queue_peak'],
+                                        writer.queue_peak)
+        self.writer['stall_seconds'] += writer.stall_seconds
+        self.writer['busy_seconds'] += writer.busy_seconds
+
+    @property
+    def generate_seconds(self):
+        return sum(stats.seconds for stats in self.stages.values())
+
+    def as_dict(self):
+        generate = self.generate_seconds
+        return {
+            'stages': {name: vars(stats)
+                       for name, stats in self.stages.items()},
+            'phases': {
+                'generate': generate,
+                'select': max(self.total_seconds - generate
+                              - self.write_seconds, 0.0),
+                'write': self.write_seconds,
+                'total': self.total_seconds,
+            },
+            'bytes_written': self.bytes_written,
+            'writer': dict(self.writer),
+        }
+
+    def merge(self, report):
+        """Add the counters of another profile's as_dict() report."""
+        for name, values in report['stages'].items():
+            stats = self.stages.setdefault(name, StageStats())
+            stats.candidates += values['candidates']
+            stats.duplicates += values['duplicates']
+            stats.pruned += values['pruned']
+            stats.seconds += values['seconds']
+        self.write_seconds += report['phases']['write']
+        self.total_seconds += report['phases']['total']
+        self.bytes_written += report['bytes_written']
+        self.writer['queue_peak'] = max(self.writer['queue_peak'],
+                                        report['writer']['queue_peak'])
+        self.writer['stall_seconds'] += report['writer']['stall_seconds']
+        self.writer['busy_seconds'] += report['writer']['busy_seconds']
+
+    def format_table(self):
+        report = self.as_dict()
+        lines = [f"{'stage':<22} {'candidates':>12} {'duplicates':>12} "
+                 f"{'pruned':>12} {'seconds':>9}"]
+        for name, stats in report['stages'].items():
+            lines.append(f"{name:<22} {stats['candidates']:>12,} "
+                         f"{stats['duplicates']:>12,} "
+                         f"{stats['pruned']:>12,} "
+                         f"{stats['seconds']:>9.4f}")
+        lines.append('')
+        for phase, seconds in report['phases'].items():
+            lines.append(f"{phase:<22} {seconds:>9.4f}s")
+        lines.append(f"{'bytes written':<22} {report['bytes_written']:>12,}")
+        writer = report['writer']
+        if writer['queue_peak']:
+            lines.append(f"{'writer queue peak':<22} "
+                         f"{writer['queue_peak']:>12,}")
+            lines.append(f"{'writer stalls':<22} "
+                         f"{writer['stall_seconds']:>9.4f}s")
+            lines.append(f"{'writer thread busy':<22} "
+                         f"{writer['busy_seconds']:>9.4f}s")
+        return '\n'.join(lines)
+
+
+# --- Variant cache ---
+# Stage output depends on the stem, the complexity level, the rule tables
+# (weights, leet substitutions and budget) and, for a few stages, target
+# fields. The cache keys each (stem, stage) unit by exactly those inputs,
+# so editing one field only recomputes the units that read it, and
+# targets sharing a surname or team reuse each other's variants.
+
+# Context fields read by word stages besides the stem and rule tables
+STAGE_CONTEXT_FIELDS = {
+    'birth_year': ('birth_year', 'birth_year_short'),
+    'date_numbers': ('date_numbers',),
+    'birth_year_special': ('birth_year',),
+    CUSTOM_RULE_STAGE: ('birth_year', 'date_numbers'),
+}
+
+
+def target_stage_inputs(name, target, ctx):
+    """The target fields a cross-word stage reads."""
+    if name == 'name_pairs':
+        return [target_name_parts(target), ctx.birth_year,
+                ctx.birth_year_short]
+    if name == 'first_name_combos':
+        return [target.first_name.lower(), target_combo_names(target)]
+    if name == 'combinations':
+        return [combination_tokens(target, ctx), ctx.combine,
+                ctx.combine_styles, ctx.combine_length]
+    return [target.first_name.lower(), target.last_name.lower()]
+
+
+def rules_digest(ctx):
+    """Hash of the rule tables that every cached unit depends on."""
+    policy = ctx.policy
+    if policy is not None:
+        policy = [policy.min_length, policy.max_length,
+                  sorted(policy.required),
+                  sorted(policy.charset) if policy.charset else None]
+    payload = [VARIANT_CACHE_VERSION, marshal.version, ctx.level,
+               ctx.weights, sorted(ctx.leet_table.items()), ctx.leet_budget,
+               ctx.custom_rules, policy]
+    encoded = json.dumps(payload, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def unit_cache_keys(target, ctx, words, word_stages, target_stages):
+    """VariantCache keys of every (stem_index|None, stage) unit."""
+    rules = rules_digest(ctx)
+    keys = {}
+    for index, word in enumerate(words):
+        for name, _ in word_stages:
+            inputs = [getattr(ctx, attr)
+                      for attr in STAGE_CONTEXT_FIELDS.get(name, ())]
+            keys[(index, name)] = repr((rules, name, word, inputs))
+    for name, _ in target_stages:
+        inputs = target_stage_inputs(name, target, ctx)
+        keys[(None, name)] = repr((rules, name, inputs))
+    return keys
+
+
+class VariantCache:
+    """Size-bounded LRU store of stage output in an SQLite file.
+
+    Entries are marshalled (candidates, pruned) pairs, where candidates
+    is a (candidate, weight) list and pruned the number of candidates
+    the password policy removed. They load several
+    times faster than the stages rebuild them. New entries are held
+    marshalled in memory, up to VARIANT_CACHE_PENDING bytes, and use
+    times until flush(), so batch workers can share a cache file
+    without holding its lock for each unit they generate.
+    """
+
+    def __init__(self, path, max_bytes=VARIANT_CACHE_SIZE * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}
+        self._pending_bytes = 0
+        self._loaded = {}
+        self._used = {}
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        # A lost entry is only recomputed, so skip the fsync per commit
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        # Small columns first, so scans by size and use time never read
+        # the overflow pages of large entries
+        self._db.execute('CREATE TABLE IF NOT EXISTS variants ('
+                         'key TEXT PRIMARY KEY, size INTEGER NOT NULL, '
+                         'used REAL NOT NULL, data BLOB NOT NULL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS variants_used '
+                         'ON variants (used)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def prefetch(self, keys):
+        """Load the stored entries among keys with one query per batch."""
+        keys = [key for key in keys
+                if key not in self._loaded and key not in self._pending]
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            marks = ','.join('?' * len(batch))
+            for key, used, data in self._db.execute(
+                    f'SELECT key, used, data FROM variants '
+                    f'WHERE key IN ({marks})', batch):
+                self._loaded[key] = (used, data)
+
+    def variants(self, key, build):
+        """Return the cached (candidates, pruned) pair, building on a miss.
+
+        A built pair whose pruned count is None is an uncacheable unit
+        (see cached_unit) and is returned without being stored.
+        """
+        data = self._pending.get(key)
+        if data is not None:
+            return marshal.loads(data)
+        entry = self._loaded.pop(key, None)
+        if entry is None:
+            entry = self._db.execute(
+                'SELECT used, data FROM variants WHERE key = ?',
+                (key,)).fetchone()
+        if entry is not None:
+            self.hits += 1
+            used, data = entry
+            now = time.time()
+            # Recording every hit would rewrite hot rows on each run
+            if now - used > VARIANT_CACHE_TOUCH:
+                self._used[key] = now
+            return marshal.loads(data)
+        self.misses += 1
+        items = build()
+        if items[1] is None:
+            return items
+        data = marshal.dumps(items)
+        self._pending[key] = data
+        self._pending_bytes += len(data)
+        if self._pending_bytes > VARIANT_CACHE_PENDING:
+            with self._db:
+                self._store()
+        return items
+
+    def flush(self):
+        """Store new entries, record use times and evict past the bound."""
+        with self._db:
+            self._db.executemany(
+                'UPDATE variants SET used = ? WHERE key = ?',
+                [(used, key) for key, used in self._used.items()])
+            self._store()
+        self._loaded.clear()
+        self._used.clear()
+
+    def close(self):
+        if self._db is None:
+            return
+        self.flush()
+        self._db.close()
+        self._db = None
+
+    def _store(self):
+        now = time.time()
+        self._db.executemany(
+            'INSERT OR REPLACE INTO variants VALUES (?, ?, ?, ?)',
+            [(key, len(data), now, data)
+             for key, data in self._pending.items()])
+        self._evict()
+        self._pending.clear()
+        self._pending_bytes = 0
+
+    def _evict(self):
+        # Stored data never exceeds the pages in use, so most flushes
+        # can skip summing the entry sizes
+        pages = self._db.execute('PRAGMA page_count').fetchone()[0]
+        free = self._db.execute('PRAGMA freelist_count').fetchone()[0]
+        page_size = self._db.execute('PRAGMA page_size').fetchone()[0]
+        if (pages - free) * page_size <= self.max_bytes:
+            return
+        total = self._db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM variants').fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+        stale = []
+        for key, size in self._db.execute(
+                'SELECT key, size FROM variants ORDER BY used'):
+            stale.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany('DELETE FROM variants WHERE key = ?', stale)
+
+
+def cached_unit(name, items, pruned):
+    """List a unit's candidates with the number the policy pruned.
+
+    The count is moved out of `pruned`, so cache hits and misses both
+    add it back the same way. A unit longer than VARIANT_CACHE_UNIT is
+    too large to keep and returns as an iterator with a count of None;
+    its pruned candidates are counted in `pruned` as it is read.
+    """
+    before = pruned.pop(name, 0)
+    items = iter(items)
+    head = list(islice(items, VARIANT_CACHE_UNIT + 1))
+    if len(head) > VARIANT_CACHE_UNIT:
+        if before:
+            pruned[name] = pruned.get(name, 0) + before
+        return chain(head, items), None
+    count = pruned.pop(name, 0)
+    if before:
+        pruned[name] = before
+    return head, count
+
+
+def run_target_stage(name, stage, target, ctx):
+    """Run a cross-word stage; its output is filtered by the policy
+    unless the stage applies it itself."""
+    items = stage(target, ctx)
+    if ctx.policy is not None and name not in POLICY_TARGET_STAGES:
+        items = policy_filter(name, items, ctx.policy, ctx.pruned)
+    return items
+
+
+def iter_candidates(target, config, profile=None, cache=None, pruned=None):
+    """Lazily yield every (candidate, weight) pair, duplicates included.
+
+    With Config.balanced, each (stem, stage) unit stops after its
+    plan_budgets quota, so candidates beyond the cap are never built.
+    A PipelineProfile, when given, counts and times every stage, and a
+    VariantCache serves units whose inputs were generated before. Under
+    a password policy, candidates it rejects are counted per stage in
+    `pruned`.
+    """
+    ctx = build_context(target, config)
+    if pruned is not None:
+        ctx.pruned = pruned
+    word_stages = [(name, fn) for name, min_level, fn, _ in WORD_STAGES
+                   if ctx.level >= min_level]
+    target_stages = [(name, fn) for name, min_level, fn, _ in TARGET_STAGES
+                     if ctx.level >= min_level]
+    quotas = None
+    if config.balanced:
+        quotas = plan_budgets(estimate_candidates(target, config),
+                              config.target_size)
+    words = build_base_words(target)
+    if cache is not None:
+        keys = unit_cache_keys(target, ctx, words, word_stages, target_stages)
+        cache.prefetch(keys.values())
+
+    for index, word in enumerate(words):
+        cap = word.capitalize()
+        for name, stage in word_stages:
+            if cache is not None:
+                items, count = cache.variants(
+                    keys[(index, name)],
+                    lambda: cached_unit(name, stage(word, cap, ctx),
+                                        ctx.pruned))
+                if count:
+                    ctx.pruned[name] = ctx.pruned.get(name, 0) + count
+            else:
+                items = stage(word, cap, ctx)
+            if quotas is not None:
+                items = islice(items, quotas[(index, name)])
+            if profile is not None:
+                items = profile.wrap(name, items)
+            yield from items
+
+    for name, stage in target_stages:
+        if cache is not None:
+            items, count = cache.variants(
+                keys[(None, name)],
+                lambda: cached_unit(name, run_target_stage(name, stage,
+                                                           target, ctx),
+                                    ctx.pruned))
+            if count:
+                ctx.pruned[name] = ctx.pruned.get(name, 0) + count
+        else:
+            items = run_target_stage(name, stage, target, ctx)
+        if quotas is not None:
+            items = islice(items, quotas[(None, name)])
+        if profile is not None:
+            items = profile.wrap(name, items)
+        yield from items
+
+
+# --- Candidate store ---
+
+
+class CandidateStore:
+    """Deduplicating candidate set held as UTF-8 bytes in one arena.
+
+    Entries are appended newline-terminated to a bytearray, next to
+    arrays of their offsets, hashes and best scores, and found through
+    an open-addressing table of entry numbers with linear probing. An
+    entry costs its encoded length plus about 40 bytes, against roughly
+    90 for a str object and its set slot, and any run of consecutive
+    entries is a ready-to-write slice of text (see chunks()). Adding is
+    several times slower than a set, so the store is used where memory
+    is what is bounded.
+    """
+
+    def __init__(self):
+        self.arena = bytearray()
+        self.scores = array.array('d')
+        self._offsets = array.array('Q', [0])
+        self._hashes = array.array('q')
+        self._table = array.array('i', [-1]) * STORE_INITIAL_SLOTS
+        self._mask = STORE_INITIAL_SLOTS - 1
+
+    def __len__(self):
+        return len(self._hashes)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arena, arrays and table."""
+        return (len(self.arena) + 8 * len(self._offsets)
+                + 16 * len(self._hashes) + 4 * len(self._table))
+
+    def _slot(self, data, value):
+        """The table slot holding data's entry, or the empty slot for it."""
+        table = self._table
+        hashes = self._hashes
+        offsets = self._offsets
+        size = len(data) + 1
+        mask = self._mask
+        slot = value & mask
+        while True:
+            entry = table[slot]
+            if (entry < 0 or hashes[entry] == value
+                    and offsets[entry + 1] - offsets[entry] == size
+                    and self.arena.startswith(data, offsets[entry])):
+                return slot
+            slot = (slot + 1) & mask
+
+    def add(self, word, score=1.0):
+        """Insert word, or raise its kept score; True when it is new."""
+        data = word.encode('utf-8')
+        value = hash(data)
+        slot = self._slot(data, value)
+        entry = self._table[slot]
+        if entry >= 0:
+            if score > self.scores[entry]:
+                self.scores[entry] = score
+            return False
+        self._table[slot] = len(self._hashes)
+        self._hashes.append(value)
+        self.scores.append(score)
+        self.arena += data
+        self.arena.append(10)
+        self._offsets.append(len(self.arena))
+        if 2 * len(self._hashes) > len(self._table):
+            self._grow()
+        return True
+
+    def _grow(self):
+        size = 2 * len(self._table)
+        mask = size - 1
+        table = array.array('i', [-1]) * size
+        for entry, value in enumerate(self._hashes):
+            slot = value & mask
+            while table[slot] >= 0:
+                slot = (slot + 1) & mask
+            table[slot] = entry
+        self._table = table
+        self._mask = mask
+
+    def __contains__(self, word):
+        data = word.encode('utf-8')
+        return self._table[self._slot(data, hash(data))] >= 0
+
+    def word(self, entry):
+        offsets = self._offsets
+        return self.arena[offsets[entry]:offsets[entry + 1] - 1].decode(
+            'utf-8')
+
+    def __iter__(self):
+        """Yield (candidate, score) in insertion order."""
+        for entry, score in enumerate(self.scores):
+            yield self.word(entry), score
+
+    def sorted(self):
+        """Yield (candidate, score) by candidate; UTF-8 byte order is code
+        point order, so this matches sorting the strings.
+
+        Entries are sorted in runs of STORE_SORT_RUN, which are then
+        merged, so only one run's keys are built at a time.
+        """
+        arena = self.arena
+        offsets = self._offsets
+
+        def key(entry):
+            return arena[offsets[entry]:offsets[entry + 1] - 1]
+
+        runs = [array.array('i', sorted(
+                    range(start, min(start + STORE_SORT_RUN, len(self))),
+                    key=key))
+                for start in range(0, len(self), STORE_SORT_RUN)]
+        order = runs[0] if len(runs) == 1 else heapq.merge(*runs, key=key)
+        for entry in order:
+            yield self.word(entry), self.scores[entry]
+
+    def chunks(self, start=0, size=WRITE_BUFFER_SIZE):
+        """Yield (view, count) slices of about `size` bytes holding whole
+        consecutive entries from entry `start` on, for
+        WordlistWriter.write_encoded.
+
+        The views share the arena, so the store must not grow while one
+        is held.
+        """
+        offsets = self._offsets
+        view = memoryview(self.arena)
+        try:
+            first = start
+            while first < len(self):
+                last = bisect.bisect_right(offsets, offsets[first] + size,
+                                           first + 1) - 1
+                last = max(last, first + 1)
+                with view[offsets[first]:offsets[last]] as part:
+                    yield part, last - first
+                first = last
+        finally:
+            view.release()
+
+
+# --- Selection ---
+
+
+def order_lexical(word, score):
+    """Alphabetical order (the original sort-then-truncate behaviour)."""
+    return word
+
+
+def order_length(word, score):
+    """Shortest candidates first, alphabetical within a length."""
+    return (len(word), word)
+
+
+def order_score(word, score):
+    """Most likely candidates first, alphabetical among equal scores."""
+    return (-score, word)
+
+
+# Ordering keys for selection; smaller keys are kept first. Keys must be
+# a total order over candidates so the output stays deterministic, and
+# must never prefer a lower score for the same word.
+ORDERINGS = {
+    'score': order_score,
+    'lexical': order_lexical,
+    'length': order_length,
+}
+
+# Ordering that skips sorting and emits candidates as they are generated
+STREAM_ORDERING = 'stream'
+
+
+class BoundedSelector:
+    """Keep the best `limit` unique candidates of a stream in bounded memory.
+
+    Candidates are buffered with their best score; whenever the buffer
+    reaches twice the limit it is compacted back to the best `limit`
+    entries with heapq, and the worst surviving key becomes a threshold
+    that rejects later candidates before they are buffered. Memory stays
+    O(limit) and time O(n log limit) no matter how many candidates stream
+    in, and the result equals sorting every unique candidate and
+    truncating.
+    """
+
+    def __init__(self, limit, key=order_score):
+        self.limit = limit
+        self.key = key
+        self.seen = 0
+        self.total_weight = 0.0
+        self.capped = False
+        self._kept = {}
+        self._threshold = None
+
+    def add(self, word, score=1.0):
+        self.seen += 1
+        self.total_weight += score
+        if (self._threshold is not None
+                and self.key(word, score) > self._threshold):
+            return
+        current = self._kept.get(word)
+        if current is None or score > current:
+            self._kept[word] = score
+            if len(self._kept) >= 2 * self.limit:
+                self._compact()
+
+    def add_all(self, candidates):
+        for word, score in candidates:
+            self.add(word, score)
+
+    def _ranked(self, items):
+        key = self.key
+        return sorted(items, key=lambda item: key(item[0], item[1]))
+
+    def _compact(self):
+        if len(self._kept) <= self.limit:
+            return
+        key = self.key
+        best = heapq.nsmallest(self.limit, self._kept.items(),
+                               key=lambda item: key(item[0], item[1]))
+        self._kept = dict(best)
+        self._threshold = key(*best[-1]) if best else None
+        self.capped = True
+
+    def result(self):
+        """Return the kept (candidate, score) pairs, best first."""
+        if self.limit <= 0:
+            return []
+        self._compact()
+        return self._ranked(self._kept.items())
+
+    def close(self):
+        """Drop the kept candidates."""
+        self._kept = {}
+
+
+class ExternalSelector:
+    """Disk-backed selection for wordlists larger than memory.
+
+    Candidates are deduplicated in a CandidateStore; once the store's
+    size reaches `memory_limit` bytes it is sorted by word and
+    spilled to a temporary run file. Runs are k-way merged with
+    heapq.merge, collapsing duplicates to their best score, and, unless
+    the ordering is lexical, re-sorted externally by the ordering key the
+    same way. The first `limit` entries (all when `limit` is None) are
+    yielded best first, identical to BoundedSelector's result. The run
+    files are removed once the result is read, when adding fails, or on
+    close().
+    """
+
+    def __init__(self, limit, key=order_score, memory_limit=0, tmpdir=None):
+        self.limit = limit
+        self.key = key
+        self.memory_limit = memory_limit
+        self.tmpdir = tmpdir
+        self.seen = 0
+        self.total_weight = 0.0
+        self.capped = False
+        self.spill_runs = 0
+        self.spill_bytes = 0
+        self._buffer = CandidateStore()
+        self._runs = []
+        self._workdir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Remove the spilled run files."""
+        if self._workdir:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+
+    def add(self, word, score=1.0):
+        self.seen += 1
+        self.total_weight += score
+        if (self._buffer.add(word, score)
+                and self._buffer.nbytes >= self.memory_limit):
+            self._runs.append(self._spill(self._buffer.sorted()))
+            self._buffer = CandidateStore()
+
+    def add_all(self, candidates):
+        try:
+            for word, score in candidates:
+                self.add(word, score)
+        except BaseException:
+            self.close()
+            raise
+
+    def _spill(self, items):
+        """Write sorted (word, score) items to a new run file."""
+        if self._workdir is None:
+            self._workdir = tempfile.mkdtemp(prefix='pmwl-', dir=self.tmpdir)
+        path = os.path.join(self._workdir, f"run{self.spill_runs:06d}")
+        with open(path, 'w', encoding='utf-8') as f:
+            for word, score in items:
+                line = f"{score!r}\t{word}\n"
+                f.write(line)
+                self.spill_bytes += len(line)
+        self.spill_runs += 1
+        return path
+
+    @staticmethod
+    def _read_run(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                score, word = line[:-1].split('\t', 1)
+                yield word, float(score)
+
+    def _unique(self):
+        """Merge runs and buffer into one word-sorted, duplicate-free
+        stream."""
+        runs = [self._read_run(path) for path in self._runs]
+        runs.append(self._buffer.sorted())
+        self._buffer = CandidateStore()
+        previous_word, best = None, None
+        for word, score in heapq.merge(*runs, key=lambda item: item[0]):
+            if word == previous_word:
+                best = max(best, score)
+                continue
+            if previous_word is not None:
+                yield previous_word, best
+            previous_word, best = word, score
+        if previous_word is not None:
+            yield previous_word, best
+
+    def _ordered(self, unique):
+        """Externally sort the unique stream by the ordering key."""
+        key = self.key
+        if key is order_lexical:
+            yield from unique
+            return
+        runs = []
+        buffer = []
+        buffer_bytes = 0
+        for word, score in unique:
+            buffer.append((word, score))
+            buffer_bytes += len(word) + EXTERNAL_ENTRY_OVERHEAD
+            if buffer_bytes >= self.memory_limit:
+                buffer.sort(key=lambda item: key(*item))
+                runs.append(self._spill(buffer))
+                buffer = []
+                buffer_bytes = 0
+        buffer.sort(key=lambda item: key(*item))
+        streams = [self._read_run(path) for path in runs] + [iter(buffer)]
+        yield from heapq.merge(*streams, key=lambda item: key(*item))
+
+    def result(self):
+        """Yield the kept (candidate, score) pairs, best first."""
+        try:
+            ordered = self._ordered(self._unique())
+            if self.limit is None:
+                yield from ordered
+                return
+            yield from islice(ordered, self.limit)
+            self.capped = next(ordered, None) is not None
+        finally:
+            self.close()
+
+
+class StreamSelector:
+    """Pass the first `limit` unique candidates through in generation order.
+
+    Nothing is sorted, so the first candidate is available as soon as it
+    is generated and generation stops once the cap is reached. Only the
+    emitted candidates are remembered for deduplication, in a compact
+    CandidateStore when `compact` is set.
+    """
+
+    def __init__(self, candidates, limit, compact=False):
+        self.limit = limit
+        self.seen = 0
+        self.total_weight = 0.0
+        self.capped = False
+        self.compact = compact
+        self._candidates = candidates
+
+    def result(self):
+        """Yield (candidate, score) pairs as they are generated."""
+        emitted = CandidateStore() if self.compact else set()
+        for word, score in self._candidates:
+            if word in emitted:
+                self.seen += 1
+                self.total_weight += score
+                continue
+            if len(emitted) >= self.limit:
+                self.capped = True
+                return
+            self.seen += 1
+            self.total_weight += score
+            emitted.add(word)
+            yield word, score
+
+    def close(self):
+        """Stop the candidate stream if it is a generator."""
+        close = getattr(self._candidates, 'close', None)
+        if close is not None:
+            close()
+
+
+def select_candidates(candidates, limit, ordering='score', memory_limit=0,
+                      tmpdir=None):
+    """Feed a candidate stream through a selector and return it.
+
+    The 'stream' ordering keeps generation order and selects lazily,
+    remembering its output compactly under a `memory_limit`. Otherwise,
+    with a `memory_limit` in bytes the disk-backed ExternalSelector is
+    used, and without one the in-memory BoundedSelector.
+    """
+    if ordering == STREAM_ORDERING:
+        return StreamSelector(candidates, limit, compact=bool(memory_limit))
+    if memory_limit:
+        selector = ExternalSelector(limit, ORDERINGS[ordering],
+                                    memory_limit, tmpdir)
+    else:
+        selector = BoundedSelector(limit, ORDERINGS[ordering])
+    selector.add_all(candidates)
+    return selector
+
+
+def parse_shard(text):
+    """Parse an 'i/N' shard spec into (index, count)."""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{text}'; expected i/N.")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{text}'; need 0 <= i < N.")
+    return index, count
+
+
+def shard_entries(entries, shard):
+    """Return the slice of an ordered wordlist that belongs to a shard.
+
+    Entry j of the full list belongs to shard j % N, so every node gets
+    a disjoint share of the most likely candidates first and the shards
+    together reproduce the full list.
+    """
+    if not shard:
+        return entries
+    index, count = shard
+    return islice(entries, index, None, count)
+
+
+# Config fields that affect how a run executes but not what it writes
+RUN_SETTINGS = ('output_file', 'memory_limit', 'temp_dir', 'cache_file',
+                'cache_size', 'write_queue', 'fsync')
+
+
+def run_fingerprint(target, config, shard=None):
+    """Stable hash of everything that determines a wordlist's content."""
+    settings = {name: value for name, value in vars(config).items()
+                if name not in RUN_SETTINGS}
+    payload = {
+        'target': vars(target),
+        'config': settings,
+        'weights': load_weights(config.weights_file),
+        'leet_map': load_leet_map(config.leet_file),
+        'rules': load_rules(config.rules_file),
+        'exclude': exclusion_signatures(config),
+        'shard': list(shard) if shard else None,
+    }
+    encoded = json.dumps(payload, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class Checkpoint:
+    """Progress marker that lets an interrupted wordlist write resume.
+
+    Records how many entries and bytes of the output were flushed for a
+    given run fingerprint. Because the entry order is deterministic, a
+    resumed run truncates the output to the recorded size and continues
+    from the next entry index.
+    """
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.words = 0
+        self.bytes = 0
+
+    @classmethod
+    def load(cls, path, fingerprint, output_file):
+        """Load a matching checkpoint, or start a fresh one."""
+        checkpoint = cls(path, fingerprint)
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return checkpoint
+        if (state.get('fingerprint') == fingerprint
+                and os.path.exists(output_file)
+                and os.path.getsize(output_file) >= state['bytes']):
+            checkpoint.words = state['words']
+            checkpoint.bytes = state['bytes']
+        return checkpoint
+
+    def save(self, words, bytes_written):
+        self.words = words
+        self.bytes = bytes_written
+        state = {'fingerprint': self.fingerprint, 'words': words,
+                 'bytes': bytes_written}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def detect_format(path, output_format=''):
+    """Pick the output format: explicit, from the file extension, or text."""
+    if output_format:
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Invalid output format '{output_format}'.")
+        return output_format
+    for name, extension in OUTPUT_FORMATS.items():
+        if path.endswith(extension):
+            return name
+    return 'text'
+
+
+def open_compressor(output_format, raw):
+    """Wrap a binary file in a streaming stdlib compressor."""
+    if output_format == 'gzip':
+        # Fixed mtime keeps identical wordlists byte-identical
+        return gzip.GzipFile(fileobj=raw, mode='wb', mtime=0)
+    if output_format == 'bz2':
+        return bz2.BZ2File(raw, 'wb')
+    return lzma.LZMAFile(raw, 'wb')
+
+
+class WordlistWriter:
+    """Write candidates to a file in fixed-size chunks.
+
+    Text output is newline-joined UTF-8, optionally streamed through a
+    gzip, bz2 or xz compressor chunk by chunk. Binary output holds
+    length-prefixed entries followed by a sparse offset index (see
+    BinaryWordlist). The format comes from `output_format` or the file
+    extension.
+
+    With a checkpoint, every flushed chunk is recorded so an interrupted
+    run can reopen the file at the last flushed entry; the checkpoint is
+    removed once the writer closes cleanly. Compressed streams cannot be
+    truncated safely, so they always start over.
+
+    A path of '-' streams to standard output instead. Chunks then start
+    small and double up to `chunk_size`, so the first candidates reach a
+    downstream cracker immediately, and each chunk is flushed through the
+    pipe; blocking writes give natural backpressure. A reader closing the
+    pipe surfaces as BrokenPipeError.
+
+    With a `queue_depth`, chunks are encoded by the caller and handed to
+    a writer thread through a queue of that many chunks, so compression
+    and disk writes overlap generation. `stall_seconds` is the time the
+    caller waited on a full queue and `queue_peak` the deepest the queue
+    got. Errors on the writer thread are raised on the next write or
+    close. With `fsync`, each checkpointed chunk and the finished file
+    are synced to disk.
+    """
+
+    def __init__(self, path, chunk_size=DEFAULT_CHUNK_SIZE, checkpoint=None,
+                 progress=None, output_format='', profile=None,
+                 queue_depth=0, fsync=False):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.checkpoint = checkpoint
+        self.progress = progress
+        self.profile = profile
+        self.fsync = fsync
+        self.format = detect_format(path, output_format)
+        self.words_written = 0
+        self.bytes_written = 0
+        self.queue_peak = 0
+        self.stall_seconds = 0.0
+        self.busy_seconds = 0.0
+        self._buffer = []
+        self._flush_at = chunk_size
+        self._is_stdout = path == STDOUT_TARGET
+        self._offsets = []
+        binary = self.format == 'binary'
+        compressed = self.format in COMPRESSED_FORMATS
+
+        if compressed and checkpoint:
+            checkpoint.words = checkpoint.bytes = 0
+        if self._is_stdout:
+            if binary:
+                raise ValueError("The binary format needs a seekable file, "
+                                 "not stdout.")
+            self._raw = sys.stdout.buffer
+            self._flush_at = min(STREAM_INITIAL_CHUNK, chunk_size)
+        elif checkpoint and checkpoint.words:
+            self._raw = open(path, 'r+b', buffering=WRITE_BUFFER_SIZE)
+            self._raw.truncate(checkpoint.bytes)
+            self._raw.seek(0, os.SEEK_END)
+            self.words_written = checkpoint.words
+            self.bytes_written = checkpoint.bytes
+            if binary:
+                self._offsets = BinaryWordlist.scan_offsets(
+                    self._raw, checkpoint.words)
+                self.bytes_written -= BINARY_HEADER.size
+        else:
+            self._raw = open(path, 'wb', buffering=WRITE_BUFFER_SIZE)
+            if binary:
+                self._raw.write(BINARY_HEADER.pack(
+                    BINARY_MAGIC, BINARY_VERSION, BINARY_INDEX_STRIDE, 0, 0))
+        self._file = (open_compressor(self.format, self._raw) if compressed
+                      else self._raw)
+        self._queue = None
+        self._error = None
+        if queue_depth:
+            self._queue = queue.Queue(queue_depth)
+            self._thread = threading.Thread(target=self._drain,
+                                            name='pmwl-writer', daemon=True)
+            self._thread.start()
+
+    def write(self, word):
+        self._buffer.append(word)
+        if len(self._buffer) >= self._flush_at:
+            self.flush()
+
+    def write_all(self, words):
+        for word in words:
+            self.write(word)
+
+    def _encode_binary(self):
+        parts = []
+        offset = BINARY_HEADER.size + self.bytes_written
+        index = self.words_written
+        pack = BINARY_LENGTH.pack
+        for word in self._buffer:
+            encoded = word.encode('utf-8')
+            if len(encoded) > BINARY_ENTRY_MAX:
+                raise ValueError(
+                    f"Entry of {len(encoded)} bytes is too long for the "
+                    f"binary format (at most {BINARY_ENTRY_MAX}).")
+            if index % BINARY_INDEX_STRIDE == 0:
+                self._offsets.append(offset)
+            parts.append(pack(len(encoded)))
+            parts.append(encoded)
+            offset += BINARY_LENGTH.size + len(encoded)
+            index += 1
+        return b''.join(parts)
+
+    def write_encoded(self, data, count):
+        """Write `count` newline-terminated UTF-8 entries as given.
+
+        Text formats take the bytes (such as a CandidateStore chunk)
+        without decoding them; binary output decodes and re-encodes.
+        """
+        if self.format == 'binary':
+            self.write_all(bytes(data).decode('utf-8').splitlines())
+            return
+        self.flush()
+        if self.profile is not None:
+            started = time.perf_counter()
+        if self._queue is not None and not isinstance(data, bytes):
+            # The writer thread outlives the caller's view
+            data = bytes(data)
+        self._emit(data, count)
+        if self.profile is not None:
+            self.profile.record_write(time.perf_counter() - started,
+                                      len(data))
+
+    def flush(self):
+        if not self._buffer:
+            return
+        if self.profile is not None:
+            started = time.perf_counter()
+        if self.format == 'binary':
+            data = self._encode_binary()
+        else:
+            data = ('\n'.join(self._buffer) + '\n').encode('utf-8')
+        count = len(self._buffer)
+        self._buffer = []
+        self._emit(data, count)
+        if self.profile is not None:
+            self.profile.record_write(time.perf_counter() - started,
+                                      len(data))
+
+    def _emit(self, data, count):
+        """Hand an encoded chunk of `count` entries to the file."""
+        self.words_written += count
+        self.bytes_written += len(data)
+        if self._queue is None:
+            self._store(data, self.words_written)
+        else:
+            self._enqueue(data, self.words_written)
+        if self._is_stdout:
+            self._flush_at = min(self._flush_at * 2, self.chunk_size)
+        if self.progress:
+            self.progress(self)
+
+    def _store(self, data, words):
+        """Write one encoded chunk ending at entry `words`."""
+        self._file.write(data)
+        if self._is_stdout:
+            self._file.flush()
+        elif self.checkpoint and self.format not in COMPRESSED_FORMATS:
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._raw.fileno())
+            self.checkpoint.save(words, self._raw.tell())
+
+    def _enqueue(self, data, words):
+        if self._error is not None:
+            raise self._error
+        try:
+            self._queue.put_nowait((data, words))
+        except queue.Full:
+            started = time.perf_counter()
+            self._queue.put((data, words))
+            self.stall_seconds += time.perf_counter() - started
+        self.queue_peak = max(self.queue_peak, self._queue.qsize())
+
+    def _drain(self):
+        """Writer thread: store queued chunks until the None sentinel."""
+        clock = time.perf_counter
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            # After a failure keep draining so the producer never blocks
+            if self._error is not None:
+                continue
+            started = clock()
+            try:
+                self._store(*item)
+            except BaseException as error:
+                self._error = error
+            self.busy_seconds += clock() - started
+
+    def _stop_pipeline(self):
+        """Let the writer thread finish the queue, then raise its error."""
+        if self._queue is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._queue = None
+        if self.profile is not None:
+            self.profile.record_pipeline(self)
+        if self._error is not None:
+            raise self._error
+
+    def _finish_binary(self):
+        """Append the offset index and fill in the header."""
+        index_offset = self._raw.tell()
+        self._raw.write(struct.pack(f"<{len(self._offsets)}Q",
+                                    *self._offsets))
+        self._raw.seek(0)
+        self._raw.write(BINARY_HEADER.pack(
+            BINARY_MAGIC, BINARY_VERSION, BINARY_INDEX_STRIDE,
+            self.words_written, index_offset))
+
+    def close(self):
+        if self._raw.closed:
+            return
+        self.flush()
+        self._stop_pipeline()
+        if self._file is not self._raw:
+            self._file.close()
+        if self.format == 'binary':
+            self._finish_binary()
+        if self._is_stdout:
+            self._raw.flush()
+            return
+        if self.fsync:
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+        self._raw.close()
+        if self.checkpoint:
+            self.checkpoint.remove()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        try:
+            self._stop_pipeline()
+        except Exception:
+            pass  # the exception being handled is the one to report
+        finally:
+            if not self._is_stdout:
+                # Keep the checkpoint so the run can be resumed
+                self._raw.close()
+
+
+class BinaryWordlist:
+    """Random access to a binary (.pmwl) wordlist through mmap.
+
+    Layout: a fixed header (magic, version, index stride, entry count,
+    index offset), then each entry as a little-endian uint16 byte length
+    followed by its UTF-8 bytes, then the index: the uint64 file offset
+    of every `stride`-th entry. Seeking to entry i reads one index slot
+    and skips at most stride - 1 entries.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is not a binary wordlist.")
+        if len(self._map) < BINARY_HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a binary wordlist.")
+        magic, version, self.stride, self.count, index_offset = (
+            BINARY_HEADER.unpack_from(self._map, 0))
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a binary wordlist.")
+        slots = -(-self.count // self.stride) if self.count else 0
+        self._index = struct.unpack_from(f"<{slots}Q", self._map,
+                                         index_offset)
+
+    @staticmethod
+    def scan_offsets(raw, count):
+        """Rebuild the sparse index of the first `count` entries of a file."""
+        offsets = []
+        raw.seek(BINARY_HEADER.size)
+        for index in range(count):
+            offset = raw.tell()
+            if index % BINARY_INDEX_STRIDE == 0:
+                offsets.append(offset)
+            (length,) = BINARY_LENGTH.unpack(raw.read(BINARY_LENGTH.size))
+            raw.seek(length, os.SEEK_CUR)
+        raw.seek(0, os.SEEK_END)
+        return offsets
+
+    def __len__(self):
+        return self.count
+
+    def _offset(self, index):
+        offset = self._index[index // self.stride]
+        for _ in range(index % self.stride):
+            (length,) = BINARY_LENGTH.unpack_from(self._map, offset)
+            offset += BINARY_LENGTH.size + length
+        return offset
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('wordlist index out of range')
+        return next(self.iter_slice(index, index + 1))
+
+    def iter_slice(self, start=0, stop=None):
+        """Yield entries start..stop-1 sequentially."""
+        stop = self.count if stop is None else min(stop, self.count)
+        if start >= stop:
+            return
+        offset = self._offset(start)
+        data = self._map
+        for _ in range(stop - start):
+            (length,) = BINARY_LENGTH.unpack_from(data, offset)
+            offset += BINARY_LENGTH.size
+            yield data[offset:offset + length].decode('utf-8')
+            offset += length
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_wordlist(path):
+    """Yield the entries of a wordlist in any OUTPUT_FORMATS format."""
+    output_format = detect_format(path)
+    if output_format == 'binary':
+        with BinaryWordlist(path) as wordlist:
+            yield from wordlist.iter_slice()
+        return
+    opener = {'gzip': gzip.open, 'bz2': bz2.open,
+              'xz': lzma.open}.get(output_format, open)
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield line.rstrip('\n')
+
+
+# --- Exclusion index ---
+# Wordlists and potfiles of earlier attempts can run to many gigabytes,
+# so they are not loaded into memory. Each is indexed once as a sorted
+# array of 64-bit hashes of its entries; the index is memory-mapped and
+# binary-searched for every candidate, and rebuilt only when the source
+# file's size or modification time changes.
+
+
+def word_hash(data):
+    """64-bit hash of an entry's UTF-8 bytes."""
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(),
+                          'little')
+
+
+def potfile_plaintext(line):
+    """The plaintext of a 'hash:plaintext' potfile line, decoding $HEX[]."""
+    plain = line.rpartition(b':')[2]
+    if plain.startswith(b'$HEX[') and plain.endswith(b']'):
+        try:
+            return bytes.fromhex(plain[5:-1].decode('ascii'))
+        except ValueError:
+            pass
+    return plain
+
+
+def iter_source_entries(path):
+    """Yield the entries of a wordlist or potfile as bytes."""
+    output_format = detect_format(path)
+    if output_format == 'binary':
+        with BinaryWordlist(path) as wordlist:
+            for word in wordlist.iter_slice():
+                yield word.encode('utf-8')
+        return
+    potfile = path.lower().endswith(POTFILE_EXTENSIONS)
+    opener = {'gzip': gzip.open, 'bz2': bz2.open,
+              'xz': lzma.open}.get(output_format, open)
+    with opener(path, 'rb') as f:
+        for line in f:
+            line = line.rstrip(b'\r\n')
+            if potfile:
+                line = potfile_plaintext(line)
+            if line:
+                yield line
+
+
+def read_hash_run(path):
+    """Yield the hashes of a sorted run file."""
+    with open(path, 'rb') as f:
+        while True:
+            block = array.array('Q')
+            try:
+                block.fromfile(f, EXCLUDE_RUN_SIZE // 8)
+            except EOFError:
+                pass
+            if not block:
+                return
+            yield from block
+
+
+def build_exclusion_index(source, path, tmpdir=None):
+    """Hash, sort and deduplicate a source's entries into an index file.
+
+    Runs of EXCLUDE_RUN_SIZE hashes are sorted in memory and spilled,
+    then merged into the index, so memory stays bounded for any source.
+    """
+    stat = os.stat(source)
+    workdir = tempfile.mkdtemp(prefix='pmwlx-', dir=tmpdir)
+    try:
+        runs = []
+        pending = set()
+
+        def spill():
+            run = os.path.join(workdir, f"run{len(runs):06d}")
+            with open(run, 'wb') as f:
+                array.array('Q', sorted(pending)).tofile(f)
+            runs.append(run)
+            pending.clear()
+
+        for entry in iter_source_entries(source):
+            pending.add(word_hash(entry))
+            if len(pending) >= EXCLUDE_RUN_SIZE:
+                spill()
+        if pending or not runs:
+            spill()
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        count = 0
+        with open(tmp_path, 'wb') as f:
+            f.write(bytes(EXCLUDE_HEADER.size))
+            block = array.array('Q')
+            previous = None
+            for value in heapq.merge(*map(read_hash_run, runs)):
+                if value == previous:
+                    continue
+                previous = value
+                block.append(value)
+                if len(block) >= EXCLUDE_RUN_SIZE:
+                    block.tofile(f)
+                    count += len(block)
+                    block = array.array('Q')
+            block.tofile(f)
+            count += len(block)
+            f.seek(0)
+            f.write(EXCLUDE_HEADER.pack(
+                EXCLUDE_MAGIC, EXCLUDE_VERSION, sys.byteorder == 'little',
+                stat.st_size, stat.st_mtime_ns, count))
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def exclusion_cache_path(source, tmpdir=None):
+    """Index path for a source whose directory is read-only.
+
+    The index goes in `tmpdir`, or else the user cache directory, under
+    a name keyed by the source's absolute path.
+    """
+    directory = tmpdir or os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+        'pmwl')
+    os.makedirs(directory, exist_ok=True)
+    source = os.path.abspath(source)
+    digest = hashlib.sha256(
+        source.encode('utf-8', 'surrogateescape')).hexdigest()[:16]
+    return os.path.join(
+        directory, f"{os.path.basename(source)}.{digest}{EXCLUDE_SUFFIX}")
+
+
+class ExclusionIndex:
+    """Memory-mapped sorted hash array of one source file's entries.
+
+    The index is read from SOURCE + EXCLUDE_SUFFIX, or from
+    exclusion_cache_path() when the source's directory is not writable,
+    and (re)built first when it is missing, from an older format, or
+    stale. Membership is a binary search, so lookups touch about
+    log2(entries) pages and the index costs 8 bytes per distinct entry
+    on disk, none in the heap.
+    """
+
+    def __init__(self, source, tmpdir=None):
+        self.source = source
+        self.path = source + EXCLUDE_SUFFIX
+        self.built = False
+        if (not self._open() and not os.access(
+                os.path.dirname(os.path.abspath(source)), os.W_OK)):
+            self.path = exclusion_cache_path(source, tmpdir)
+        if not self._open():
+            build_exclusion_index(source, self.path, tmpdir)
+            self.built = True
+            if not self._open():
+                raise ValueError(f"Could not index {source}.")
+
+    def _open(self):
+        """Map the index if it is current for the source file."""
+        self._map = None
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        with f:
+            header = f.read(EXCLUDE_HEADER.size)
+            if len(header) < EXCLUDE_HEADER.size:
+                return False
+            magic, version, little, size, mtime, count = (
+                EXCLUDE_HEADER.unpack(header))
+            stat = os.stat(self.source)
+            if (magic != EXCLUDE_MAGIC or version != EXCLUDE_VERSION
+                    or little != (sys.byteorder == 'little')
+                    or (size, mtime) != (stat.st_size, stat.st_mtime_ns)):
+                return False
+            self.count = count
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._hashes = memoryview(self._map)[
+            EXCLUDE_HEADER.size:EXCLUDE_HEADER.size + 8 * count].cast('Q')
+        return True
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, word):
+        value = word_hash(word.encode('utf-8'))
+        hashes = self._hashes
+        index = bisect.bisect_left(hashes, value)
+        return index < self.count and hashes[index] == value
+
+    def close(self):
+        if self._map is not None:
+            self._hashes.release()
+            self._map.close()
+            self._map = None
+
+
+class Exclusions:
+    """The ExclusionIndex of every excluded file, checked together."""
+
+    def __init__(self, sources, tmpdir=None):
+        self.indexes = []
+        self.excluded = 0
+        try:
+            for source in sources:
+                self.indexes.append(ExclusionIndex(source, tmpdir))
+        except BaseException:
+            self.close()
+            raise
+
+    def __contains__(self, word):
+        return any(word in index for index in self.indexes)
+
+    def filter(self, candidates):
+        """Drop (candidate, weight) pairs found in any index."""
+        for item in candidates:
+            if item[0] in self:
+                self.excluded += 1
+            else:
+                yield item
+
+    def close(self):
+        for index in self.indexes:
+            index.close()
+        self.indexes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_exclusions(config):
+    """Open the configured Exclusions, or return None without any."""
+    if not config.exclude_files:
+        return None
+    return Exclusions(config.exclude_files, config.temp_dir or None)
+
+
+def exclusion_signatures(config):
+    """Size and modification time of every excluded file."""
+    signatures = []
+    for source in config.exclude_files:
+        stat = os.stat(source)
+        signatures.append([source, stat.st_size, stat.st_mtime_ns])
+    return signatures
+
+
+class CoverageTracker:
+    """Accumulate the score mass of an ordered wordlist as it is written.
+
+    Coverage is the kept score mass divided by the total score mass,
+    reported at each SIZE_DEFAULTS cut that is smaller than the list and
+    at the full list length. With a shard, only that shard's entries
+    count towards the cuts while the total still spans the full list.
+    """
+
+    CUTS = frozenset(SIZE_DEFAULTS.values())
+
+    def __init__(self, shard=None):
+        self.shard = shard
+        self.total = 0.0
+        self.entries = 0
+        self.mass = 0.0
+        self.cuts = []
+
+    def track(self, scored):
+        """Yield the words of this shard while accumulating every score."""
+        for index, (word, score) in enumerate(scored):
+            self.total += score
+            if self.shard and index % self.shard[1] != self.shard[0]:
+                continue
+            self.entries += 1
+            self.mass += score
+            if self.entries in self.CUTS:
+                self.cuts.append((self.entries, self.mass))
+            yield word
+
+    def report(self, selector):
+        """Coverage at each cut, relative to the selector's total mass."""
+        # Exact when nothing was capped; otherwise the raw stream total,
+        # which counts duplicates and so slightly underestimates coverage.
+        total_weight = (selector.total_weight if selector.capped
+                        else self.total)
+        cuts = [(cut, mass) for cut, mass in self.cuts if cut < self.entries]
+        cuts.append((self.entries, self.mass))
+        return [{'cut': cut,
+                 'coverage': round(mass / total_weight, 6)
+                 if total_weight else 0.0}
+                for cut, mass in cuts]
+
+
+def write_metadata(path, config, selector, tracker, shard=None,
+                   fingerprint=None):
+    """Write the sidecar metadata file that accompanies a wordlist."""
+    metadata = {
+        'entries': tracker.entries,
+        'ordering': config.ordering,
+        'complexity': config.complexity,
+        'candidates_generated': selector.seen,
+        'shard': f"{shard[0]}/{shard[1]}" if shard else None,
+        'fingerprint': fingerprint,
+        'coverage': tracker.report(selector),
+    }
+    with open(path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+        f.write('\n')
+    return metadata
+
+
+@dataclass
+class GenerationResult:
+    """Summary of one wordlist generation run."""
+    output_file: str
+    entries: int = 0
+    candidates_generated: int = 0
+    capped: bool = False
+    bytes_written: int = 0
+    coverage: float = 0.0
+    spill_runs: int = 0
+    spill_bytes: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    pruned: dict = field(default_factory=dict)
+    write_queue_peak: int = 0
+    write_stall_seconds: float = 0.0
+    excluded: int = 0
+
+
+def open_variant_cache(config):
+    """Open the configured VariantCache, or return None without one."""
+    if not config.cache_file:
+        return None
+    return VariantCache(config.cache_file, config.cache_size * 1024 * 1024)
+
+
+def build_wordlist(target, config, output_file=None, shard=None,
+                   resume=False, progress=None, profile=None, cache=None):
+    """Generate, select and write a target's wordlist without any prompts.
+
+    The selected list has a stable order, so entry indices identify the
+    same candidates on every run. `shard` restricts the output to one
+    (index, count) slice of that order, and `resume` continues from the
+    checkpoint of an interrupted run with the same inputs. An output of
+    '-' streams to stdout without checkpoint or metadata files. A
+    PipelineProfile, when given, collects per-stage and phase timings.
+    A VariantCache is opened from Config.cache_file unless one is given.
+    """
+    started = time.perf_counter()
+    output_file = output_file or config.output_file
+    to_stdout = output_file == STDOUT_TARGET
+    owns_cache = cache is None
+    if owns_cache:
+        cache = open_variant_cache(config)
+    if cache is not None:
+        hits, misses = cache.hits, cache.misses
+
+    # Deterministic bounded selection (equivalent to sort, then truncate)
+    pruned = {}
+    exclusions = selector = None
+    try:
+        candidates = iter_candidates(target, config, profile, cache, pruned)
+        exclusions = open_exclusions(config)
+        if exclusions is not None:
+            candidates = exclusions.filter(candidates)
+        selector = select_candidates(candidates, config.target_size,
+                                     config.ordering,
+                                     config.memory_limit * 1024 * 1024,
+                                     config.temp_dir or None)
+
+        checkpoint = None
+        fingerprint = run_fingerprint(target, config, shard)
+        if not to_stdout:
+            checkpoint_file = output_file + '.ckpt'
+            if resume:
+                checkpoint = Checkpoint.load(checkpoint_file, fingerprint,
+                                             output_file)
+            else:
+                checkpoint = Checkpoint(checkpoint_file, fingerprint)
+
+        tracker = CoverageTracker(shard)
+        entries = tracker.track(selector.result())
+        with WordlistWriter(output_file, checkpoint=checkpoint,
+                            progress=progress,
+                            output_format=config.output_format,
+                            profile=profile, queue_depth=config.write_queue,
+                            fsync=config.fsync) as writer:
+            # Entries before the checkpoint are already in the file
+            skip = checkpoint.words if checkpoint else 0
+            writer.write_all(islice(entries, skip, None))
+    finally:
+        # Also removes an ExternalSelector's run files if writing failed
+        if selector is not None:
+            selector.close()
+        if exclusions is not None:
+            exclusions.close()
+        if cache is not None:
+            cache.close() if owns_cache else cache.flush()
+    if profile is not None:
+        profile.record_pruned(pruned)
+        profile.total_seconds += time.perf_counter() - started
+
+    coverage = tracker.report(selector)
+    if not to_stdout:
+        write_metadata(output_file + '.meta.json', config, selector,
+                       tracker, shard, fingerprint)
+
+    return GenerationResult(
+        output_file=output_file,
+        entries=writer.words_written,
+        candidates_generated=selector.seen,
+        capped=selector.capped,
+        bytes_written=writer.bytes_written,
+        coverage=coverage[-1]['coverage'] if tracker.entries else 0.0,
+        spill_runs=getattr(selector, 'spill_runs', 0),
+        spill_bytes=getattr(selector, 'spill_bytes', 0),
+        cache_hits=cache.hits - hits if cache is not None else 0,
+        cache_misses=cache.misses - misses if cache is not None else 0,
+        pruned=pruned,
+        write_queue_peak=writer.queue_peak,
+        write_stall_seconds=writer.stall_seconds,
+        excluded=exclusions.excluded if exclusions is not None else 0,
+    )
+
+
+def completed_result(target, config, output_file, shard=None):
+    """Return the result of a finished earlier run with the same inputs.
+
+    A run is finished when its output and metadata exist, its metadata
+    fingerprint matches and no checkpoint is left behind.
+    """
+    if (not os.path.exists(output_file)
+            or os.path.exists(output_file + '.ckpt')):
+        return None
+    try:
+        with open(output_file + '.meta.json') as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if metadata.get('fingerprint') != run_fingerprint(target, config, shard):
+        return None
+    coverage = metadata['coverage']
+    return GenerationResult(
+        output_file=output_file,
+        entries=metadata['entries'],
+        candidates_generated=metadata['candidates_generated'],
+        capped=False,
+        bytes_written=os.path.getsize(output_file),
+        coverage=coverage[-1]['coverage'] if coverage else 0.0,
+    )
+
+
+def generate_wordlist(target, config):
+    """Generate customized wordlist based on target information"""
+    clear_screen()
+    print("\n===== PIMPING YOUR WORDLIST =====")
+
+    if not target.has_info():
+        print("No target information provided.")
+        input("Please add target information before generating a wordlist. "
+              "Press Enter to continue...")
+        return
+
+    print("Processing target information...")
+    print("Generating password variations...")
+
+    target_size = config.target_size
+    result = build_wordlist(target, config)
+
+    print(f"\nWordlist generated with {result.entries} entries.")
+    if result.capped:
+        print(f"({result.candidates_generated} candidates generated; "
+              f"capped to {target_size} by size setting.)")
+    elif result.entries < target_size:
+        print(f"(Only {result.entries} unique words could be generated "
+              f"from the provided information.)")
+        print("Tip: Add more target details or increase complexity "
+              "for a larger wordlist.")
+    if result.entries:
+        print(f"Estimated coverage: {result.coverage:.1%} of generated "
+              f"candidate likelihood.")
+    if result.spill_runs:
+        print(f"Sorted on disk: {result.spill_runs} runs "
+              f"({result.spill_bytes:,} bytes spilled).")
+    print(f"Saved to: {os.path.abspath(config.output_file)}")
+    input("Press Enter to continue...")
+
+
+def view_configuration(target, config):
+    """Display current configuration and target information"""
+    clear_screen()
+    print("\n===== CURRENT CONFIGURATION =====")
+
+    print("\n--- TARGET INFORMATION ---")
+    fields = [
+        ('First Name', target.first_name),
+        ('Middle Name', target.middle_name),
+        ('Last Name', target.last_name),
+        ('Birth Year', target.birth_year),
+        ('Spouse Name', target.spouse_name),
+        ('Pet Names', target.pet_names),
+        ('Children Names', target.children_names),
+        ('Important Dates', target.important_dates),
+        ('Hobbies Teams', target.hobbies_teams),
+    ]
+    for label, value in fields:
+        if isinstance(value, list):
+            print(f"{label}: {', '.join(value) if value else 'None'}")
+        else:
+            print(f"{label}: {value if value else ''}")
+
+    print("\n--- WORDLIST CONFIGURATION ---")
+    print(f"Size: {config.size.title()} ({config.target_size} words)")
+    print(f"Complexity: {config.complexity.title()}")
+    print(f"Ordering: {config.ordering.title()}")
+    print(f"Weights: {config.weights_file or 'Built-in defaults'}")
+    print(f"Output file: {config.output_file}")
+
+    if target.has_info():
+        estimate = estimate_candidates(target, config)
+        print("\n--- SIZE ESTIMATE ---")
+        print(f"Candidates before deduplication (upper bound): "
+              f"{estimate.total}")
+        print(f"Expected wordlist entries: up to "
+              f"{estimate.expected_entries(config.target_size)}")
+
+    input("\nPress Enter to continue...")
+
+
+# --- Headless batch mode ---
+
+LIST_FIELDS = ('pet_names', 'children_names', 'important_dates',
+               'hobbies_teams')
+# CSV cells holding list fields separate their items with this character
+CSV_LIST_SEPARATOR = ';'
+
+
+def target_from_record(record):
+    """Build a TargetInfo from a mapping of field names to values."""
+    known = {f for f in TargetInfo.__dataclass_fields__}
+    unknown = set(record) - known - {'id'}
+    if unknown:
+        raise ValueError(
+            f"Unknown target fields: {', '.join(sorted(unknown))}")
+
+    target = TargetInfo()
+    for name in known:
+        value = record.get(name)
+        if value in (None, ''):
+            continue
+        if name in LIST_FIELDS:
+            if isinstance(value, str):
+                value = [v.strip() for v in value.split(CSV_LIST_SEPARATOR)]
+            value = [str(v) for v in value if v]
+        else:
+            value = str(value).strip()
+        setattr(target, name, value)
+    return target
+
+
+def config_from_dict(values, base=None):
+    """Build a Config from a mapping, validating every option."""
+    config = Config(**vars(base)) if base else Config()
+    known = set(Config.__dataclass_fields__)
+    unknown = set(values) - known
+    if unknown:
+        raise ValueError(
+            f"Unknown config options: {', '.join(sorted(unknown))}")
+    for name, value in values.items():
+        if value is not None:
+            setattr(config, name, value)
+
+    if config.size != 'custom' and config.size not in SIZE_DEFAULTS:
+        raise ValueError(f"Invalid size '{config.size}'.")
+    if config.size == 'custom' and int(config.custom_size) <= 0:
+        raise ValueError("Custom size must be greater than 0.")
+    config.custom_size = int(config.custom_size)
+    if config.complexity not in COMPLEXITY_MAP:
+        raise ValueError(f"Invalid complexity '{config.complexity}'.")
+    if config.ordering not in ORDERINGS and config.ordering != STREAM_ORDERING:
+        raise ValueError(f"Invalid ordering '{config.ordering}'.")
+    config.leet_budget = int(config.leet_budget)
+    if config.leet_budget < 0:
+        raise ValueError("Leet budget must not be negative.")
+    config.memory_limit = int(config.memory_limit)
+    if config.memory_limit < 0:
+        raise ValueError("Memory limit must not be negative.")
+    if config.output_format and config.output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Invalid output format '{config.output_format}'.")
+    config.cache_size = int(config.cache_size)
+    if config.cache_size <= 0:
+        raise ValueError("Cache size must be greater than 0.")
+    config.min_length = int(config.min_length)
+    config.max_length = int(config.max_length)
+    if config.min_length < 0 or config.max_length < 0:
+        raise ValueError("Length limits must not be negative.")
+    if config.max_length and config.min_length > config.max_length:
+        raise ValueError("Minimum length exceeds maximum length.")
+    parse_classes(config.require)
+    config.combine = int(config.combine)
+    if config.combine and not 2 <= config.combine <= COMBINE_MAX_ARITY:
+        raise ValueError(f"Combination arity must be between 2 and "
+                         f"{COMBINE_MAX_ARITY}.")
+    parse_styles(config.combine_styles)
+    parse_date_orders(config.date_order)
+    config.combine_length = int(config.combine_length)
+    if config.combine_length <= 0:
+        raise ValueError("Combination length must be greater than 0.")
+    for source in config.exclude_files:
+        if not os.path.isfile(source):
+            raise ValueError(f"Exclusion file not found: {source}")
+    config.write_queue = int(config.write_queue)
+    if config.write_queue < 0:
+        raise ValueError("Write queue depth must not be negative.")
+    return config
+
+
+def load_targets(path):
+    """Load (name, TargetInfo) records from a JSON Lines or CSV file."""
+    records = []
+    with open(path, newline='') as f:
+        if path.lower().endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for index, row in enumerate(rows):
+            target = target_from_record(row)
+            # Ids name output files, so they may not hold separators or '..'
+            name = (safe_name(str(row.get('id') or '')) or
+                    target_slug(target) or 'target')
+            records.append((f"{index:04d}_{name}", target))
+    return records
+
+
+def safe_name(text):
+    """Replace every character but letters, digits, '-' and '_' by '_'."""
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in text)
+
+
+def target_slug(target):
+    """Filesystem-safe name for a target derived from its names."""
+    parts = [target.first_name, target.last_name]
+    return safe_name('_'.join(p for p in parts if p).lower())
+
+
+# VariantCache of each batch worker process, kept open across its targets
+_worker_cache = None
+
+
+def worker_variant_cache(config):
+    """Open the process's VariantCache once and reuse it."""
+    global _worker_cache
+    if not config.cache_file:
+        return None
+    if _worker_cache is None or _worker_cache.path != config.cache_file:
+        if _worker_cache is not None:
+            _worker_cache.close()
+        _worker_cache = open_variant_cache(config)
+    return _worker_cache
+
+
+def _batch_worker(job):
+    """Process pool entry point: generate one target's wordlist."""
+    name, target, config, output_file, shard, resume, profiling = job
+    started = time.perf_counter()
+    profile = PipelineProfile() if profiling else None
+    cache = worker_variant_cache(config)
+    words = None
+    result = None
+    if output_file:
+        if resume:
+            result = completed_result(target, config, output_file, shard)
+        if result is None:
+            result = build_wordlist(target, config, output_file, shard,
+                                    resume, profile=profile, cache=cache)
+    else:
+        if cache is not None:
+            hits, misses = cache.hits, cache.misses
+        pruned = {}
+        candidates = iter_candidates(target, config, profile, cache, pruned)
+        exclusions = open_exclusions(config)
+        try:
+            if exclusions is not None:
+                candidates = exclusions.filter(candidates)
+            selector = select_candidates(candidates, config.target_size,
+                                         config.ordering)
+            words = [word for word, _ in selector.result()]
+        finally:
+            if exclusions is not None:
+                exclusions.close()
+        result = GenerationResult(output_file='', entries=len(words),
+                                  candidates_generated=selector.seen,
+                                  capped=selector.capped, pruned=pruned)
+        if exclusions is not None:
+            result.excluded = exclusions.excluded
+        if cache is not None:
+            cache.flush()
+            result.cache_hits = cache.hits - hits
+            result.cache_misses = cache.misses - misses
+        if profile is not None:
+            profile.record_pruned(pruned)
+            profile.total_seconds = time.perf_counter() - started
+    report = profile.as_dict() if profile is not None else None
+    return name, result, words, report, time.perf_counter() - started
+
+
+def iter_merged(batches, shard=None, memory_limit=0, tmpdir=None):
+    """Deduplicate per-target word lists into one ordered stream.
+
+    Entry j of the merged stream (first occurrence wins, targets in file
+    order) belongs to shard j % N. With a `memory_limit` in bytes the
+    deduplication runs out of core: each word is scored by the negated
+    position of its occurrence, so the external selector keeps the first
+    occurrence and its score ordering restores the stream order.
+    """
+    if not memory_limit:
+        seen = set()
+        yield from shard_entries(
+            (word for words in batches for word in words
+             if not (word in seen or seen.add(word))), shard)
+        return
+    with ExternalSelector(None, order_score, memory_limit,
+                          tmpdir) as selector:
+        position = 0
+        for words in batches:
+            for word in words:
+                selector.add(word, -position)
+                position += 1
+        if selector.spill_runs:
+            print(f"Merge spilled {selector.spill_runs} runs "
+                  f"({selector.spill_bytes:,} bytes) to disk.",
+                  file=sys.stderr)
+        yield from shard_entries((word for word, _ in selector.result()),
+                                 shard)
+
+
+def write_merged(writer, batches):
+    """Deduplicate per-target word lists straight into a text writer.
+
+    First occurrences are appended to a CandidateStore, whose arena is
+    then the merged list in order, so each target's new entries are
+    written as arena slices without being encoded again. Entries a
+    resumed writer already holds are skipped.
+    """
+    store = CandidateStore()
+    for words in batches:
+        first = len(store)
+        for word in words:
+            store.add(word)
+        for view, count in store.chunks(max(first, writer.words_written)):
+            writer.write_encoded(view, count)
+
+
+def run_batch(targets_file, config, output_dir=None, merged_output=None,
+              workers=None, shard=None, resume=False, profile=None):
+    """Generate wordlists for every target in a file using a process pool.
+
+    Writes one wordlist per target into `output_dir`, or a single merged
+    and deduplicated wordlist to `merged_output`. `shard` and `resume`
+    behave as in build_wordlist; on resume, per-target outputs that were
+    already completed are skipped. A PipelineProfile, when given,
+    accumulates every target's stage counters. Returns the per-target
+    GenerationResults.
+    """
+    records = load_targets(targets_file)
+    workers = workers or os.cpu_count() or 1
+    # Build stale exclusion indexes once rather than in every worker
+    exclusions = open_exclusions(config)
+    if exclusions is not None:
+        exclusions.close()
+
+    if merged_output:
+        jobs = [(name, target, config, None, None, False,
+                 profile is not None)
+                for name, target in records]
+    else:
+        output_dir = output_dir or 'wordlists'
+        os.makedirs(output_dir, exist_ok=True)
+        extension = OUTPUT_FORMATS[config.output_format or 'text']
+        jobs = [(name, target, config,
+                 os.path.join(output_dir, name + extension), shard, resume,
+                 profile is not None)
+                for name, target in records]
+
+    writer = None
+    if merged_output == STDOUT_TARGET:
+        writer = WordlistWriter(merged_output,
+                                output_format=config.output_format,
+                                queue_depth=config.write_queue)
+    elif merged_output:
+        fingerprint = hashlib.sha256(json.dumps(
+            [run_fingerprint(t, config) for _, t in records]
+            + [list(shard) if shard else None]).encode('utf-8')).hexdigest()
+        checkpoint_file = merged_output + '.ckpt'
+        if resume:
+            checkpoint = Checkpoint.load(checkpoint_file, fingerprint,
+                                         merged_output)
+        else:
+            checkpoint = Checkpoint(checkpoint_file, fingerprint)
+        writer = WordlistWriter(merged_output, checkpoint=checkpoint,
+                                output_format=config.output_format,
+                                queue_depth=config.write_queue,
+                                fsync=config.fsync)
+
+    started = time.perf_counter()
+    results = []
+
+    def completed():
+        # Each target is independent, so whole targets are the unit of
+        # work and only summaries (or selected words) cross processes.
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for name, result, words, report, seconds in pool.map(
+                    _batch_worker, jobs, chunksize=chunksize):
+                results.append(result)
+                if report is not None:
+                    profile.merge(report)
+                spilled = (f", spilled {result.spill_runs} runs"
+                           if result.spill_runs else '')
+                print(f"[{len(results)}/{len(jobs)}] {name}: "
+                      f"{result.entries} entries in {seconds:.2f}s{spilled}",
+                      file=sys.stderr)
+                yield words or []
+
+    if writer:
+        with writer:
+            if not (shard or config.memory_limit
+                    or writer.format == 'binary'):
+                write_merged(writer, completed())
+            else:
+                merged = iter_merged(completed(), shard,
+                                     config.memory_limit * 1024 * 1024,
+                                     config.temp_dir or None)
+                # Entries before the checkpoint are already in the file
+                writer.write_all(islice(merged, writer.words_written, None))
+    else:
+        for _ in completed():
+            pass
+
+    elapsed = time.perf_counter() - started
+    generated = sum(r.candidates_generated for r in results)
+    print(f"Processed {len(results)} targets with {workers} workers "
+          f"in {elapsed:.2f}s ({len(results) / elapsed:.1f} targets/s, "
+          f"{generated / elapsed:,.0f} candidates/s).", file=sys.stderr)
+    if config.cache_file:
+        print(f"Variant cache: {sum(r.cache_hits for r in results)} hits, "
+              f"{sum(r.cache_misses for r in results)} misses",
+              file=sys.stderr)
+    if writer and merged_output != STDOUT_TARGET:
+        print(f"Merged wordlist: {writer.words_written} unique entries "
+              f"saved to {os.path.abspath(merged_output)}", file=sys.stderr)
+    return results
+
+
+def estimate_batch(targets_file, config):
+    """Print per-target and per-stage candidate counts without generating.
+
+    The counts include duplicates, so they are upper bounds.
+    """
+    records = load_targets(targets_file)
+    stage_totals = {}
+    grand_total = 0
+    for name, target in records:
+        estimate = estimate_candidates(target, config)
+        for stage, count in estimate.stages.items():
+            stage_totals[stage] = stage_totals.get(stage, 0) + count
+        grand_total += estimate.total
+        print(f"{name}: at most {estimate.total} candidates, up to "
+              f"{estimate.expected_entries(config.target_size)} entries")
+    print("\nCandidates per stage, duplicates included:")
+    for stage, count in stage_totals.items():
+        print(f"  {stage:<22} {count:>12,}")
+    print(f"  {'total':<22} {grand_total:>12,}")
+
+
+# --- Dictionary mangling ---
+# A seed dictionary is split into byte ranges that end on line
+# boundaries. Workers map the file themselves, so only the offsets cross
+# process boundaries, and a bounded window of chunks is in flight, so
+# memory does not grow with the input size.
+
+# Input bytes per mangling job
+MANGLE_CHUNK_SIZE = 256 * 1024
+
+
+def dictionary_chunks(path, chunk_size=MANGLE_CHUNK_SIZE):
+    """Yield (start, stop) byte ranges of path that end after a newline."""
+    size = os.path.getsize(path)
+    if not size:
+        return
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < size:
+            stop = data.find(b'\n', min(start + chunk_size, size) - 1)
+            stop = size if stop < 0 else stop + 1
+            yield start, stop
+            start = stop
+
+
+def block_words(lines):
+    """Decode, strip and lowercase a chunk's lines.
+
+    Returns the distinct non-empty words in input order and the number
+    of lines skipped because they are not UTF-8. A chunk is decoded in
+    one call unless one of its lines is invalid.
+    """
+    try:
+        words = b'\n'.join(lines).decode('utf-8').lower().split('\n')
+        skipped = 0
+    except UnicodeDecodeError:
+        words = []
+        skipped = 0
+        for line in lines:
+            try:
+                words.append(line.decode('utf-8').lower())
+            except UnicodeDecodeError:
+                skipped += 1
+    words = dict.fromkeys(word.strip() for word in words)
+    words.pop('', None)
+    return list(words), skipped
+
+
+def _mangle_worker(job):
+    """Process pool entry point: apply word stages to one byte range.
+
+    Returns the chunk's candidates as newline-terminated UTF-8, which
+    pickles far faster than a list and is written out without decoding,
+    their count, and the number of lines skipped because they are not
+    UTF-8. By default each stage expands the whole chunk with
+    RuleProgram.expand_block; with `dedupe`, or under a password policy,
+    candidates are built word by word and are unique within the chunk.
+    """
+    path, start, stop, ctx, stage_names, dedupe = job
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        block = data[start:stop]
+    words, skipped = block_words(block.splitlines())
+    if not words:
+        return b'', 0, skipped
+    if not dedupe and ctx.policy is None:
+        texts = []
+        total = 0
+        for name in stage_names:
+            text, count = ctx.programs[name].expand_block(words, ctx)
+            texts.append(text)
+            total += count
+        return ''.join(texts).encode('utf-8'), total, skipped
+    stages = [fn for name, _, fn, _ in WORD_STAGES if name in stage_names]
+    candidates = {}
+    for word in words:
+        cap = word.capitalize()
+        for stage in stages:
+            for candidate, _ in stage(word, cap, ctx):
+                candidates[candidate] = None
+    if not candidates:
+        return b'', 0, skipped
+    data = ('\n'.join(candidates) + '\n').encode('utf-8')
+    return data, len(candidates), skipped
+
+
+def iter_mangled(path, ctx, workers, chunk_size=MANGLE_CHUNK_SIZE,
+                 dedupe=False):
+    """Yield _mangle_worker's result for each chunk in input order."""
+    stage_names = [name for name, min_level, _, _ in WORD_STAGES
+                   if ctx.level >= min_level]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start, stop in dictionary_chunks(path, chunk_size):
+            pending.append(pool.submit(
+                _mangle_worker,
+                (path, start, stop, ctx, stage_names, dedupe)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def run_mangle(dictionary, config, output_file, target=None, workers=None,
+               chunk_size=MANGLE_CHUNK_SIZE, dedupe=False):
+    """Apply the word stages to every line of a seed dictionary.
+
+    Lines are lowercased like target stems and mangled at the configured
+    complexity. With target information, the target's own wordlist is
+    written first and its birth year and dates feed the dictionary's
+    suffix stages. Within each chunk, repeated lines and the common
+    repeats between rules are skipped; with `dedupe`, every candidate is
+    unique within its chunk instead, at a lower speed.
+    """
+    workers = workers or os.cpu_count() or 1
+    target = target or TargetInfo()
+    ctx = build_context(target, config)
+    started = time.perf_counter()
+    skipped = 0
+    with WordlistWriter(output_file, output_format=config.output_format,
+                        queue_depth=config.write_queue,
+                        fsync=config.fsync) as writer:
+        if target.has_info():
+            selector = select_candidates(iter_candidates(target, config),
+                                         config.target_size, config.ordering)
+            writer.write_all(word for word, _ in selector.result())
+        for data, count, chunk_skipped in iter_mangled(
+                dictionary, ctx, workers, chunk_size, dedupe):
+            if count:
+                writer.write_encoded(data, count)
+            skipped += chunk_skipped
+
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(dictionary)
+    print(f"Mangled {size:,} bytes into {writer.words_written:,} candidates "
+          f"with {workers} workers in {elapsed:.2f}s "
+          f"({size / elapsed / 1024 / 1024:.2f} MB/s, "
+          f"{writer.words_written / elapsed:,.0f} candidates/s).",
+          file=sys.stderr)
+    if skipped:
+        print(f"Skipped {skipped:,} lines that are not UTF-8.",
+              file=sys.stderr)
+    return writer.words_written
+
+
+# --- Service mode ---
+# `pmwl serve` keeps one interpreter, with its compiled rule programs
+# and loaded tables, answering wordlist requests on a Unix socket or a
+# localhost port. A request is one JSON line, {"target": {...},
+# "config": {...}} or {"metrics": true}. The reply is a JSON header
+# line, then for wordlists SERVE_FRAME-prefixed frames of
+# newline-terminated UTF-8 entries ended by an empty frame, and a JSON
+# trailer line. Finished wordlists are kept in a ResultCache keyed by
+# run_fingerprint(), so repeated requests are answered from memory.
+
+
+class ResultCache:
+    """Encoded wordlists by fingerprint, least recently used first out.
+
+    A wordlist is stored as its list of (encoded chunk, entries) pairs.
+    The cache holds at most `max_bytes` of chunk data; a wordlist larger
+    than that is served but never stored.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached chunks of a wordlist, or None."""
+        with self._lock:
+            chunks = self._entries.pop(key, None)
+            if chunks is None:
+                self.misses += 1
+                return None
+            # Reinserting keeps the dict in least recently used order
+            self._entries[key] = chunks
+            self.hits += 1
+            return chunks
+
+    def put(self, key, chunks):
+        size = sum(len(data) for data, _ in chunks)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= sum(len(data) for data, _ in old)
+            self._entries[key] = chunks
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                stale = self._entries.pop(next(iter(self._entries)))
+                self.nbytes -= sum(len(data) for data, _ in stale)
+                self.evictions += 1
+
+
+def iter_wordlist_chunks(target, config, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield a target's selected wordlist as (encoded chunk, entries).
+
+    Selection is the same as build_wordlist's, so the entries match the
+    file `generate` would write.
+    """
+    candidates = iter_candidates(target, config)
+    exclusions = open_exclusions(config)
+    if exclusions is not None:
+        candidates = exclusions.filter(candidates)
+    try:
+        selector = select_candidates(candidates, config.target_size,
+                                     config.ordering,
+                                     config.memory_limit * 1024 * 1024,
+                                     config.temp_dir or None)
+        words = (word for word, _ in selector.result())
+        while True:
+            chunk = list(islice(words, chunk_size))
+            if not chunk:
+                return
+            yield ('\n'.join(chunk) + '\n').encode('utf-8'), len(chunk)
+    finally:
+        if exclusions is not None:
+            exclusions.close()
+
+
+def read_exactly(stream, size):
+    """Read `size` bytes; raise ValueError if the connection ends first."""
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Connection closed in the middle of a reply.")
+    return data
+
+
+class ServiceMetrics:
+    """Request counts and recent latencies of a running service."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=SERVE_LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, failed=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += failed
+            self._latencies.append(seconds)
+
+    def as_dict(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+        cache = self.cache
+        lookups = cache.hits + cache.misses
+        metrics = {
+            'uptime_seconds': round(time.time() - self.started, 3),
+            'requests': self.requests,
+            'errors': self.errors,
+            'cache_hits': cache.hits,
+            'cache_misses': cache.misses,
+            'cache_hit_rate': round(cache.hits / lookups, 4)
+            if lookups else 0.0,
+            'cache_entries': len(cache),
+            'cache_bytes': cache.nbytes,
+            'cache_evictions': cache.evictions,
+        }
+        if latencies:
+            def percentile(p):
+                return latencies[min(len(latencies) - 1,
+                                     int(p * len(latencies)))] * 1000
+            metrics['latency_ms'] = {
+                'mean': round(sum(latencies) / len(latencies) * 1000, 3),
+                'p50': round(percentile(0.5), 3),
+                'p95': round(percentile(0.95), 3),
+                'max': round(latencies[-1] * 1000, 3),
+            }
+        return metrics
+
+
+def send_json(stream, value):
+    stream.write(json.dumps(value).encode('utf-8') + b'\n')
+
+
+def receive_json(stream):
+    """Read one JSON line; raise ValueError on a closed connection."""
+    line = stream.readline()
+    if not line:
+        raise ValueError("Connection closed before a reply.")
+    return json.loads(line)
+
+
+# Config fields holding paths. The client resolves them from its own
+# working directory, and the service confines them to its root.
+CONFIG_PATH_FIELDS = ('weights_file', 'leet_file', 'rules_file',
+                      'temp_dir', 'cache_file')
+
+
+def service_config(values, root=''):
+    """Build a request's Config with every path it names inside root.
+
+    Without a root, requests may not name paths at all: the service
+    would read, index and write wherever any local client asked.
+    Relative paths are taken from the root.
+    """
+    values = dict(values)
+    for name in CONFIG_PATH_FIELDS + ('exclude_files',):
+        value = values.get(name)
+        if not value:
+            continue
+        paths = value if name == 'exclude_files' else [value]
+        if not isinstance(paths, list) or not all(
+                isinstance(path, str) for path in paths):
+            raise ValueError(f"Config option '{name}' must name paths.")
+        if not root:
+            raise ValueError(f"Config option '{name}' names a path; start "
+                             f"the service with --root DIR to allow paths "
+                             f"under DIR.")
+        confined = []
+        for path in paths:
+            real = os.path.realpath(os.path.join(root, path))
+            if os.path.commonpath([real, root]) != root:
+                raise ValueError(f"'{path}' is outside the service root.")
+            confined.append(real)
+        values[name] = confined if name == 'exclude_files' else confined[0]
+    return config_from_dict(values)
+
+
+class ServiceHandler(socketserver.StreamRequestHandler):
+    """Answer one request on a service connection."""
+
+    def handle(self):
+        started = time.perf_counter()
+        failed = True
+        try:
+            try:
+                request = receive_json(self.rfile)
+                if request.get('metrics'):
+                    send_json(self.wfile, {
+                        'ok': True, 'metrics': self.server.metrics.as_dict()})
+                    failed = False
+                    return
+                target = target_from_record(request.get('target') or {})
+                config = service_config(request.get('config') or {},
+                                        self.server.root)
+                # Reads the rule, weight and exclusion files it names
+                key = run_fingerprint(target, config)
+            except (OSError, ValueError, TypeError, AttributeError) as e:
+                send_json(self.wfile, {'ok': False, 'error': str(e)})
+                return
+            failed = not self._send_wordlist(target, config, key)
+        except OSError:
+            # The client went away; nothing is left to answer
+            pass
+        finally:
+            self.server.metrics.record(time.perf_counter() - started,
+                                       failed)
+
+    def _send_wordlist(self, target, config, key):
+        """Stream a wordlist; False when generating it failed."""
+        cache = self.server.cache
+        cached = cache.get(key)
+        send_json(self.wfile, {'ok': True, 'cached': cached is not None})
+        if cached is not None:
+            source = iter(cached)
+        else:
+            source = iter_wordlist_chunks(target, config)
+        # Chunks kept for the cache, or None once the list outgrows it
+        chunks = [] if cached is None else None
+        size = 0
+        entries = 0
+        try:
+            while True:
+                # Only generation errors are reported; socket errors end
+                # the connection
+                try:
+                    chunk = next(source, None)
+                except (OSError, ValueError) as e:
+                    self.wfile.write(SERVE_FRAME.pack(0))
+                    send_json(self.wfile, {'ok': False, 'error': str(e)})
+                    return False
+                if chunk is None:
+                    break
+                data, count = chunk
+                entries += count
+                if chunks is not None:
+                    size += len(data)
+                    if size <= cache.max_bytes:
+                        chunks.append(chunk)
+                    else:
+                        chunks = None
+                self.wfile.write(SERVE_FRAME.pack(len(data)))
+                self.wfile.write(data)
+        finally:
+            if cached is None:
+                source.close()
+        if chunks is not None:
+            cache.put(key, chunks)
+        self.wfile.write(SERVE_FRAME.pack(0))
+        send_json(self.wfile, {'ok': True, 'entries': entries})
+        return True
+
+
+class TCPService(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socket, 'AF_UNIX'):
+    class UnixService(socketserver.ThreadingMixIn,
+                      socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    UnixService = None
+
+
+def open_service(socket_path=None, port=SERVE_PORT,
+                 cache_size=SERVE_CACHE_SIZE, root=''):
+    """Bind a service to a Unix socket path, or else a localhost port.
+
+    Requests may name files only under `root` (see service_config). A
+    Unix socket is created readable and writable by its owner only.
+    """
+    if root:
+        root = os.path.realpath(root)
+        if not os.path.isdir(root):
+            raise ValueError(f"Service root is not a directory: {root}")
+    if socket_path:
+        if UnixService is None:
+            raise ValueError("Unix sockets are not available here; "
+                             "use --port.")
+        if os.path.exists(socket_path):
+            # A socket left behind by a service that did not shut down
+            probe = socket.socket(socket.AF_UNIX)
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                os.unlink(socket_path)
+            else:
+                raise ValueError(f"A service is already listening on "
+                                 f"{socket_path}.")
+            finally:
+                probe.close()
+        umask = os.umask(0o177)
+        try:
+            server = UnixService(socket_path, ServiceHandler)
+        finally:
+            os.umask(umask)
+    else:
+        server = TCPService(('127.0.0.1', port), ServiceHandler)
+    server.root = root
+    server.cache = ResultCache(cache_size * 1024 * 1024)
+    server.metrics = ServiceMetrics(server.cache)
+    return server
+
+
+def run_serve(socket_path=None, port=SERVE_PORT, cache_size=SERVE_CACHE_SIZE,
+              root=''):
+    """Serve wordlist requests until interrupted."""
+    if cache_size <= 0:
+        raise ValueError("Cache size must be greater than 0.")
+    server = open_service(socket_path, port, cache_size, root)
+    address = socket_path or f"127.0.0.1:{server.server_address[1]}"
+    print(f"Serving wordlists on {address} "
+          f"(cache: {cache_size} MB). Press Ctrl+C to stop.",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+    metrics = server.metrics.as_dict()
+    print(f"Served {metrics['requests']} requests, "
+          f"{metrics['cache_hits']} from the cache.", file=sys.stderr)
+
+
+def connect_service(socket_path=None, port=SERVE_PORT):
+    if socket_path:
+        if not hasattr(socket, 'AF_UNIX'):
+            raise ValueError("Unix sockets are not available here; "
+                             "use --port.")
+        connection = socket.socket(socket.AF_UNIX)
+        connection.connect(socket_path)
+        return connection
+    return socket.create_connection(('127.0.0.1', port))
+
+
+def service_request(target, config):
+    """The request line asking a service for a target's wordlist."""
+    settings = {name: value for name, value in vars(config).items()
+                if name not in ('output_file', 'output_format')}
+    for name in CONFIG_PATH_FIELDS:
+        if settings[name]:
+            settings[name] = os.path.abspath(settings[name])
+    settings['exclude_files'] = [os.path.abspath(path)
+                                 for path in config.exclude_files]
+    return {'target': vars(target), 'config': settings}
+
+
+def run_client(target, config, output_file=STDOUT_TARGET, socket_path=None,
+               port=SERVE_PORT, metrics=False):
+    """Fetch a wordlist (or the metrics) from a running service."""
+    started = time.perf_counter()
+    with connect_service(socket_path, port) as connection, \
+            connection.makefile('rwb') as stream:
+        send_json(stream, {'metrics': True} if metrics
+                  else service_request(target, config))
+        stream.flush()
+        header = receive_json(stream)
+        if not header['ok']:
+            raise ValueError(header['error'])
+        if metrics:
+            print(json.dumps(header['metrics'], indent=2))
+            return header['metrics']
+        with WordlistWriter(output_file,
+                            output_format=config.output_format) as writer:
+            while True:
+                size, = SERVE_FRAME.unpack(
+                    read_exactly(stream, SERVE_FRAME.size))
+                if not size:
+                    break
+                data = read_exactly(stream, size)
+                writer.write_encoded(data, data.count(b'\n'))
+        trailer = receive_json(stream)
+    if not trailer['ok']:
+        raise ValueError(trailer['error'])
+    source = 'cache' if header['cached'] else 'generated'
+    print(f"{writer.words_written} entries ({source}) in "
+          f"{time.perf_counter() - started:.3f}s", file=sys.stderr)
+    return writer.words_written
+
+
+# --- Hash verification ---
+# verify-hashes checks generated candidates against a few captured,
+# unsalted digests without writing a wordlist. Candidates stream from
+# the generation stages in batches to hashing workers, which hold the
+# target digests, and generation stops once every digest is found.
+
+
+def parse_digest(text, algorithm=''):
+    """Return (algorithm, digest bytes) of a hex digest, or None.
+
+    Without an algorithm, it is chosen by the digest length.
+    """
+    text = text.strip().lower()
+    try:
+        digest = bytes.fromhex(text)
+    except ValueError:
+        return None
+    expected = algorithm or HASH_ALGORITHMS.get(len(text))
+    if not expected or hashlib.new(expected).digest_size != len(digest):
+        return None
+    return expected, digest
+
+
+def load_target_hashes(path=None, hashes=(), algorithm=''):
+    """Collect target digests as {algorithm: set of digest bytes}.
+
+    Lines of the file may carry other ':'-separated fields, such as a
+    user name; the first field that is a digest is used. Blank lines and
+    lines starting with '#' are skipped.
+    """
+    lines = list(hashes)
+    if path:
+        with open(path) as f:
+            lines.extend(line for line in f
+                         if line.strip() and not line.startswith('#'))
+    targets = {}
+    for line in lines:
+        for field in line.strip().split(':'):
+            parsed = parse_digest(field, algorithm)
+            if parsed:
+                targets.setdefault(parsed[0], set()).add(parsed[1])
+                break
+        else:
+            raise ValueError(f"No {algorithm or 'MD5, SHA-1 or SHA-256'} "
+                             f"digest in '{line.strip()}'.")
+    if not targets:
+        raise ValueError("No target hashes given.")
+    return targets
+
+
+# (hash function, algorithm name, target digests) of a hashing worker
+_hash_targets = []
+
+
+def _hash_worker_init(targets):
+    global _hash_targets
+    _hash_targets = [(getattr(hashlib, algorithm), algorithm, digests)
+                     for algorithm, digests in targets.items()]
+
+
+def _hash_worker(data):
+    """Process pool entry point: hash newline-joined UTF-8 candidates.
+
+    Returns (index, algorithm, digest) for every candidate whose digest
+    is a target.
+    """
+    words = data.split(b'\n')
+    hits = []
+    for function, algorithm, digests in _hash_targets:
+        for index, word in enumerate(words):
+            digest = function(word).digest()
+            if digest in digests:
+                hits.append((index, algorithm, digest))
+    return hits
+
+
+def iter_labelled_batches(target, config, size=HASH_BATCH_SIZE):
+    """Yield (candidates, labels) batches of unique candidates.
+
+    Every candidate the stages generate is included, not only the
+    size-capped wordlist. A label is the (stage, stem) unit that first
+    produced the candidate, with stem None for cross-word stages.
+    """
+    ctx = build_context(target, config)
+    units = []
+    for word in build_base_words(target):
+        cap = word.capitalize()
+        units.extend(((name, word), stage(word, cap, ctx))
+                     for name, min_level, stage, _ in WORD_STAGES
+                     if ctx.level >= min_level)
+    units.extend(((name, None), run_target_stage(name, stage, target, ctx))
+                 for name, min_level, stage, _ in TARGET_STAGES
+                 if ctx.level >= min_level)
+    exclusions = open_exclusions(config)
+    seen = set()
+    words, labels = [], []
+    try:
+        for label, items in units:
+            if exclusions is not None:
+                items = exclusions.filter(items)
+            for word, _ in items:
+                if word in seen:
+                    continue
+                seen.add(word)
+                words.append(word)
+                labels.append(label)
+                if len(words) >= size:
+                    yield words, labels
+                    words, labels = [], []
+        if words:
+            yield words, labels
+    finally:
+        if exclusions is not None:
+            exclusions.close()
+
+
+def leet_substitutions(word, variant, positions):
+    """The (original, replacement) pairs that turn a word into a variant."""
+    def walk(k, start, offset):
+        if k == len(positions):
+            return [] if word[start:] == variant[offset:] else None
+        i, options = positions[k]
+        if not variant.startswith(word[start:i], offset):
+            return None
+        offset += i - start
+        for option in options:
+            if variant.startswith(option, offset):
+                rest = walk(k + 1, i + 1, offset + len(option))
+                if rest is not None:
+                    if option == word[i]:
+                        return rest
+                    return [(word[i], option)] + rest
+        return None
+    return walk(0, 0, 0) or []
+
+
+def explain_candidate(candidate, label, ctx):
+    """(hashcat rule, leet substitutions) of the word stage that built a
+    candidate; the rule is '' when no stage rule explains it.
+
+    Leet variants are pmwl's own stage, not a hashcat function, so for
+    them the rule covers the operations before the leet stage.
+    """
+    stage, stem = label
+    if stem is None:
+        return '', ()
+    for ops in ctx.programs[stage].ops:
+        if ops and ops[-1][0] == 'L':
+            value = apply_rule_ops(ops[:-1], stem)
+            positions = leet_positions(value, ctx.leet_table)
+            variants = iter_leet(value, positions,
+                                 ctx.level >= COMPLEXITY_EXTREME,
+                                 ctx.leet_budget)
+            if any(variant == candidate for variant, _ in variants):
+                return hashcat_rule(ops[:-1]), tuple(
+                    leet_substitutions(value, candidate, positions))
+        elif apply_rule_ops(ops, stem) == candidate:
+            return hashcat_rule(ops), ()
+    return '', ()
+
+
+@dataclass
+class HashHit:
+    """A target digest found among the candidates."""
+    digest: str
+    algorithm: str
+    candidate: str
+    stage: str
+    stem: str = ''
+    rule: str = ''
+    leet: tuple = ()
+
+
+def verify_hashes(target, config, targets, workers=None,
+                  batch_size=HASH_BATCH_SIZE, found=None):
+    """Hash generated candidates until every target digest is found.
+
+    `targets` is load_target_hashes()'s mapping. Batches are hashed by a
+    pool of `workers` processes with a bounded number in flight. Returns
+    (hits, candidates checked); each hit is reported to `found` as it
+    arrives.
+    """
+    workers = workers or os.cpu_count() or 1
+    ctx = build_context(target, config)
+    remaining = sum(len(digests) for digests in targets.values())
+    hits = []
+    checked = 0
+    batches = iter_labelled_batches(target, config, batch_size)
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_hash_worker_init,
+                             initargs=(targets,)) as pool:
+        pending = deque()
+        try:
+            while remaining:
+                batch = next(batches, None)
+                if batch is not None:
+                    words, labels = batch
+                    data = '\n'.join(words).encode('utf-8')
+                    pending.append((pool.submit(_hash_worker, data),
+                                    words, labels))
+                    if len(pending) < 2 * workers:
+                        continue
+                if not pending:
+                    break
+                future, words, labels = pending.popleft()
+                checked += len(words)
+                for index, algorithm, digest in future.result():
+                    stage, stem = labels[index]
+                    rule, leet = explain_candidate(words[index],
+                                                   labels[index], ctx)
+                    hit = HashHit(digest.hex(), algorithm, words[index],
+                                  stage, stem or '', rule, leet)
+                    hits.append(hit)
+                    remaining -= 1
+                    if found is not None:
+                        found(hit)
+        finally:
+            for future, _, _ in pending:
+                future.cancel()
+            batches.close()
+    return hits, checked
+
+
+def run_verify_hashes(target, config, hash_file=None, hashes=(),
+                      algorithm='', workers=None):
+    """Print 'digest:candidate' for every target hash a candidate matches.
+
+    Provenance and a summary go to stderr. True when any hash was found.
+    """
+    targets = load_target_hashes(hash_file, hashes, algorithm)
+    total = sum(len(digests) for digests in targets.values())
+    started = time.perf_counter()
+
+    def found(hit):
+        print(f"{hit.digest}:{hit.candidate}", flush=True)
+        source = hit.stage
+        if hit.stem:
+            source += f", stem '{hit.stem}'"
+        if hit.rule:
+            source += f", rule '{hit.rule}'"
+        if hit.leet:
+            source += ", leet " + ', '.join(
+                f"{original}->{replacement}"
+                for original, replacement in hit.leet)
+        print(f"  {hit.algorithm} {hit.candidate!r} from {source}",
+              file=sys.stderr)
+
+    hits, checked = verify_hashes(target, config, targets, workers,
+                                  found=found)
+    elapsed = time.perf_counter() - started
+    print(f"Found {len(hits)} of {total} hashes after {checked:,} "
+          f"candidates in {elapsed:.2f}s "
+          f"({checked / elapsed:,.0f} candidates/s).", file=sys.stderr)
+    return bool(hits)
+
+
+# --- Rule export ---
+# A wordlist is mostly the same stems times the same affix rules. Export
+# writes it as groups of (stems, hashcat rules) whose cross products
+# together give exactly the selected candidate set: stems that kept the
+# same rules share a group, and candidates no rule explains (leet
+# variants, name combinations, capped leftovers) form a final group
+# with the ':' rule.
+
+# Functions that work on UTF-8 bytes in hashcat like on characters here
+HASHCAT_BYTE_SAFE = '$^s@'
+
+
+def hashcat_compatible(stem, ops):
+    """Whether hashcat applies ops to stem exactly like pmwl.
+
+    Hashcat rules work on bytes and only change the case of ASCII
+    letters, so rules with non-ASCII arguments are never exported, and
+    non-ASCII stems only take rules that append, prepend or replace.
+    """
+    if not all(arg.isascii() for _, args in ops for arg in args):
+        return False
+    return stem.isascii() or all(code in HASHCAT_BYTE_SAFE
+                                 for code, _ in ops)
+
+
+@dataclass
+class ExportGroup:
+    """Stems that hashcat expands with one rule file."""
+    stems: list
+    rules: list
+
+
+def build_export(target, config):
+    """Factor a target's selected wordlist into ExportGroups.
+
+    Returns (groups, selected words in output order).
+    """
+    selector = select_candidates(iter_candidates(target, config),
+                                 config.target_size, config.ordering)
+    words = [word for word, _ in selector.result()]
+    selected = set(words)
+    ctx = build_context(target, config)
+    programs = [ctx.programs[name] for name, min_level, _, _ in WORD_STAGES
+                if ctx.level >= min_level]
+
+    explained = set()
+    groups = {}
+    for stem in dict.fromkeys(build_base_words(target)):
+        kept = {}
+        for program in programs:
+            for ops in program.ops:
+                if (ops and ops[-1][0] == 'L'
+                        or not hashcat_compatible(stem, ops)):
+                    continue
+                candidate = apply_rule_ops(ops, stem)
+                if candidate in selected:
+                    kept.setdefault(hashcat_rule(ops), candidate)
+        if not kept:
+            continue
+        explained.update(kept.values())
+        groups.setdefault(tuple(kept), ExportGroup([], list(kept)))
+        groups[tuple(kept)].stems.append(stem)
+
+    groups = list(groups.values())
+    literals = [word for word in words if word not in explained]
+    if literals:
+        groups.append(ExportGroup(literals, [':']))
+    return groups, words
+
+
+def text_size(words):
+    """Bytes of words as a newline-terminated UTF-8 text file."""
+    return sum(len(word.encode('utf-8')) + 1 for word in words)
+
+
+def write_export(prefix, groups, words, fingerprint=''):
+    """Write each group's stems and rules plus a JSON manifest.
+
+    Group i goes to PREFIX.i.words and PREFIX.i.rule, for use as
+    `hashcat -a 0 HASHES PREFIX.i.words -r PREFIX.i.rule`. Returns the
+    manifest, which records the size reduction.
+    """
+    entries = []
+    exported = 0
+    for index, group in enumerate(groups, 1):
+        files = {}
+        for kind, lines in (('words', group.stems), ('rule', group.rules)):
+            path = f"{prefix}.{index}.{kind}"
+            with open(path, 'w', encoding='utf-8', newline='\n') as f:
+                f.writelines(f"{line}\n" for line in lines)
+            files[kind] = os.path.basename(path)
+            exported += text_size(lines)
+        entries.append({**files, 'stems': len(group.stems),
+                        'rules': len(group.rules)})
+    manifest = {
+        'fingerprint': fingerprint,
+        'candidates': len(words),
+        'groups': entries,
+        'expanded_bytes': text_size(words),
+        'export_bytes': exported,
+    }
+    with open(prefix + '.export.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+    return manifest
+
+
+def iter_export(manifest_file):
+    """Expand an export's groups the way hashcat would, with duplicates."""
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+    directory = os.path.dirname(manifest_file)
+    for group in manifest['groups']:
+        with open(os.path.join(directory, group['rule']),
+                  encoding='utf-8') as f:
+            rules = [tuple((code, args) for code, args, _ in parse_rule(line))
+                     for line in f.read().splitlines()]
+        with open(os.path.join(directory, group['words']),
+                  encoding='utf-8') as f:
+            for stem in f.read().splitlines():
+                for ops in rules:
+                    yield apply_rule_ops(ops, stem)
+
+
+def run_export(target, config, prefix):
+    """Export a target's wordlist as stems plus rules and report sizes."""
+    if not target.has_info():
+        raise ValueError("No target information provided.")
+    groups, words = build_export(target, config)
+    manifest = write_export(prefix, groups, words,
+                            run_fingerprint(target, config))
+    expanded, exported = manifest['expanded_bytes'], manifest['export_bytes']
+    saved = 1 - exported / expanded if expanded else 0.0
+    print(f"Exported {len(words)} candidates as "
+          f"{sum(len(group.stems) for group in groups)} stems and "
+          f"{sum(len(group.rules) for group in groups)} rules in "
+          f"{len(groups)} groups: {exported:,} bytes instead of "
+          f"{expanded:,} ({saved:.0%} smaller), manifest "
+          f"{os.path.abspath(prefix + '.export.json')}", file=sys.stderr)
+    return manifest
+
+
+def run_verify_export(manifest_file, wordlist):
+    """Diff an expanded export against a wordlist; True when identical."""
+    expected = set(iter_wordlist(wordlist))
+    expanded = set(iter_export(manifest_file))
+    missing = expected - expanded
+    extra = expanded - expected
+    print(f"{len(expected)} wordlist entries, {len(expanded)} unique "
+          f"expanded candidates: {len(missing)} missing, "
+          f"{len(extra)} extra.", file=sys.stderr)
+    for label, words in (('missing', missing), ('extra', extra)):
+        for word in sorted(words)[:10]:
+            print(f"  {label}: {word}", file=sys.stderr)
+    return not missing and not extra
+
+
+def add_config_arguments(parser):
+    """Add the generation options shared by headless commands."""
+    parser.add_argument('--config', help='JSON file with Config options')
+    parser.add_argument('--size', choices=list(SIZE_DEFAULTS) + ['custom'])
+    parser.add_argument('--custom-size', type=int)
+    parser.add_argument('--complexity', choices=list(COMPLEXITY_MAP))
+    parser.add_argument('--ordering',
+                        choices=list(ORDERINGS) + [STREAM_ORDERING])
+    parser.add_argument('--weights', dest='weights_file',
+                        help='JSON file overriding transformation weights')
+    parser.add_argument('--leet-table', dest='leet_file',
+                        help='JSON file of extra leet substitutions')
+    parser.add_argument('--leet-budget', type=int,
+                        help=f'maximum leet variants per word '
+                             f'(default: {LEET_BUDGET})')
+    parser.add_argument('--rules', dest='rules_file',
+                        help='file of extra hashcat-style rules applied '
+                             'to every stem')
+    parser.add_argument('--min-length', type=int,
+                        help='only generate candidates at least this long')
+    parser.add_argument('--max-length', type=int,
+                        help='only generate candidates at most this long')
+    parser.add_argument('--require', metavar='CLASSES',
+                        help='comma-separated character classes every '
+                             f'candidate must contain '
+                             f'({", ".join(PASSWORD_CLASSES)})')
+    parser.add_argument('--charset',
+                        help='characters candidates may use; letters are '
+                             'matched as given')
+    parser.add_argument('--exclude', dest='exclude_files', action='append',
+                        metavar='FILE',
+                        help='skip candidates listed in this wordlist or '
+                             '.pot/.potfile (repeatable); indexed once as '
+                             f'FILE{EXCLUDE_SUFFIX}')
+    parser.add_argument('--combine', type=int, metavar='N',
+                        help=f'join up to N target tokens into one candidate '
+                             f'(2-{COMBINE_MAX_ARITY}; default: off)')
+    parser.add_argument('--combine-styles', metavar='STYLES',
+                        help=f'case styles for combinations '
+                             f'({", ".join(COMBINE_STYLES)}; '
+                             f'default: {COMBINE_DEFAULT_STYLES})')
+    parser.add_argument('--combine-length', type=int, metavar='N',
+                        help=f'longest combination generated '
+                             f'(default: {COMBINE_LENGTH})')
+    parser.add_argument('--date-order', metavar='ORDERS',
+                        help=f'comma-separated orders dates are written in '
+                             f'({", ".join(DATE_ORDERS)}; default: '
+                             f'{DATE_DEFAULT_ORDER})')
+    parser.add_argument('--balanced', action='store_true', default=None,
+                        help='spread the size cap evenly across stages '
+                             'and stop each stage at its share')
+    parser.add_argument('--memory-limit', type=int, metavar='MB',
+                        help='deduplicate and sort on disk, keeping at '
+                             'most about MB megabytes in memory')
+    parser.add_argument('--temp-dir',
+                        help='directory for on-disk sort runs')
+    parser.add_argument('--format', dest='output_format',
+                        choices=list(OUTPUT_FORMATS),
+                        help='output format (default: from the file '
+                             'extension, else text)')
+    parser.add_argument('--write-queue', type=int, metavar='CHUNKS',
+                        help=f'encoded chunks queued for the background '
+                             f'writer thread; 0 writes synchronously '
+                             f'(default: {WRITE_QUEUE_DEPTH})')
+    parser.add_argument('--fsync', action='store_true', default=None,
+                        help='sync checkpointed chunks and the finished '
+                             'file to disk')
+    parser.add_argument('--cache', dest='cache_file', metavar='FILE',
+                        help='reuse stage output across runs from this '
+                             'SQLite file')
+    parser.add_argument('--cache-size', type=int, metavar='MB',
+                        help=f'evict least recently used cache entries '
+                             f'past MB megabytes '
+                             f'(default: {VARIANT_CACHE_SIZE})')
+
+
+def config_from_args(args):
+    """Build a Config from a --config file plus command-line overrides."""
+    values = {}
+    if args.config:
+        with open(args.config) as f:
+            values = json.load(f)
+    config = config_from_dict(values)
+    overrides = {name: getattr(args, name) for name in
+                 ('size', 'custom_size', 'complexity', 'ordering',
+                  'weights_file', 'leet_file', 'leet_budget', 'balanced',
+                  'memory_limit', 'temp_dir', 'output_format', 'cache_file',
+                  'cache_size', 'rules_file', 'min_length', 'max_length',
+                  'require', 'charset', 'exclude_files', 'combine',
+                  'combine_styles', 'combine_length', 'date_order',
+                  'write_queue', 'fsync')}
+    if overrides['custom_size'] and not overrides['size']:
+        overrides['size'] = 'custom'
+    return config_from_dict(overrides, base=config)
+
+
+def target_from_args(args):
+    """Build a TargetInfo from a --target JSON file and field options."""
+    record = {}
+    if args.target:
+        with open(args.target) as f:
+            record = json.load(f)
+    for name in TargetInfo.__dataclass_fields__:
+        value = getattr(args, name)
+        if value:
+            record[name] = value
+    return target_from_record(record)
+
+
+def stderr_progress(writer):
+    """Show a live entry count on an interactive stderr."""
+    print(f"\r{writer.words_written:,} candidates written",
+          end='', file=sys.stderr, flush=True)
+
+
+def run_generate(target, config, output_file, shard=None, resume=False,
+                 profile=None):
+    """Generate one target's wordlist headlessly, reporting on stderr."""
+    if not target.has_info():
+        raise ValueError("No target information provided.")
+    progress = stderr_progress if sys.stderr.isatty() else None
+    if config.combine:
+        cost = count_combinations(target, build_context(target, config))
+        print(f"Combinations: up to {cost:,} candidates", file=sys.stderr)
+    started = time.perf_counter()
+    result = build_wordlist(target, config, output_file, shard, resume,
+                            progress, profile)
+    elapsed = time.perf_counter() - started
+    if progress:
+        print(file=sys.stderr)
+    destination = ('stdout' if output_file == STDOUT_TARGET
+                   else os.path.abspath(output_file))
+    print(f"{result.entries} entries from {result.candidates_generated} "
+          f"candidates in {elapsed:.2f}s written to {destination}",
+          file=sys.stderr)
+    if config.cache_file:
+        print(f"Variant cache: {result.cache_hits} hits, "
+              f"{result.cache_misses} misses", file=sys.stderr)
+    if config.exclude_files:
+        print(f"Excluded {result.excluded} previously tried candidates",
+              file=sys.stderr)
+    if result.pruned:
+        counts = ', '.join(f"{name} {count}"
+                           for name, count in result.pruned.items() if count)
+        print(f"Pruned by password policy: {counts or 'none'}",
+              file=sys.stderr)
+    return result
+
+
+def run_read(path, start=0, count=None):
+    """Stream a slice of a binary wordlist to stdout as text."""
+    with BinaryWordlist(path) as wordlist:
+        stop = None if count is None else start + count
+        with WordlistWriter(STDOUT_TARGET) as writer:
+            writer.write_all(wordlist.iter_slice(start, stop))
+
+
+def report_profile(profile, json_file=None):
+    """Print a profile summary to stderr and optionally save it as JSON."""
+    print(profile.format_table(), file=sys.stderr)
+    if json_file:
+        with open(json_file, 'w') as f:
+            json.dump(profile.as_dict(), f, indent=2)
+            f.write('\n')
+
+
+def add_profile_arguments(parser, cprofile=True):
+    """Add the options of the --profile mode."""
+    parser.add_argument('--profile', action='store_true',
+                        help='print per-stage counters and timings')
+    parser.add_argument('--profile-json', metavar='FILE',
+                        help='also save the profile report as JSON')
+    if cprofile:
+        parser.add_argument('--cprofile', metavar='FILE',
+                            help='run under cProfile and save the stats '
+                                 'for pstats/snakeviz')
+
+
+def add_target_arguments(parser):
+    """Add the options that describe a target on the command line."""
+    parser.add_argument('--target', help='JSON file with one target record')
+    parser.add_argument('--first-name')
+    parser.add_argument('--middle-name')
+    parser.add_argument('--last-name')
+    parser.add_argument('--birth-year')
+    parser.add_argument('--spouse-name')
+    parser.add_argument('--pet', dest='pet_names', action='append')
+    parser.add_argument('--child', dest='children_names', action='append')
+    parser.add_argument('--date', dest='important_dates', action='append',
+                        help="'description: YYYY-MM-DD' (repeatable)")
+    parser.add_argument('--hobby', dest='hobbies_teams', action='append')
+
+
+def add_service_arguments(parser):
+    """Add the options that locate a service."""
+    address = parser.add_mutually_exclusive_group()
+    address.add_argument('--socket', metavar='PATH',
+                         help='Unix socket of the service')
+    address.add_argument('--port', type=int, default=SERVE_PORT,
+                         help='localhost port of the service (default: '
+                              '%(default)s)')
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='pmwl',
+        description='Pimp My Wordlist - custom wordlist generator. '
+                    'Run without arguments for the interactive menu.')
+    commands = parser.add_subparsers(dest='command')
+
+    batch = commands.add_parser(
+        'batch', help='generate wordlists for many targets in parallel')
+    batch.add_argument('targets', help='JSON Lines (.jsonl) or CSV (.csv) '
+                                       'file of target records')
+    add_config_arguments(batch)
+    destination = batch.add_mutually_exclusive_group()
+    destination.add_argument('--output-dir',
+                             help='directory for per-target wordlists '
+                                  '(default: wordlists)')
+    destination.add_argument('--merge', metavar='FILE',
+                             help="write one merged, deduplicated wordlist "
+                                  "('-' for stdout)")
+    batch.add_argument('--workers', type=int,
+                       help='worker processes (default: CPU count)')
+    batch.add_argument('--shard', type=parse_shard, metavar='i/N',
+                       help='write only entries j with j %% N == i')
+    batch.add_argument('--resume', action='store_true',
+                       help='continue interrupted runs from their '
+                            'checkpoints and skip finished targets')
+    batch.add_argument('--estimate', action='store_true',
+                       help='only print upper bounds on the candidate '
+                            'counts; generate nothing')
+    add_profile_arguments(batch, cprofile=False)
+
+    generate = commands.add_parser(
+        'generate', help='generate one wordlist from command-line target '
+                         'details')
+    add_target_arguments(generate)
+    add_config_arguments(generate)
+    generate.add_argument('-o', '--output', default=Config.output_file,
+                          help="output file, or '-' to stream to stdout "
+                               "(default: %(default)s)")
+    generate.add_argument('--shard', type=parse_shard, metavar='i/N',
+                          help='write only entries j with j %% N == i')
+    generate.add_argument('--resume', action='store_true',
+                          help='continue an interrupted run from its '
+                               'checkpoint')
+    add_profile_arguments(generate)
+
+    mangle = commands.add_parser(
+        'mangle', help='apply the mangling stages to every line of a '
+                       'seed dictionary')
+    mangle.add_argument('dictionary', help='seed dictionary, one word '
+                                           'per line')
+    add_target_arguments(mangle)
+    add_config_arguments(mangle)
+    mangle.add_argument('-o', '--output', default=Config.output_file,
+                        help="output file, or '-' to stream to stdout "
+                             "(default: %(default)s)")
+    mangle.add_argument('--workers', type=int,
+                        help='worker processes (default: CPU count)')
+    mangle.add_argument('--chunk-size', type=int, metavar='KB',
+                        default=MANGLE_CHUNK_SIZE // 1024,
+                        help='dictionary bytes per job (default: '
+                             '%(default)s)')
+    mangle.add_argument('--dedupe', action='store_true',
+                        help='build candidates word by word and remove '
+                             'every duplicate within a job; about 5x '
+                             'slower than the default rule-by-rule '
+                             'expansion')
+
+    export = commands.add_parser(
+        'export', help='write a wordlist as hashcat stems plus rules')
+    add_target_arguments(export)
+    add_config_arguments(export)
+    export.add_argument('-o', '--output', required=True, metavar='PREFIX',
+                        help='write PREFIX.N.words, PREFIX.N.rule and '
+                             'PREFIX.export.json')
+
+    verify = commands.add_parser(
+        'verify-export', help='expand an export and diff it against a '
+                              'wordlist')
+    verify.add_argument('manifest', help='PREFIX.export.json file')
+    verify.add_argument('wordlist', help='wordlist generated with the '
+                                         'same options')
+
+    hashes = commands.add_parser(
+        'verify-hashes', help='check generated candidates against '
+                              'captured MD5, SHA-1 or SHA-256 hashes')
+    hashes.add_argument('hash_file', nargs='?',
+                        help="file of hex digests, one per line (extra "
+                             "':'-separated fields are ignored)")
+    hashes.add_argument('--hash', dest='hashes', action='append',
+                        default=[], metavar='DIGEST',
+                        help='a target digest (repeatable)')
+    hashes.add_argument('--algorithm', choices=sorted(
+                            HASH_ALGORITHMS.values()), default='',
+                        help='digest algorithm (default: from each '
+                             "digest's length)")
+    hashes.add_argument('--workers', type=int,
+                        help='hashing processes (default: CPU count)')
+    add_target_arguments(hashes)
+    add_config_arguments(hashes)
+
+    serve = commands.add_parser(
+        'serve', help='answer wordlist requests from a long-running '
+                      'process')
+    add_service_arguments(serve)
+    serve.add_argument('--cache-size', type=int, metavar='MB',
+                       default=SERVE_CACHE_SIZE,
+                       help='keep finished wordlists up to MB megabytes '
+                            '(default: %(default)s)')
+    serve.add_argument('--root', metavar='DIR', default='',
+                       help='let requests name rule, weight, leet, '
+                            'exclusion, cache and temp paths under DIR '
+                            '(default: no paths allowed)')
+
+    client = commands.add_parser(
+        'client', help='fetch a wordlist from a running pmwl serve')
+    add_service_arguments(client)
+    add_target_arguments(client)
+    add_config_arguments(client)
+    client.add_argument('-o', '--output', default=STDOUT_TARGET,
+                        help="output file, or '-' for stdout "
+                             "(default: %(default)s)")
+    client.add_argument('--metrics', action='store_true',
+                        help="print the service's request, cache and "
+                             "latency metrics instead")
+
+    read = commands.add_parser(
+        'read', help='print a slice of a binary (.pmwl) wordlist as text')
+    read.add_argument('wordlist', help='binary wordlist file')
+    read.add_argument('--start', type=int, default=0,
+                      help='index of the first entry (default: 0)')
+    read.add_argument('--count', type=int,
+                      help='number of entries (default: to the end)')
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        run_interactive()
+        return 0
+
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.print_help()
+        return 2
+    try:
+        if args.command == 'read':
+            run_read(args.wordlist, args.start, args.count)
+            return 0
+        if args.command == 'verify-export':
+            return 0 if run_verify_export(args.manifest, args.wordlist) else 1
+        if args.command == 'serve':
+            run_serve(args.socket, args.port, args.cache_size, args.root)
+            return 0
+        config = config_from_args(args)
+        if args.command == 'verify-hashes':
+            return 0 if run_verify_hashes(
+                target_from_args(args), config, args.hash_file, args.hashes,
+                args.algorithm, args.workers) else 1
+        if args.command == 'client':
+            run_client(target_from_args(args), config, args.output,
+                       args.socket, args.port, args.metrics)
+            return 0
+        if args.command == 'export':
+            run_export(target_from_args(args), config, args.output)
+            return 0
+        if args.command == 'mangle':
+            run_mangle(args.dictionary, config, args.output,
+                       target_from_args(args), args.workers,
+                       args.chunk_size * 1024, args.dedupe)
+            return 0
+        profiling = args.profile or args.profile_json
+        profile = PipelineProfile() if profiling else None
+        if args.command == 'batch' and args.estimate:
+            estimate_batch(args.targets, config)
+            profile = None
+        elif args.command == 'batch':
+            run_batch(args.targets, config, output_dir=args.output_dir,
+                      merged_output=args.merge, workers=args.workers,
+                      shard=args.shard, resume=args.resume, profile=profile)
+        elif args.command == 'generate' and args.cprofile:
+            profiler = cProfile.Profile()
+            profiler.runcall(run_generate, target_from_args(args), config,
+                             args.output, shard=args.shard,
+                             resume=args.resume, profile=profile)
+            profiler.dump_stats(args.cprofile)
+            print(f"cProfile stats saved to {args.cprofile}",
+                  file=sys.stderr)
+        elif args.command == 'generate':
+            run_generate(target_from_args(args), config, args.output,
+                         shard=args.shard, resume=args.resume,
+                         profile=profile)
+        if profile is not None:
+            report_profile(profile, args.profile_json)
+    except BrokenPipeError:
+        # The reader (e.g. a cracker) exited; stop quietly and keep the
+        # interpreter from failing again while flushing stdout at exit.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
+    except (OSError, ValueError) as e:
+        print(f"pmwl: error: {e}", file=sys.stderr)
+        return 1
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import builtins
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pmwl  # noqa: E402
+
+# Targets shared by the tests: names only, a full family with dates and
+# hobbies, and a single hobby
+PROFILES = {
+    'names': dict(first_name='Alice', last_name='Smith', birth_year='1985'),
+    'family': dict(first_name='Alice', middle_name='Marie',
+                   last_name='Smith', birth_year='1990', spouse_name='Bob',
+                   pet_names=['Rex', 'Buddy'], children_names=['Tom'],
+                   important_dates=['Wedding: 2015-06-21', 'Grad: 06-01'],
+                   hobbies_teams=['Liverpool', 'photography']),
+    'hobby': dict(hobbies_teams=['x']),
+}
+
+# A target whose wordlist spans several writer chunks
+LARGE_PROFILE = dict(first_name='Alice', last_name='Smith',
+                     birth_year='1990', pet_names=['Rex', 'Buddy', 'Max'],
+                     children_names=['Tom'],
+                     hobbies_teams=['Liverpool', 'chess'])
+LARGE_CONFIG = dict(complexity='high', size='massive', combine=3,
+                    write_queue=0)
+
+
+@pytest.fixture
+def quiet(monkeypatch):
+    """Answer every prompt with Enter and skip clearing the screen."""
+    monkeypatch.setattr(builtins, 'input', lambda *args: '')
+    monkeypatch.setattr(pmwl, 'clear_screen', lambda: None)
+
+
+def read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read().splitlines()
@@ -0,0 +1,76 @@
+"""Headless batch mode."""
+import csv
+import json
+
+import pytest
+
+import pmwl
+from conftest import PROFILES, read_lines
+
+
+@pytest.fixture
+def targets_file(tmp_path):
+    path = tmp_path / 'targets.jsonl'
+    path.write_text(''.join(json.dumps(dict(fields, id=name)) + '\n'
+                            for name, fields in sorted(PROFILES.items())))
+    return str(path)
+
+
+def test_csv_and_jsonl_targets_match(tmp_path, targets_file):
+    path = tmp_path / 'targets.csv'
+    fields = sorted({k for p in PROFILES.values() for k in p} | {'id'})
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for name, profile in sorted(PROFILES.items()):
+            row = {k: pmwl.CSV_LIST_SEPARATOR.join(v) if isinstance(v, list)
+                   else v for k, v in profile.items()}
+            writer.writerow(dict(row, id=name))
+    assert pmwl.load_targets(str(path)) == pmwl.load_targets(targets_file)
+
+
+def test_unknown_target_field_rejected():
+    with pytest.raises(ValueError):
+        pmwl.target_from_record({'first_name': 'Alice', 'shoe_size': '9'})
+
+
+def test_batch_matches_single_target(tmp_path, targets_file):
+    config = pmwl.Config(size='small', complexity='high')
+    output_dir = tmp_path / 'out'
+    results = pmwl.run_batch(targets_file, config, str(output_dir),
+                             workers=2)
+    assert len(results) == len(PROFILES)
+    for index, name in enumerate(sorted(PROFILES)):
+        expected = str(tmp_path / f'{name}.txt')
+        pmwl.build_wordlist(pmwl.TargetInfo(**PROFILES[name]), config,
+                            expected)
+        produced = output_dir / f'{index:04d}_{name}.txt'
+        assert read_lines(produced) == read_lines(expected)
+
+
+def test_merged_batch_is_deduplicated(tmp_path, targets_file):
+    config = pmwl.Config(size='small', complexity='medium')
+    merged = str(tmp_path / 'merged.txt')
+    pmwl.run_batch(targets_file, config, merged_output=merged, workers=1)
+    words = read_lines(merged)
+    expected = set()
+    for fields in PROFILES.values():
+        selector = pmwl.select_candidates(
+            pmwl.iter_candidates(pmwl.TargetInfo(**fields), config),
+            config.target_size, config.ordering)
+        expected.update(word for word, _ in selector.result())
+    assert len(words) == len(set(words))
+    assert set(words) == expected
+
+
+@pytest.mark.parametrize('target_id', ['../../escaped', '/tmp/abs', '..'])
+def test_target_ids_stay_inside_the_output_dir(tmp_path, target_id):
+    path = tmp_path / 'targets.jsonl'
+    path.write_text(json.dumps(dict(PROFILES['names'], id=target_id)) + '\n')
+    output_dir = tmp_path / 'a' / 'b' / 'out'
+    pmwl.run_batch(str(path), pmwl.Config(size='small'), str(output_dir),
+                   workers=1)
+    written = [p for p in tmp_path.rglob('*') if p.is_file()
+               and p.name.endswith('.txt')]
+    assert len(written) == 1
+    assert written[0].parent == output_dir
@@ -0,0 +1,94 @@
+"""On-disk stage output cache."""
+import dataclasses
+import sqlite3
+
+import pytest
+
+import pmwl
+from conftest import PROFILES
+
+
+def generate(target, config, path):
+    with pmwl.VariantCache(str(path)) as cache:
+        candidates = list(pmwl.iter_candidates(target, config, cache=cache))
+    return candidates, cache
+
+
+@pytest.mark.parametrize('complexity', ['low', 'extreme'])
+def test_cache_hits_give_the_same_stream(tmp_path, complexity):
+    target = pmwl.TargetInfo(**PROFILES['family'])
+    config = pmwl.Config(complexity=complexity)
+    expected = list(pmwl.iter_candidates(target, config))
+    path = tmp_path / 'cache.db'
+
+    cold, cache = generate(target, config, path)
+    assert cold == expected
+    assert cache.hits == 0 and cache.misses > 0
+    units = cache.misses
+
+    warm, cache = generate(target, config, path)
+    assert warm == expected
+    assert (cache.hits, cache.misses) == (units, 0)
+
+
+def test_new_stem_only_rebuilds_what_it_changes(tmp_path):
+    target = pmwl.TargetInfo(**PROFILES['family'])
+    config = pmwl.Config(complexity='extreme')
+    path = tmp_path / 'cache.db'
+    _, cache = generate(target, config, path)
+    units = cache.misses
+
+    grown = dataclasses.replace(target,
+                                pet_names=target.pet_names + ['Max'])
+    candidates, cache = generate(grown, config, path)
+    assert candidates == list(pmwl.iter_candidates(grown, config))
+    assert 0 < cache.misses < units // 4
+
+
+def test_cache_stays_within_its_size(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    config = pmwl.Config(complexity='extreme')
+    with pmwl.VariantCache(path, max_bytes=20000) as cache:
+        for fields in PROFILES.values():
+            list(pmwl.iter_candidates(pmwl.TargetInfo(**fields), config,
+                                      cache=cache))
+            cache.flush()
+    db = sqlite3.connect(path)
+    stored = db.execute('SELECT SUM(size) FROM variants').fetchone()[0]
+    db.close()
+    assert stored <= 20000
+
+
+def test_long_units_stream_uncached(tmp_path, monkeypatch):
+    monkeypatch.setattr(pmwl, 'VARIANT_CACHE_UNIT', 5)
+    target = pmwl.TargetInfo(**PROFILES['family'])
+    config = pmwl.Config(complexity='extreme', min_length=7)
+    pruned = {}
+    expected = list(pmwl.iter_candidates(target, config, pruned=pruned))
+    path = str(tmp_path / 'cache.db')
+    for attempt in range(2):
+        cached_pruned = {}
+        with pmwl.VariantCache(path) as cache:
+            assert list(pmwl.iter_candidates(
+                target, config, cache=cache,
+                pruned=cached_pruned)) == expected
+        assert ({name: count for name, count in cached_pruned.items()
+                 if count} == {name: count for name, count in pruned.items()
+                               if count})
+    db = sqlite3.connect(path)
+    stored = db.execute('SELECT COUNT(*) FROM variants').fetchone()[0]
+    db.close()
+    assert 0 < stored < cache.hits + cache.misses
+
+
+def test_pending_entries_are_written_early(tmp_path, monkeypatch):
+    monkeypatch.setattr(pmwl, 'VARIANT_CACHE_PENDING', 1000)
+    path = str(tmp_path / 'cache.db')
+    target = pmwl.TargetInfo(**PROFILES['family'])
+    with pmwl.VariantCache(path) as cache:
+        list(pmwl.iter_candidates(target, pmwl.Config(complexity='high'),
+                                  cache=cache))
+        db = sqlite3.connect(path)
+        stored = db.execute('SELECT COUNT(*) FROM variants').fetchone()[0]
+        db.close()
+        assert stored > 0
@@ -0,0 +1,78 @@
+"""Date parsing and the tokens dates add to every stem."""
+import pytest
+
+import pmwl
+
+MEDIUM = pmwl.COMPLEXITY_MEDIUM
+EXTREME = pmwl.COMPLEXITY_EXTREME
+
+
+def tokens(entry, orders='mdy', level=EXTREME):
+    return pmwl.date_tokens([entry], pmwl.parse_date_orders(orders), level)
+
+
+@pytest.mark.parametrize('entry, digits', [
+    ('Anniv: 6/21', '621'),
+    ('X: 6/21/2015', '6212015'),
+    ('Wedding: 2015-06-21', '20150621'),
+    ('Grad: 06-01', '0601'),
+    ('Born: June 21st', '21'),
+])
+def test_digits_come_first(entry, digits):
+    assert tokens(entry)[0] == pmwl.extract_date_numbers([entry])[0]
+    assert tokens(entry)[0] == digits
+
+
+def test_formats_by_level():
+    assert tokens('Wedding: 2015-06-21', level=MEDIUM) == [
+        '20150621', '0621', '06212015']
+    extreme = tokens('Wedding: 2015-06-21')
+    assert {'062115', '621', '2015', '15', 'jun21', 'June21', '21jun',
+            'jun2015'} <= set(extreme)
+    assert len(extreme) == len(set(extreme))
+
+
+def test_date_order():
+    assert '21062015' in tokens('Wedding: 2015-06-21', 'dmy')
+    assert '06212015' not in tokens('Wedding: 2015-06-21', 'dmy')
+    both = tokens('Wedding: 2015-06-21', 'dmy,mdy')
+    assert {'21062015', '06212015'} <= set(both)
+
+
+def test_unknown_date_order_rejected():
+    with pytest.raises(ValueError):
+        pmwl.parse_date_orders('mdy,ydm')
+
+
+def test_entries_without_a_date():
+    assert tokens('Note: none') == []
+    assert tokens('no separator 2015') == []
+
+
+@pytest.mark.parametrize('entry, expected', [
+    ('Anniv: 6/21', {'alice621', 'Alice621'}),
+    ('X: 6/21/2015', {'alice6212015', 'Alice6212015'}),
+])
+def test_unrecognised_dates_keep_their_digits(entry, expected):
+    target = pmwl.TargetInfo(first_name='Alice', important_dates=[entry])
+    config = pmwl.Config(complexity='medium')
+    words = {word for word, _ in pmwl.iter_candidates(target, config)}
+    assert expected <= words
+
+
+@pytest.mark.parametrize('text, parsed', [
+    ('02-31', None),
+    ('04-31', None),
+    ('2015-02-29', None),
+    ('31/04/2015', None),
+    ('2016-02-29', ('2016', '02', '29')),
+    ('02-29', ('', '02', '29')),
+    ('04-30', ('', '04', '30')),
+])
+def test_days_the_month_lacks_rejected(text, parsed):
+    assert pmwl.parse_date(text) == parsed
+
+
+def test_impossible_dates_keep_only_their_digits():
+    assert tokens('Odd: 2015-02-30') == ['20150230']
+    assert tokens('Odd: 04-31') == ['0431']
@@ -0,0 +1,74 @@
+"""The streaming pipeline against the original in-memory generator."""
+import pytest
+
+import baseline_pmwl
+import pmwl
+from conftest import PROFILES, read_lines
+
+LEVELS = ['low', 'medium', 'high', 'extreme']
+
+
+@pytest.fixture
+def baseline(monkeypatch, tmp_path, quiet):
+    """Run the original generate_wordlist and return its entries."""
+    monkeypatch.setattr(baseline_pmwl, 'clear_screen', lambda: None)
+
+    def run(fields, complexity, size='custom'):
+        output = tmp_path / 'baseline.txt'
+        config = baseline_pmwl.Config(size=size, complexity=complexity,
+                                      output_file=str(output),
+                                      custom_size=10 ** 9)
+        baseline_pmwl.generate_wordlist(baseline_pmwl.TargetInfo(**fields),
+                                        config)
+        return read_lines(output)
+    return run
+
+
+def candidate_set(fields, complexity):
+    config = pmwl.Config(complexity=complexity)
+    return {word for word, _ in
+            pmwl.iter_candidates(pmwl.TargetInfo(**fields), config)}
+
+
+@pytest.mark.parametrize('complexity', LEVELS)
+@pytest.mark.parametrize('profile', ['names', 'hobby'])
+def test_same_candidates_as_baseline(baseline, profile, complexity):
+    fields = PROFILES[profile]
+    assert candidate_set(fields, complexity) == set(baseline(fields,
+                                                             complexity))
+
+
+@pytest.mark.parametrize('complexity', LEVELS)
+def test_dates_only_add_formatted_candidates(baseline, complexity):
+    fields = PROFILES['family']
+    expected = set(baseline(fields, complexity))
+    candidates = candidate_set(fields, complexity)
+    assert expected <= candidates
+    config = pmwl.Config(complexity=complexity)
+    tokens = pmwl.date_tokens(fields['important_dates'],
+                              pmwl.parse_date_orders(config.date_order),
+                              config.complexity_level)
+    for word in candidates - expected:
+        assert word.endswith(tuple(tokens)), word
+
+
+@pytest.mark.parametrize('complexity', LEVELS)
+@pytest.mark.parametrize('size', ['small', 'massive'])
+def test_lexical_wordlist_matches_baseline_file(baseline, tmp_path,
+                                               complexity, size):
+    fields = PROFILES['names']
+    expected = baseline(fields, complexity, size)
+    config = pmwl.Config(size=size, complexity=complexity,
+                         ordering='lexical')
+    output = str(tmp_path / 'new.txt')
+    pmwl.build_wordlist(pmwl.TargetInfo(**fields), config, output)
+    assert read_lines(output) == expected
+
+
+def test_writer_chunks_join_to_one_list(tmp_path):
+    words = [f"word{i}" for i in range(25)]
+    output = str(tmp_path / 'chunks.txt')
+    with pmwl.WordlistWriter(output, chunk_size=4) as writer:
+        writer.write_all(words)
+    assert writer.words_written == len(words)
+    assert read_lines(output) == words
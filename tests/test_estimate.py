@@ -0,0 +1,50 @@
+"""Analytic candidate counts against the generated stream."""
+import pytest
+
+import pmwl
+from conftest import LARGE_PROFILE, PROFILES
+
+LEVELS = ['low', 'medium', 'high', 'extreme']
+
+
+@pytest.mark.parametrize('complexity', LEVELS)
+@pytest.mark.parametrize('profile', sorted(PROFILES))
+def test_estimate_equals_generated_count(profile, complexity):
+    target = pmwl.TargetInfo(**PROFILES[profile])
+    config = pmwl.Config(complexity=complexity)
+    estimate = pmwl.estimate_candidates(target, config)
+    candidates = list(pmwl.iter_candidates(target, config))
+    assert estimate.total == len(candidates)
+    assert estimate.expected_entries(10 ** 9) >= len(set(candidates))
+
+
+@pytest.mark.parametrize('budget', [0, 1, 7, 40, pmwl.LEET_BUDGET])
+@pytest.mark.parametrize('combinatorial', [False, True])
+@pytest.mark.parametrize('word', ['Alice', 'passwordliverpool', 'xyz'])
+def test_count_leet_equals_yielded(word, combinatorial, budget):
+    table = pmwl.build_leet_table(pmwl.LEET_MAP, pmwl.COMPLEXITY_EXTREME)
+    positions = pmwl.leet_positions(word, table)
+    assert (pmwl.count_leet(positions, combinatorial, budget)
+            == len(list(pmwl.iter_leet(word, positions, combinatorial,
+                                       budget))))
+
+
+@pytest.mark.parametrize('size', [1, 100, 10 ** 6])
+def test_balanced_run_stays_within_quotas(size):
+    target = pmwl.TargetInfo(**LARGE_PROFILE)
+    config = pmwl.Config(complexity='extreme', size='custom',
+                         custom_size=size, balanced=True)
+    estimate = pmwl.estimate_candidates(target, config)
+    quotas = pmwl.plan_budgets(estimate, config.target_size)
+    expected = min(size, estimate.total)
+    assert sum(quotas.values()) == expected
+    assert sum(1 for _ in pmwl.iter_candidates(target, config)) == expected
+
+
+@pytest.mark.parametrize('combine', [2, 3, 4])
+@pytest.mark.parametrize('profile', sorted(PROFILES))
+def test_combination_estimate_equals_generated_count(profile, combine):
+    target = pmwl.TargetInfo(**PROFILES[profile])
+    config = pmwl.Config(complexity='high', combine=combine)
+    assert (pmwl.estimate_candidates(target, config).total
+            == sum(1 for _ in pmwl.iter_candidates(target, config)))
@@ -0,0 +1,89 @@
+"""Excluding candidates found in earlier wordlists and potfiles."""
+import dataclasses
+import os
+
+import pytest
+
+import pmwl
+from conftest import PROFILES, read_lines
+
+
+@pytest.fixture
+def full_list(tmp_path):
+    output = str(tmp_path / 'full.txt')
+    config = pmwl.Config(complexity='high', size='massive')
+    pmwl.build_wordlist(pmwl.TargetInfo(**PROFILES['names']), config, output)
+    return config, read_lines(output)
+
+
+def test_exclude_wordlist_and_hex_potfile(tmp_path, full_list):
+    config, full = full_list
+    tried = tmp_path / 'tried.txt.gz'
+    with pmwl.WordlistWriter(str(tried)) as writer:
+        writer.write_all(['alice', 'unrelated'])
+    potfile = tmp_path / 'hashcat.potfile'
+    potfile.write_text(f"5f4dcc3b5aa765d61d8327deb882cf99:{full[-1]}\n"
+                       f"8d3533d75ae2c3966d7e0d4fcc69216b:"
+                       f"$HEX[{'Alice1985'.encode().hex()}]\n")
+    excluded = {'alice', full[-1], 'Alice1985'}
+    assert excluded <= set(full)
+
+    output = str(tmp_path / 'new.txt')
+    constrained = dataclasses.replace(
+        config, exclude_files=[str(tried), str(potfile)])
+    result = pmwl.build_wordlist(pmwl.TargetInfo(**PROFILES['names']),
+                                 constrained, output)
+    assert read_lines(output) == [word for word in full
+                                  if word not in excluded]
+    assert result.excluded >= len(excluded)
+    assert os.path.exists(str(potfile) + pmwl.EXCLUDE_SUFFIX)
+
+
+def test_index_spanning_several_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(pmwl, 'EXCLUDE_RUN_SIZE', 16)
+    source = tmp_path / 'tried.txt'
+    words = [f"word{i % 50}" for i in range(120)]
+    source.write_text('\n'.join(words) + '\n')
+    with pmwl.Exclusions([str(source)], str(tmp_path)) as exclusions:
+        assert len(exclusions.indexes[0]) == 50
+        assert all(word in exclusions for word in words)
+        assert 'word50' not in exclusions
+    assert sorted(os.listdir(tmp_path)) == ['tried.txt', 'tried.txt.pmwlx']
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    source = tmp_path / 'tried.txt'
+    source.write_text('alice\n')
+    index = pmwl.ExclusionIndex(str(source))
+    assert index.built and 'alice' in index
+    index.close()
+    index = pmwl.ExclusionIndex(str(source))
+    assert not index.built
+    index.close()
+
+    source.write_text('bob\nsmith\n')
+    os.utime(source, ns=(0, 10 ** 9))
+    index = pmwl.ExclusionIndex(str(source))
+    assert index.built
+    assert 'bob' in index and 'alice' not in index
+    index.close()
+
+
+def test_read_only_source_is_indexed_in_the_cache(tmp_path, monkeypatch):
+    source_dir = tmp_path / 'shared'
+    source_dir.mkdir()
+    source = source_dir / 'tried.txt'
+    source.write_text('alice\n')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    access = os.access
+    monkeypatch.setattr(os, 'access', lambda path, mode: (
+        path != str(source_dir) and access(path, mode)))
+
+    index = pmwl.ExclusionIndex(str(source))
+    assert index.built and 'alice' in index
+    assert os.path.dirname(index.path) == str(tmp_path / 'cache' / 'pmwl')
+    index.close()
+    assert os.listdir(source_dir) == ['tried.txt']
+    index = pmwl.ExclusionIndex(str(source))
+    assert not index.built
+    index.close()
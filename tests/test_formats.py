@@ -0,0 +1,83 @@
+"""Output formats, binary slices and stem/rule export."""
+import pytest
+
+import pmwl
+from conftest import PROFILES, read_lines
+
+
+@pytest.fixture(scope='module')
+def family():
+    return pmwl.TargetInfo(**PROFILES['family'])
+
+
+@pytest.fixture(scope='module')
+def config():
+    return pmwl.Config(complexity='extreme', size='massive')
+
+
+@pytest.fixture
+def text_entries(family, config, tmp_path):
+    output = str(tmp_path / 'plain.txt')
+    pmwl.build_wordlist(family, config, output)
+    return read_lines(output)
+
+
+@pytest.mark.parametrize('output_format', sorted(pmwl.OUTPUT_FORMATS))
+def test_format_round_trip(family, config, tmp_path, text_entries,
+                           output_format):
+    output = str(tmp_path / ('list' + pmwl.OUTPUT_FORMATS[output_format]))
+    result = pmwl.build_wordlist(family, config, output)
+    assert result.entries == len(text_entries)
+    assert list(pmwl.iter_wordlist(output)) == text_entries
+
+
+def test_binary_slices(family, config, tmp_path, text_entries):
+    output = str(tmp_path / 'list.pmwl')
+    pmwl.build_wordlist(family, config, output)
+    stride = pmwl.BINARY_INDEX_STRIDE
+    with pmwl.BinaryWordlist(output) as wordlist:
+        assert len(wordlist) == len(text_entries)
+        assert list(wordlist.iter_slice(0)) == text_entries
+        for index in (0, stride - 1, stride, len(text_entries) - 1, -1):
+            assert wordlist[index] == text_entries[index]
+        for start, stop in ((0, 10), (stride - 3, 2 * stride + 5),
+                            (len(text_entries) - 5, len(text_entries) + 5)):
+            assert (list(wordlist.iter_slice(start, stop))
+                    == text_entries[start:stop])
+        with pytest.raises(IndexError):
+            wordlist[len(text_entries)]
+
+
+def test_binary_to_stdout_rejected():
+    with pytest.raises(ValueError):
+        pmwl.WordlistWriter(pmwl.STDOUT_TARGET, output_format='binary')
+
+
+def test_export_expands_to_wordlist(family, config, tmp_path, text_entries,
+                                    capsys):
+    prefix = str(tmp_path / 'alice')
+    wordlist = str(tmp_path / 'plain.txt')
+    pmwl.run_export(family, config, prefix)
+    assert pmwl.run_verify_export(prefix + '.export.json', wordlist)
+
+    with open(wordlist, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(text_entries[1:]) + '\n')
+    assert not pmwl.run_verify_export(prefix + '.export.json', wordlist)
+
+
+@pytest.mark.parametrize('complexity', ['low', 'medium', 'high', 'extreme'])
+@pytest.mark.parametrize('size', ['small', 'massive'])
+def test_export_of_every_level(tmp_path, complexity, size, capsys):
+    target = pmwl.TargetInfo(**dict(PROFILES['family'], first_name='Zoë'))
+    config = pmwl.Config(complexity=complexity, size=size)
+    wordlist = str(tmp_path / 'list.txt.gz')
+    pmwl.build_wordlist(target, config, wordlist)
+    prefix = str(tmp_path / 'zoe')
+    pmwl.run_export(target, config, prefix)
+    assert pmwl.run_verify_export(prefix + '.export.json', wordlist)
+
+
+def test_binary_rejects_entries_too_long(tmp_path):
+    with pytest.raises(ValueError):
+        with pmwl.WordlistWriter(str(tmp_path / 'long.pmwl')) as writer:
+            writer.write('a' * (pmwl.BINARY_ENTRY_MAX + 1))
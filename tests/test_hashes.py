@@ -0,0 +1,81 @@
+"""Checking generated candidates against captured hashes."""
+import hashlib
+
+import pytest
+
+import pmwl
+from conftest import PROFILES
+
+
+def digest(algorithm, word):
+    return hashlib.new(algorithm, word.encode()).hexdigest()
+
+
+@pytest.fixture
+def names():
+    return pmwl.TargetInfo(**PROFILES['names'])
+
+
+def test_finds_md5_and_sha1(names, tmp_path):
+    path = tmp_path / 'hashes.txt'
+    path.write_text(f"# captured\nalice:{digest('md5', 'Alice1985')}:1001\n"
+                    f"\n{digest('sha1', 'smith!')}\n")
+    targets = pmwl.load_target_hashes(str(path))
+    assert set(targets) == {'md5', 'sha1'}
+    config = pmwl.Config(complexity='high')
+    hits, checked = pmwl.verify_hashes(names, config, targets, workers=1)
+    found = {(hit.algorithm, hit.candidate): hit for hit in hits}
+    assert set(found) == {('md5', 'Alice1985'), ('sha1', 'smith!')}
+    hit = found[('md5', 'Alice1985')]
+    assert hit.digest == digest('md5', 'Alice1985')
+    assert (hit.stage, hit.stem) == ('birth_year', 'alice')
+    ops = [(code, args) for code, args, _ in pmwl.parse_rule(hit.rule)]
+    assert pmwl.apply_rule_ops(ops, 'alice') == 'Alice1985'
+    assert checked > 0
+
+
+def test_missing_digest_checks_every_candidate(names):
+    targets = pmwl.load_target_hashes(
+        hashes=[digest('sha256', 'not generated'), digest('md5', 'alice')])
+    config = pmwl.Config(complexity='medium')
+    hits, checked = pmwl.verify_hashes(names, config, targets, workers=2,
+                                       batch_size=16)
+    assert [hit.candidate for hit in hits] == ['alice']
+    unique = {word for word, _ in pmwl.iter_candidates(names, config)}
+    assert checked == len(unique)
+
+
+@pytest.mark.parametrize('line', ['alice:nothex', 'abc123', ''])
+def test_lines_without_a_digest_rejected(line):
+    with pytest.raises(ValueError):
+        pmwl.load_target_hashes(hashes=[line] if line else [])
+
+
+def test_algorithm_option_overrides_length():
+    assert pmwl.parse_digest(digest('md5', 'x'), 'sha1') is None
+    assert pmwl.parse_digest(digest('sha1', 'x'))[0] == 'sha1'
+
+
+@pytest.mark.parametrize('complexity, word, leet', [
+    ('high', '4lice', (('a', '4'),)),
+    ('extreme', '@lic3', (('a', '@'), ('e', '3'))),
+])
+def test_leet_hits_name_the_substitutions(names, capsys, complexity, word,
+                                          leet):
+    config = pmwl.Config(complexity=complexity)
+    assert pmwl.run_verify_hashes(names, config,
+                                  hashes=[digest('md5', word)], workers=1)
+    err = capsys.readouterr().err
+    assert 'leet ' + ', '.join(f'{a}->{b}' for a, b in leet) in err
+    targets = pmwl.load_target_hashes(hashes=[digest('md5', word)])
+    [hit] = pmwl.verify_hashes(names, config, targets, workers=1)[0]
+    assert (hit.stage, hit.stem, hit.leet) == ('leet', 'alice', leet)
+    assert 'L' not in hit.rule
+
+
+def test_leet_substitutions_follow_longer_replacements():
+    positions = pmwl.leet_positions('tux', {'u': ('|_|',), 't': ('7',)})
+    assert pmwl.leet_substitutions('tux', '7|_|x', positions) == [
+        ('t', '7'), ('u', '|_|')]
+    assert pmwl.leet_substitutions('tux', 't|_|x', positions) == [
+        ('u', '|_|')]
@@ -0,0 +1,69 @@
+"""The Gray-code leet engine."""
+import itertools
+import json
+
+import pytest
+
+import baseline_pmwl
+import pmwl
+
+WORDS = ['Alice', 'password', 'liverpool', 'x', 'Tom1990']
+
+
+def full_product(word, positions):
+    chars = list(word)
+    for combo in itertools.product(*(options for _, options in positions)):
+        for (index, _), ch in zip(positions, combo):
+            chars[index] = ch
+        yield ''.join(chars)
+
+
+@pytest.mark.parametrize('word', WORDS)
+def test_gray_code_walks_the_full_product(word):
+    table = pmwl.build_leet_table(pmwl.LEET_MAP, pmwl.COMPLEXITY_EXTREME)
+    positions = pmwl.leet_positions(word, table)
+    pairs = list(pmwl.iter_leet(word, positions, True, budget=10 ** 6))
+    variants = [variant for variant, _ in pairs]
+    assert len(variants) == len(set(variants))
+    assert set(variants) == set(full_product(word, positions)) - {word}
+    for variant, substitutions in pairs:
+        assert substitutions == sum(a != b for a, b in zip(word, variant))
+
+
+@pytest.mark.parametrize('level', [pmwl.COMPLEXITY_MEDIUM,
+                                   pmwl.COMPLEXITY_HIGH,
+                                   pmwl.COMPLEXITY_EXTREME])
+@pytest.mark.parametrize('word', WORDS)
+def test_matches_original_within_old_limit(word, level):
+    assert (pmwl.apply_leet_variants(word, level)
+            == baseline_pmwl.apply_leet_variants(word, level))
+
+
+def test_budget_keeps_single_substitutions_first():
+    word = 'passwordliverpool'
+    table = pmwl.build_leet_table(pmwl.LEET_MAP, pmwl.COMPLEXITY_EXTREME)
+    positions = pmwl.leet_positions(word, table)
+    singles = sum(len(options) - 1 for _, options in positions)
+    pairs = list(pmwl.iter_leet(word, positions, True, budget=singles + 5))
+    assert len(pairs) == singles + 5
+    assert all(count == 1 for _, count in pairs[:singles])
+    assert all(count > 1 for _, count in pairs[singles:])
+
+
+def test_leet_table_file(tmp_path):
+    path = tmp_path / 'leet.json'
+    path.write_text(json.dumps({'b': ['8', '|3'], 'a': ['^', '4']}))
+    leet_map = pmwl.load_leet_map(str(path))
+    assert leet_map['b'] == ['8', '|3']
+    assert leet_map['a'] == pmwl.LEET_MAP['a'] + ['^']
+    path.write_text(json.dumps({'ab': ['x']}))
+    with pytest.raises(ValueError):
+        pmwl.load_leet_map(str(path))
+
+
+def test_leet_table_options_are_normalised(tmp_path):
+    path = tmp_path / 'leet.json'
+    path.write_text(json.dumps({'B': [8, '8', 'b', 'B', '|3'], 'T': [7]}))
+    leet_map = pmwl.load_leet_map(str(path))
+    assert leet_map['b'] == ['8', '|3']
+    assert leet_map['t'] == pmwl.LEET_MAP['t']
@@ -0,0 +1,74 @@
+"""Mangling an external seed dictionary."""
+import pytest
+
+import pmwl
+from conftest import read_lines
+
+SEEDS = ['password', 'Dragon', '', 'liverpool', 'monkey', 'sunshine',
+         'password', 'qwerty']
+
+
+@pytest.fixture
+def dictionary(tmp_path):
+    path = tmp_path / 'seeds.txt'
+    path.write_bytes('\n'.join(SEEDS).encode() + b'\n\xff\xfe\nabc')
+    return str(path)
+
+
+def expected_candidates(config, target=None):
+    ctx = pmwl.build_context(target or pmwl.TargetInfo(), config)
+    candidates = {}
+    for seed in SEEDS + ['abc']:
+        word = seed.lower()
+        if not word:
+            continue
+        for name, min_level, stage, _ in pmwl.WORD_STAGES:
+            if ctx.level >= min_level:
+                for candidate, _ in stage(word, word.capitalize(), ctx):
+                    candidates[candidate] = None
+    return list(candidates)
+
+
+@pytest.mark.parametrize('size', [1, 7, 64])
+def test_chunks_end_on_line_boundaries(dictionary, size):
+    with open(dictionary, 'rb') as f:
+        data = f.read()
+    chunks = list(pmwl.dictionary_chunks(dictionary, size))
+    assert b''.join(data[start:stop] for start, stop in chunks) == data
+    assert all(data[stop - 1:stop] == b'\n' for _, stop in chunks[:-1])
+
+
+@pytest.mark.parametrize('complexity', ['low', 'high', 'extreme'])
+def test_dedupe_matches_word_stages(dictionary, tmp_path, complexity,
+                                    capsys):
+    config = pmwl.Config(complexity=complexity)
+    output = str(tmp_path / 'out.txt')
+    pmwl.run_mangle(dictionary, config, output, workers=1, dedupe=True)
+    lines = read_lines(output)
+    assert lines == expected_candidates(config)
+    assert len(lines) == len(set(lines))
+    assert 'Skipped 1 lines' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('chunk_size', [8, pmwl.MANGLE_CHUNK_SIZE])
+@pytest.mark.parametrize('complexity', ['low', 'medium', 'extreme'])
+def test_block_expansion_keeps_every_candidate(dictionary, tmp_path,
+                                               complexity, chunk_size):
+    config = pmwl.Config(complexity=complexity)
+    output = str(tmp_path / 'out.txt')
+    pmwl.run_mangle(dictionary, config, output, workers=2,
+                    chunk_size=chunk_size)
+    assert set(read_lines(output)) == set(expected_candidates(config))
+
+
+def test_target_wordlist_comes_first(dictionary, tmp_path):
+    target = pmwl.TargetInfo(first_name='Alice', birth_year='1985')
+    config = pmwl.Config(complexity='medium')
+    output = str(tmp_path / 'out.txt')
+    pmwl.run_mangle(dictionary, config, output, target=target, workers=1)
+    selector = pmwl.select_candidates(pmwl.iter_candidates(target, config),
+                                      config.target_size, config.ordering)
+    own = [word for word, _ in selector.result()]
+    lines = read_lines(output)
+    assert lines[:len(own)] == own
+    assert '1985' in ''.join(lines[len(own):])
@@ -0,0 +1,35 @@
+"""The interactive menu."""
+import builtins
+
+import pytest
+
+import pmwl
+
+
+def answer(monkeypatch, replies):
+    """Answer prompts containing a key of `replies`; Enter otherwise."""
+    def fake_input(prompt=''):
+        for key, reply in replies.items():
+            if key in prompt:
+                return reply
+        return ''
+    monkeypatch.setattr(builtins, 'input', fake_input)
+    monkeypatch.setattr(pmwl, 'clear_screen', lambda: None)
+
+
+@pytest.mark.parametrize('name', ['words.lst', 'out', 'list.txt.gz'])
+def test_output_file_is_kept_as_typed(monkeypatch, name):
+    answer(monkeypatch, {'Change output file': 'y',
+                         'Enter new filename': name})
+    config = pmwl.Config()
+    pmwl.configure_wordlist(config)
+    assert config.output_file == name
+
+
+def test_stdout_target_is_refused(monkeypatch, capsys):
+    answer(monkeypatch, {'Change output file': 'y',
+                         'Enter new filename': pmwl.STDOUT_TARGET})
+    config = pmwl.Config(output_file='kept.txt')
+    pmwl.configure_wordlist(config)
+    assert config.output_file == 'kept.txt'
+    assert 'pmwl generate -o -' in capsys.readouterr().out
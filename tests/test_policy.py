@@ -0,0 +1,83 @@
+"""Password policies enforced during generation."""
+import dataclasses
+
+import pytest
+
+import pmwl
+from conftest import PROFILES
+
+POLICIES = [
+    dict(min_length=8),
+    dict(max_length=6),
+    dict(min_length=6, max_length=10, require='upper,digit'),
+    dict(require='symbol'),
+    dict(charset='abcdefghijklmnopqrstuvwxyz0123456789'),
+    dict(min_length=9, require='lower,upper,digit,symbol'),
+]
+CUSTOM_RULES = ['[ ]', '@a $!', 'sa@ c', 'd', 'u ${digit}', 'C L']
+
+
+@pytest.fixture(scope='module')
+def rules_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp('rules') / 'custom.rule'
+    path.write_text('\n'.join(CUSTOM_RULES) + '\n')
+    return str(path)
+
+
+@pytest.mark.parametrize('complexity', ['low', 'high', 'extreme'])
+@pytest.mark.parametrize('policy', POLICIES)
+@pytest.mark.parametrize('profile', ['names', 'family'])
+def test_policy_equals_post_filter(rules_file, profile, policy, complexity):
+    target = pmwl.TargetInfo(**PROFILES[profile])
+    config = pmwl.Config(complexity=complexity, rules_file=rules_file)
+    constrained = dataclasses.replace(config, **policy)
+    accepts = pmwl.build_policy(constrained).accepts
+    expected = [item for item in pmwl.iter_candidates(target, config)
+                if accepts(item[0])]
+    pruned = {}
+    produced = list(pmwl.iter_candidates(target, constrained,
+                                         pruned=pruned))
+    assert produced == expected
+    full = sum(1 for _ in pmwl.iter_candidates(target, config))
+    assert sum(pruned.values()) == full - len(produced)
+
+
+def test_no_policy_without_constraints():
+    assert pmwl.build_policy(pmwl.Config()) is None
+
+
+def test_unknown_class_rejected():
+    with pytest.raises(ValueError):
+        pmwl.parse_classes('upper,emoji')
+
+
+@pytest.mark.parametrize('policy', POLICIES)
+def test_combination_policy_equals_post_filter(policy):
+    target = pmwl.TargetInfo(**PROFILES['family'])
+    config = pmwl.Config(complexity='high', combine=3, combine_length=14)
+    constrained = dataclasses.replace(config, **policy)
+    accepts = pmwl.build_policy(constrained).accepts
+    expected = [item for item in pmwl.iter_candidates(target, config)
+                if accepts(item[0])]
+    assert list(pmwl.iter_candidates(target, constrained)) == expected
+
+
+@pytest.mark.parametrize('policy', [dict(max_length=7), dict(min_length=16),
+                                    dict(min_length=9, max_length=11)])
+def test_name_pairs_pruned_per_stage(policy):
+    target = pmwl.TargetInfo(**PROFILES['family'])
+    config = pmwl.Config(complexity='extreme')
+    constrained = dataclasses.replace(config, **policy)
+    accepts = pmwl.build_policy(constrained).accepts
+    profile = pmwl.PipelineProfile()
+    list(pmwl.iter_candidates(target, config, profile))
+    pruned = {}
+    kept = pmwl.PipelineProfile()
+    list(pmwl.iter_candidates(target, constrained, kept, pruned=pruned))
+    for name in ('name_pairs', 'first_name_combos'):
+        rejected = (profile.stages[name].candidates
+                    - kept.stages[name].candidates)
+        assert rejected > 0
+        assert pruned[name] == rejected
+    assert all(accepts(word) for word, _ in pmwl.iter_candidates(
+        target, constrained))
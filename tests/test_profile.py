@@ -0,0 +1,42 @@
+"""Per-stage pipeline profiling."""
+import os
+
+import pytest
+
+import pmwl
+from conftest import PROFILES
+
+
+@pytest.mark.parametrize('profile_name', sorted(PROFILES))
+def test_stage_counts(profile_name):
+    target = pmwl.TargetInfo(**PROFILES[profile_name])
+    config = pmwl.Config(complexity='extreme')
+    profile = pmwl.PipelineProfile()
+    profiled = list(pmwl.iter_candidates(target, config, profile))
+    assert profiled == list(pmwl.iter_candidates(target, config))
+
+    stages = profile.as_dict()['stages']
+    estimate = pmwl.estimate_candidates(target, config).stages
+    assert {name: stats['candidates'] for name, stats in stages.items()
+            if stats['candidates']} == {name: count for name, count
+                                        in estimate.items() if count}
+    duplicates = sum(stats['duplicates'] for stats in stages.values())
+    assert duplicates == len(profiled) - len({word for word, _ in profiled})
+
+
+def test_write_and_merge(tmp_path):
+    target = pmwl.TargetInfo(**PROFILES['family'])
+    config = pmwl.Config(complexity='high')
+    output = str(tmp_path / 'list.txt')
+    profile = pmwl.PipelineProfile()
+    pmwl.build_wordlist(target, config, output, profile=profile)
+    report = profile.as_dict()
+    assert report['bytes_written'] == os.path.getsize(output)
+
+    merged = pmwl.PipelineProfile()
+    merged.merge(report)
+    merged.merge(report)
+    assert merged.bytes_written == 2 * report['bytes_written']
+    for name, stats in report['stages'].items():
+        assert (merged.stages[name].candidates
+                == 2 * stats['candidates'])
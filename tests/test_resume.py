@@ -0,0 +1,80 @@
+"""Resuming an interrupted wordlist from its checkpoint, and sharding."""
+import os
+
+import pytest
+
+import pmwl
+from conftest import LARGE_CONFIG, LARGE_PROFILE, read_lines
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(chunks):
+    def progress(writer):
+        if writer.words_written >= chunks * writer.chunk_size:
+            raise Interrupted
+    return progress
+
+
+@pytest.mark.parametrize('write_queue', [0, 2])
+@pytest.mark.parametrize('extension', ['.txt', '.pmwl'])
+def test_resume_matches_uninterrupted_run(tmp_path, extension, write_queue):
+    target = pmwl.TargetInfo(**LARGE_PROFILE)
+    config = pmwl.config_from_dict(dict(LARGE_CONFIG,
+                                        write_queue=write_queue))
+    expected = str(tmp_path / ('full' + extension))
+    full = pmwl.build_wordlist(target, config, expected)
+    assert full.entries > 3 * pmwl.DEFAULT_CHUNK_SIZE
+
+    output = str(tmp_path / ('resumed' + extension))
+    with pytest.raises(Interrupted):
+        pmwl.build_wordlist(target, config, output,
+                            progress=interrupt_after(2))
+    assert os.path.exists(output + '.ckpt')
+    assert os.path.getsize(output) < os.path.getsize(expected)
+
+    result = pmwl.build_wordlist(target, config, output, resume=True)
+    assert result.entries == full.entries
+    assert not os.path.exists(output + '.ckpt')
+    with open(output, 'rb') as resumed, open(expected, 'rb') as f:
+        assert resumed.read() == f.read()
+
+
+def test_resume_ignores_checkpoint_of_other_inputs(tmp_path):
+    target = pmwl.TargetInfo(**LARGE_PROFILE)
+    config = pmwl.config_from_dict(LARGE_CONFIG)
+    output = str(tmp_path / 'list.txt')
+    with pytest.raises(Interrupted):
+        pmwl.build_wordlist(target, config, output,
+                            progress=interrupt_after(2))
+
+    other = pmwl.config_from_dict(dict(LARGE_CONFIG, complexity='extreme'))
+    expected = str(tmp_path / 'expected.txt')
+    pmwl.build_wordlist(target, other, expected)
+    pmwl.build_wordlist(target, other, output, resume=True)
+    with open(output, 'rb') as resumed, open(expected, 'rb') as f:
+        assert resumed.read() == f.read()
+
+
+def test_shards_partition_the_wordlist(tmp_path):
+    target = pmwl.TargetInfo(**LARGE_PROFILE)
+    config = pmwl.config_from_dict(LARGE_CONFIG)
+    full = read_lines(pmwl.build_wordlist(target, config,
+                                          str(tmp_path / 'full.txt'))
+                      .output_file)
+    count = 3
+    shards = []
+    for index in range(count):
+        output = str(tmp_path / f'shard{index}.txt')
+        pmwl.build_wordlist(target, config, output, shard=(index, count))
+        shards.append(read_lines(output))
+    for index, shard in enumerate(shards):
+        assert shard == full[index::count]
+
+
+@pytest.mark.parametrize('text', ['3', '3/3', '-1/2', 'a/b', '1/0'])
+def test_invalid_shard_rejected(text):
+    with pytest.raises(ValueError):
+        pmwl.parse_shard(text)
@@ -0,0 +1,80 @@
+"""Declarative rule sets and custom hashcat-style rules."""
+import dataclasses
+
+import pytest
+
+import pmwl
+from conftest import PROFILES
+
+RULES = [
+    (':', 'password'),
+    ('c $1', 'Password1'),
+    ('u', 'PASSWORD'),
+    ('C', 'pASSWORD'),
+    ('t', 'PASSWORD'),
+    ('r', 'drowssap'),
+    ('d', 'passwordpassword'),
+    ('[ ]', 'asswor'),
+    ('sa@ so0', 'p@ssw0rd'),
+    ('@s', 'paword'),
+    ('^x $y', 'xpasswordy'),
+    ('${birth_year}', 'password1990'),
+]
+
+
+@pytest.fixture
+def rules_config(tmp_path):
+    path = tmp_path / 'custom.rule'
+    path.write_text('# comment\n\n' + '\n'.join(rule for rule, _ in RULES)
+                    + '\n')
+    return pmwl.Config(complexity='low', rules_file=str(path))
+
+
+def test_custom_rules(rules_config):
+    ctx = pmwl.build_context(pmwl.TargetInfo(birth_year='1990'),
+                             rules_config)
+    pairs = list(pmwl.run_rule_stage(pmwl.CUSTOM_RULE_STAGE, 'password',
+                                     'Password', ctx))
+    assert [word for word, _ in pairs] == [word for _, word in RULES]
+    assert {weight for _, weight in pairs} == {ctx.weights['rule']}
+    assert (pmwl.count_rule_stage(pmwl.CUSTOM_RULE_STAGE, 'password', ctx)
+            == len(pairs))
+
+
+def test_custom_rules_join_the_stream(rules_config):
+    target = pmwl.TargetInfo(**PROFILES['names'])
+    plain = {word for word, _ in pmwl.iter_candidates(
+        target, pmwl.Config(complexity='low'))}
+    words = {word for word, _ in pmwl.iter_candidates(target, rules_config)}
+    assert words - plain >= {'xalicey', 'ecila', 'alicealice'}
+    assert (pmwl.estimate_candidates(target, rules_config).total
+            == sum(1 for _ in pmwl.iter_candidates(target, rules_config)))
+
+
+@pytest.mark.parametrize('rule', ['X', '$', 'sa', 'L c', '${nope'])
+def test_invalid_rules_rejected(rule):
+    with pytest.raises(ValueError):
+        pmwl.parse_rule(rule)
+
+
+@pytest.mark.parametrize('complexity', ['low', 'medium', 'high', 'extreme'])
+def test_stage_counts_match_programs(complexity):
+    target = pmwl.TargetInfo(**PROFILES['family'])
+    ctx = pmwl.build_context(target, pmwl.Config(complexity=complexity))
+    for word in pmwl.build_base_words(target):
+        for name, program in ctx.programs.items():
+            pairs = list(program.run(word, word.capitalize(), ctx))
+            assert program.count(word, word.capitalize(), ctx) == len(pairs)
+
+
+@pytest.mark.parametrize('complexity', ['low', 'extreme'])
+def test_block_expansion_matches_per_word_runs(rules_config, complexity):
+    config = dataclasses.replace(rules_config, complexity=complexity)
+    ctx = pmwl.build_context(pmwl.TargetInfo(birth_year='1990'), config)
+    words = ['password', '2fast', 'zoë', 'a']
+    for name, program in ctx.programs.items():
+        text, count = program.expand_block(words, ctx)
+        block = text.splitlines()
+        assert len(block) == count
+        assert set(block) == {candidate for word in words for candidate, _
+                              in program.run(word, word.capitalize(), ctx)}
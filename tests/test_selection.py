@@ -0,0 +1,119 @@
+"""Bounded selection against sorting every unique candidate."""
+import json
+import random
+
+import pytest
+
+import pmwl
+from conftest import LARGE_CONFIG, LARGE_PROFILE, PROFILES
+
+
+def stream(count=3000, seed=7):
+    rng = random.Random(seed)
+    return [(''.join(rng.choice('abcde1!')
+                     for _ in range(rng.randint(1, 6))),
+             rng.choice([0.25, 0.5, 1.0]))
+            for _ in range(count)]
+
+
+def best_scores(candidates):
+    best = {}
+    for word, score in candidates:
+        best[word] = max(score, best.get(word, score))
+    return best
+
+
+@pytest.mark.parametrize('ordering', sorted(pmwl.ORDERINGS))
+@pytest.mark.parametrize('limit', [0, 1, 50, 700, 100000])
+def test_selection_equals_sort_then_truncate(ordering, limit):
+    candidates = stream()
+    key = pmwl.ORDERINGS[ordering]
+    best = best_scores(candidates)
+    expected = sorted(best.items(), key=lambda item: key(*item))[:limit]
+    selector = pmwl.select_candidates(iter(candidates), limit, ordering)
+    assert list(selector.result()) == expected
+    assert selector.seen == len(candidates)
+    assert selector.capped == (limit < len(best))
+
+
+def test_score_ordering_prefers_likely_candidates():
+    target = pmwl.TargetInfo(**PROFILES['names'])
+    config = pmwl.Config(complexity='extreme')
+    best = best_scores(pmwl.iter_candidates(target, config))
+    selector = pmwl.select_candidates(pmwl.iter_candidates(target, config),
+                                      100)
+    kept = list(selector.result())
+    assert [score for _, score in kept] == sorted(
+        (score for _, score in kept), reverse=True)
+    assert kept[-1][1] >= max(score for word, score in best.items()
+                              if word not in dict(kept))
+    assert best['alice'] == 1.0
+
+
+def test_weights_file(tmp_path):
+    path = tmp_path / 'weights.json'
+    path.write_text(json.dumps({'leet': 0.01}))
+    weights = pmwl.load_weights(str(path))
+    assert weights['leet'] == 0.01
+    assert weights['capitalize'] == pmwl.DEFAULT_WEIGHTS['capitalize']
+    path.write_text(json.dumps({'nonsense': 1}))
+    with pytest.raises(ValueError):
+        pmwl.load_weights(str(path))
+
+
+def test_metadata_sidecar(tmp_path, quiet):
+    output = tmp_path / 'list.txt'
+    config = pmwl.Config(size='small', complexity='high',
+                         output_file=str(output))
+    pmwl.generate_wordlist(pmwl.TargetInfo(**PROFILES['family']), config)
+    metadata = json.loads((tmp_path / 'list.txt.meta.json').read_text())
+    assert metadata['entries'] == len(output.read_text().splitlines())
+    assert metadata['ordering'] == 'score'
+
+
+@pytest.mark.parametrize('ordering', sorted(pmwl.ORDERINGS))
+@pytest.mark.parametrize('limit', [0, 50, 100000])
+def test_external_selection_matches_in_memory(tmp_path, ordering, limit):
+    candidates = stream()
+    expected = pmwl.select_candidates(iter(candidates), limit, ordering)
+    selector = pmwl.select_candidates(iter(candidates), limit, ordering,
+                                      memory_limit=16384,
+                                      tmpdir=str(tmp_path))
+    assert list(selector.result()) == list(expected.result())
+    assert selector.spill_runs > 1
+    assert (selector.seen, selector.capped) == (expected.seen,
+                                                expected.capped)
+    assert not list(tmp_path.iterdir())
+
+
+class Failure(Exception):
+    pass
+
+
+def failing_stream():
+    yield from stream()
+    raise Failure
+
+
+def test_spill_files_removed_when_adding_fails(tmp_path):
+    with pytest.raises(Failure):
+        pmwl.select_candidates(failing_stream(), 50, 'score',
+                               memory_limit=16384, tmpdir=str(tmp_path))
+    assert not list(tmp_path.iterdir())
+
+
+def test_spill_files_removed_when_writing_fails(tmp_path):
+    def progress(writer):
+        raise Failure
+
+    spill_dir = tmp_path / 'spill'
+    spill_dir.mkdir()
+    target = pmwl.TargetInfo(**LARGE_PROFILE)
+    config = pmwl.config_from_dict(dict(LARGE_CONFIG, memory_limit=1,
+                                        temp_dir=str(spill_dir)))
+    with pytest.raises(Failure) as failure:
+        pmwl.build_wordlist(target, config, str(tmp_path / 'list.txt'),
+                            progress=progress)
+    # Removed at once, not when the failed run's frames are collected
+    assert failure.traceback
+    assert not list(spill_dir.iterdir())
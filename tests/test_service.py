@@ -0,0 +1,123 @@
+"""The wordlist service and its client."""
+import io
+import os
+import stat
+import threading
+
+import pytest
+
+import pmwl
+from conftest import PROFILES, read_lines
+
+
+@pytest.fixture
+def service():
+    server = pmwl.open_service(port=0, cache_size=1)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,),
+                              daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.mark.parametrize('profile', sorted(PROFILES))
+def test_client_matches_generate(service, tmp_path, profile, capsys):
+    target = pmwl.TargetInfo(**PROFILES[profile])
+    config = pmwl.Config(complexity='extreme', size='massive', combine=2)
+    expected = str(tmp_path / 'generated.txt')
+    pmwl.build_wordlist(target, config, expected)
+    port = service.server_address[1]
+    for attempt in range(2):
+        output = str(tmp_path / f'served{attempt}.txt')
+        pmwl.run_client(target, config, output, port=port)
+        assert read_lines(output) == read_lines(expected)
+    assert (service.cache.hits, service.cache.misses) == (1, 1)
+    metrics = pmwl.run_client(None, config, port=port, metrics=True)
+    assert (metrics['cache_hits'], metrics['cache_misses']) == (1, 1)
+    assert metrics['errors'] == 0
+
+
+def test_reply_larger_than_the_cache_is_served_uncached(service, tmp_path,
+                                                        capsys):
+    service.cache = pmwl.ResultCache(100)
+    target = pmwl.TargetInfo(**PROFILES['family'])
+    config = pmwl.Config(complexity='high')
+    expected = str(tmp_path / 'generated.txt')
+    pmwl.build_wordlist(target, config, expected)
+    output = str(tmp_path / 'served.txt')
+    pmwl.run_client(target, config, output, port=service.server_address[1])
+    assert read_lines(output) == read_lines(expected)
+    assert len(service.cache) == 0 and service.cache.nbytes == 0
+
+
+def test_truncated_reply_raises_value_error():
+    with pytest.raises(ValueError):
+        pmwl.read_exactly(io.BytesIO(b'abc'), 4)
+    assert pmwl.read_exactly(io.BytesIO(b'abcd'), 4) == b'abcd'
+
+
+def test_bad_request_is_reported(service):
+    config = pmwl.Config(complexity='nonsense')
+    with pytest.raises(ValueError, match='nonsense'):
+        pmwl.run_client(pmwl.TargetInfo(first_name='Alice'), config,
+                        port=service.server_address[1])
+
+
+@pytest.mark.parametrize('name, value', [
+    ('rules_file', '/etc/passwd'),
+    ('weights_file', '../outside.json'),
+    ('exclude_files', ['tried.txt', '/etc/passwd']),
+])
+def test_paths_outside_the_root_rejected(tmp_path, name, value):
+    with pytest.raises(ValueError, match='outside the service root'):
+        pmwl.service_config({name: value}, str(tmp_path))
+    with pytest.raises(ValueError, match='--root'):
+        pmwl.service_config({name: value})
+
+
+def test_symlink_out_of_the_root_rejected(tmp_path):
+    root = tmp_path / 'root'
+    root.mkdir()
+    (root / 'link.rule').symlink_to('/etc/passwd')
+    with pytest.raises(ValueError, match='outside the service root'):
+        pmwl.service_config({'rules_file': 'link.rule'}, str(root))
+
+
+def test_relative_paths_are_taken_from_the_root(tmp_path):
+    (tmp_path / 'custom.rule').write_text('d\n')
+    config = pmwl.service_config({'rules_file': 'custom.rule'},
+                                 str(tmp_path))
+    assert config.rules_file == str(tmp_path / 'custom.rule')
+
+
+def test_client_request_for_etc_passwd_fails(service, tmp_path):
+    config = pmwl.Config(rules_file='/etc/passwd')
+    with pytest.raises(ValueError, match='--root'):
+        pmwl.run_client(pmwl.TargetInfo(first_name='Alice'), config,
+                        str(tmp_path / 'out.txt'),
+                        port=service.server_address[1])
+
+
+@pytest.mark.skipif(pmwl.UnixService is None, reason='no Unix sockets')
+def test_unix_socket_is_private(tmp_path):
+    path = str(tmp_path / 'pmwl.sock')
+    server = pmwl.open_service(socket_path=path)
+    try:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    finally:
+        server.server_close()
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = pmwl.ResultCache(10)
+    cache.put('a', [(b'1234\n', 1)])
+    cache.put('b', [(b'5678\n', 1)])
+    assert cache.get('a')
+    cache.put('c', [(b'9012\n', 1)])
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+    assert cache.evictions == 1 and cache.nbytes == 10
+    cache.put('big', [(b'x' * 11, 1)])
+    assert cache.get('big') is None
@@ -0,0 +1,49 @@
+"""Streaming wordlists to stdout."""
+import os
+import subprocess
+import sys
+
+import pmwl
+from conftest import LARGE_PROFILE, ROOT, read_lines
+
+SCRIPT = os.path.join(ROOT, 'pmwl.py')
+ARGS = ['generate', '--first-name', 'Alice', '--last-name', 'Smith',
+        '--birth-year', '1990', '--pet', 'Rex', '--hobby', 'chess',
+        '--complexity', 'extreme']
+
+
+def run_pmwl(args, cwd):
+    return subprocess.run([sys.executable, SCRIPT] + args, cwd=cwd,
+                          capture_output=True, text=True, check=True)
+
+
+def test_stdout_matches_file_output(tmp_path):
+    run_pmwl(ARGS + ['-o', 'list.txt'], tmp_path)
+    streamed = run_pmwl(ARGS + ['-o', '-'], tmp_path)
+    assert streamed.stdout.splitlines() == read_lines(tmp_path / 'list.txt')
+    assert 'written to stdout' in streamed.stderr
+    assert sorted(os.listdir(tmp_path)) == ['list.txt', 'list.txt.meta.json']
+
+
+def test_closed_pipe_ends_quietly(tmp_path):
+    process = subprocess.Popen([sys.executable, SCRIPT] + ARGS
+                               + ['--ordering', 'stream', '-o', '-'],
+                               cwd=tmp_path, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, text=True)
+    assert process.stdout.readline().strip()
+    process.stdout.close()
+    assert process.wait(timeout=30) == 0
+    assert 'Traceback' not in process.stderr.read()
+    process.stderr.close()
+
+
+def test_stream_ordering_stops_at_the_cap():
+    target = pmwl.TargetInfo(**LARGE_PROFILE)
+    config = pmwl.Config(complexity='extreme', size='custom', custom_size=10,
+                         ordering='stream')
+    selector = pmwl.select_candidates(pmwl.iter_candidates(target, config),
+                                      config.target_size, config.ordering)
+    words = [word for word, _ in selector.result()]
+    assert len(words) == 10 == len(set(words))
+    assert selector.capped
+    assert selector.seen < pmwl.estimate_candidates(target, config).total
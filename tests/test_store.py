@@ -0,0 +1,49 @@
+"""The arena-backed CandidateStore against a dict."""
+import random
+
+import pmwl
+from conftest import read_lines
+
+
+def random_words(count=5000, seed=3):
+    rng = random.Random(seed)
+    return [(''.join(rng.choice('abcxyzé1!')
+                     for _ in range(rng.randint(1, 8))),
+             rng.choice([0.5, 1.0, 2.0]))
+            for _ in range(count)]
+
+
+def test_store_matches_dict():
+    pairs = random_words()
+    store = pmwl.CandidateStore()
+    expected = {}
+    for word, score in pairs:
+        assert store.add(word, score) == (word not in expected)
+        expected[word] = max(score, expected.get(word, score))
+    assert len(store) == len(expected)
+    assert list(store) == list(expected.items())
+    assert list(store.sorted()) == sorted(expected.items())
+    assert all(word in store for word in expected)
+    assert 'absent' not in store
+
+
+def test_chunks_write_the_arena(tmp_path):
+    store = pmwl.CandidateStore()
+    for word, score in random_words():
+        store.add(word, score)
+    output = str(tmp_path / 'list.txt')
+    with pmwl.WordlistWriter(output, queue_depth=2) as writer:
+        for view, count in store.chunks(start=10, size=256):
+            writer.write_encoded(view, count)
+    words = [word for word, _ in store]
+    assert writer.words_written == len(words) - 10
+    assert read_lines(output) == words[10:]
+
+
+def test_sorted_orders_prefixes_first(monkeypatch):
+    monkeypatch.setattr(pmwl, 'STORE_SORT_RUN', 3)
+    words = ['a\tb', 'a', 'b', 'a\x01', 'ab', '', 'zoë', 'a b', 'aa']
+    store = pmwl.CandidateStore()
+    for word in words:
+        store.add(word)
+    assert [word for word, _ in store.sorted()] == sorted(words)
@@ -0,0 +1,48 @@
+"""The background writer thread against the synchronous writer."""
+import pytest
+
+import pmwl
+
+WORDS = [f"word{i}" for i in range(2000)] + ['zoë', '']
+
+
+def write(directory, queue_depth, output_format):
+    directory.mkdir()
+    path = directory / ('list' + pmwl.OUTPUT_FORMATS[output_format])
+    with pmwl.WordlistWriter(str(path), chunk_size=64,
+                             queue_depth=queue_depth) as writer:
+        writer.write_all(WORDS)
+    return path, writer
+
+
+@pytest.mark.parametrize('output_format', sorted(pmwl.OUTPUT_FORMATS))
+def test_queue_output_is_byte_identical(tmp_path, monkeypatch,
+                                        output_format):
+    monkeypatch.setattr('time.time', lambda: 1.7e9)  # gzip header mtime
+    expected, _ = write(tmp_path / 'sync', 0, output_format)
+    queued, writer = write(tmp_path / 'queued', 2, output_format)
+    assert queued.read_bytes() == expected.read_bytes()
+    assert list(pmwl.iter_wordlist(str(queued))) == WORDS
+    assert writer.queue_peak <= 2
+
+
+class FailingFile:
+    def __init__(self, raw):
+        self.closed = False
+        self._raw = raw
+
+    def write(self, data):
+        raise OSError('disk full')
+
+    def close(self):
+        self._raw.close()
+
+
+def test_writer_thread_errors_are_raised(tmp_path):
+    writer = pmwl.WordlistWriter(str(tmp_path / 'list.txt'), chunk_size=4,
+                                 queue_depth=2)
+    writer._file = FailingFile(writer._raw)
+    with pytest.raises(OSError, match='disk full'):
+        with writer:
+            writer.write_all(WORDS)
+    assert writer._raw.closed